@@ -0,0 +1,143 @@
+import random
+import time
+
+import httpx
+
+from app.config import (
+    LB_POLICY,
+    LB_EJECT_FAILURES,
+    LB_EJECT_SECONDS,
+    LB_EJECT_MAX_SECONDS,
+    LB_MAX_EJECTED_RATIO,
+    LB_SLOW_START_SECONDS,
+)
+
+# Weight of a replica at the very start of its slow-start ramp
+SLOW_START_MIN_WEIGHT = 0.1
+# Floor for latency in the load score so fast replicas still compare by queue depth
+MIN_LATENCY = 0.001
+
+
+class Replica:
+    """One instance of an upstream service and its passive health state."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.origin = httpx.URL(url)
+        self.outstanding = 0
+        self.requests_total = 0
+        self.failures_total = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.recovered_at = 0.0
+        self.latency_ewma = 0.0
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def weight(self, now: float) -> float:
+        if not self.recovered_at or LB_SLOW_START_SECONDS <= 0:
+            return 1.0
+        ramp = (now - self.recovered_at) / LB_SLOW_START_SECONDS
+        if ramp >= 1.0:
+            self.recovered_at = 0.0
+            self.ejections = 0
+            return 1.0
+        return max(SLOW_START_MIN_WEIGHT, ramp)
+
+    def load(self, now: float) -> float:
+        # Outstanding requests scaled by observed latency, so a slow replica
+        # with the same queue counts as busier (unmeasured replicas go first).
+        return (self.outstanding + 1) * max(self.latency_ewma, MIN_LATENCY) / self.weight(now)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "requests_total": self.requests_total,
+            "failures_total": self.failures_total,
+            "latency_ewma": round(self.latency_ewma, 4),
+            "ejected": self.ejected(now),
+            "ejections": self.ejections,
+            "weight": round(self.weight(now), 2),
+        }
+
+
+class Balancer:
+    """Pick a replica per call by least load: outstanding requests x latency EWMA.
+
+    LB_POLICY "p2c" compares two random replicas, "least_outstanding" scans all.
+
+    Replicas with LB_EJECT_FAILURES consecutive failures are skipped for a while,
+    then come back with a linearly increasing share of traffic (slow start).
+    """
+
+    def __init__(self, urls: list[str], policy: str = LB_POLICY):
+        self.replicas = [Replica(url) for url in urls]
+        self.policy = policy
+
+    def _available(self, now: float, exclude: set[Replica]) -> list[Replica]:
+        healthy = [r for r in self.replicas if not r.ejected(now) and r not in exclude]
+        if healthy:
+            return healthy
+        # Everything is ejected or already tried: fall back to the full set
+        # rather than failing, the circuit breaker handles a fully broken service.
+        return [r for r in self.replicas if r not in exclude] or self.replicas
+
+    def pick(self, exclude: set[Replica] | None = None) -> Replica:
+        if len(self.replicas) == 1:
+            return self.replicas[0]
+        now = time.monotonic()
+        candidates = self._available(now, exclude or set())
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.policy == "least_outstanding":
+            lowest = min(r.load(now) for r in candidates)
+            return random.choice([r for r in candidates if r.load(now) == lowest])
+        a, b = random.sample(candidates, 2)
+        return a if a.load(now) <= b.load(now) else b
+
+    def start(self, replica: Replica):
+        replica.outstanding += 1
+        replica.requests_total += 1
+
+    def record(self, replica: Replica, success: bool, duration: float):
+        replica.latency_ewma = duration if not replica.latency_ewma else 0.8 * replica.latency_ewma + 0.2 * duration
+        if success:
+            replica.consecutive_failures = 0
+            return
+        replica.failures_total += 1
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= LB_EJECT_FAILURES:
+            self._eject(replica)
+
+    def release(self, replica: Replica):
+        """End a call started with start(); streamed calls release once the body is relayed."""
+        replica.outstanding -= 1
+
+    def _eject(self, replica: Replica):
+        now = time.monotonic()
+        if len(self.replicas) < 2 or replica.ejected(now):
+            return
+        ejected = sum(1 for r in self.replicas if r.ejected(now))
+        if ejected + 1 > len(self.replicas) * LB_MAX_EJECTED_RATIO:
+            return
+        duration = min(LB_EJECT_MAX_SECONDS, LB_EJECT_SECONDS * (2 ** replica.ejections))
+        replica.ejections += 1
+        replica.consecutive_failures = 0
+        replica.ejected_until = now + duration
+        replica.recovered_at = replica.ejected_until
+
+    def stats(self) -> list[dict]:
+        return [r.stats() for r in self.replicas]
+
+
+def route_to(request: httpx.Request, replica: Replica):
+    """Point an already built request at `replica`, keeping path and query."""
+    origin = replica.origin
+    if (request.url.scheme, request.url.host, request.url.port) == (origin.scheme, origin.host, origin.port):
+        return
+    request.url = request.url.copy_with(scheme=origin.scheme, host=origin.host, port=origin.port)
+    request.headers["host"] = origin.netloc.decode("ascii")
@@ -0,0 +1,182 @@
+import random
+import time
+from collections import deque
+
+import httpx
+
+from app.config import (
+    BREAKER_WINDOW,
+    BREAKER_MIN_CALLS,
+    BREAKER_FAILURE_RATE,
+    BREAKER_SLOW_CALL_SECONDS,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_CALLS,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MIN_PER_SECOND,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Upstream {name} is temporarily unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker fed by the outcome and latency of each call.
+
+    Every allowed call must be followed by exactly one record() or release().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_call_seconds: float = BREAKER_SLOW_CALL_SECONDS,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_calls: int = BREAKER_HALF_OPEN_CALLS,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: deque[bool] = deque(maxlen=max(1, window))
+        self._trials = 0
+        self._trial_successes = 0
+        self.opened_total = 0
+        self.rejected_total = 0
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected_total += 1
+                return False
+            self.state = HALF_OPEN
+            self._trials = 0
+            self._trial_successes = 0
+        if self.state == HALF_OPEN:
+            if self._trials >= self.half_open_calls:
+                self.rejected_total += 1
+                return False
+            self._trials += 1
+        return True
+
+    def record(self, success: bool, duration: float, slow_call_seconds: float | None = None):
+        """Count one call; ``slow_call_seconds`` overrides the slow-call threshold for routes with longer timeouts."""
+        if slow_call_seconds is None:
+            slow_call_seconds = self.slow_call_seconds
+        failed = not success or duration >= slow_call_seconds
+        if self.state == HALF_OPEN:
+            if failed:
+                self._open()
+                return
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_calls:
+                self._close()
+            return
+        if self.state == OPEN:
+            # A call admitted before the breaker opened finished late
+            return
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and self._rate() >= self.failure_rate:
+            self._open()
+
+    def release(self):
+        """Give back a half-open trial slot for a call that ended without a verdict (e.g. cancelled)."""
+        if self.state == HALF_OPEN and self._trials > self._trial_successes:
+            self._trials -= 1
+
+    def _rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.opened_total += 1
+        self._outcomes.clear()
+
+    def _close(self):
+        self.state = CLOSED
+        self._outcomes.clear()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failure_rate": self._rate(),
+            "calls_in_window": len(self._outcomes),
+            "retry_after": self.retry_after(),
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+class RetryBudget:
+    """Token bucket shared by all upstreams so retries stay a small share of traffic.
+
+    Each request deposits `ratio` tokens and time adds `min_per_second`; a retry
+    spends one token. During an outage this caps extra load instead of multiplying it.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float | None = None):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens if max_tokens is not None else max(10.0, min_per_second * 10)
+        self._tokens = self.max_tokens
+        self._updated = time.monotonic()
+        self.retries = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens < 1.0:
+            self.denied += 1
+            return False
+        self._tokens -= 1.0
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "max_tokens": self.max_tokens,
+            "retries": self.retries,
+            "denied": self.denied,
+        }
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+
+
+retry_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND)
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import Response
+
+from app.compression import compressible, compress, encoded_headers
+from app.config import (
+    RESPONSE_CACHE_ROUTES,
+    RESPONSE_CACHE_STALE_SECONDS,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_INVALIDATE,
+)
+
+# Response headers that must not be replayed to other clients
+UNCACHEABLE_HEADERS = {"set-cookie", "date", "server"}
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: dict
+    body: bytes
+    etag: str
+    fresh_until: float
+    stale_until: float
+    # Encoded copies of body by content-coding, filled on first request for each
+    variants: dict = field(default_factory=dict)
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+def cache_ttl(path: str) -> float | None:
+    """Fresh lifetime for a whitelisted GET path (longest prefix wins), else None."""
+    ttl = None
+    best = -1
+    for prefix, seconds in RESPONSE_CACHE_ROUTES.items():
+        if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and len(prefix) > best:
+            ttl = seconds
+            best = len(prefix)
+    return ttl
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison is what If-None-Match uses for GET
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """In-memory LRU of upstream GET responses bounded by total byte size.
+
+    Entries are served fresh for their route TTL, then served stale for up to
+    RESPONSE_CACHE_STALE_SECONDS while a single background refresh replaces them.
+    """
+
+    def __init__(self, max_bytes: int, stale_seconds: float):
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+        self.purged = 0
+        self.compressions = 0
+
+    @staticmethod
+    def key(path: str, query: str) -> str:
+        params = "&".join(sorted(query.split("&"))) if query else ""
+        return f"{path}?{params}"
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry.stale_until:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key: str, status_code: int, headers: dict, body: bytes, ttl: float) -> CachedResponse:
+        headers = {k: v for k, v in headers.items() if k.lower() not in UNCACHEABLE_HEADERS}
+        etag = next((v for k, v in headers.items() if k.lower() == "etag"), None)
+        if not etag:
+            etag = strong_etag(body)
+            headers["etag"] = etag
+        now = time.time()
+        entry = CachedResponse(
+            status_code=status_code,
+            headers=headers,
+            body=body,
+            etag=etag,
+            fresh_until=now + ttl,
+            stale_until=now + ttl + self.stale_seconds,
+        )
+        if entry.size > self.max_bytes:
+            return entry
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def purge(self, prefix: str | None = None) -> int:
+        """Drop every entry (or those whose path starts with `prefix`)."""
+        keys = [k for k in self._entries if prefix is None or k.startswith(prefix)]
+        for k in keys:
+            self._remove(k)
+        self.purged += len(keys)
+        return len(keys)
+
+    def invalidate_for(self, method: str, path: str, status_code: int):
+        """Purge hook for successful writes that change cached public data."""
+        if method in ("GET", "HEAD", "OPTIONS") or status_code >= 400:
+            return
+        for prefix, targets in RESPONSE_CACHE_INVALIDATE.items():
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                for target in targets:
+                    self.purge(target)
+
+    def _variant(self, key: str, entry: CachedResponse, encoding: str) -> bytes:
+        body = entry.variants.get(encoding)
+        if body is None:
+            body = entry.variants[encoding] = compress(entry.body, encoding)
+            self.compressions += 1
+            # Count the copy against the budget if the entry is still cached
+            if self._entries.get(key) is entry:
+                entry.size += len(body)
+                self._bytes += len(body)
+                self._evict()
+        return body
+
+    def respond(self, key: str, entry: CachedResponse, if_none_match: str | None, state: str, encoding: str | None = None) -> Response:
+        eligible = compressible(entry.status_code, entry.headers, len(entry.body))
+        if not eligible:
+            encoding = None
+        headers = encoded_headers(entry.headers, encoding) if encoding else dict(entry.headers)
+        if eligible and not encoding:
+            # Shared caches must not hand this identity body to clients asking for br/gzip
+            headers["vary"] = "Accept-Encoding"
+        etag = headers.get("etag", entry.etag)
+        if etag_matches(if_none_match, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers={"etag": etag, "x-cache": state})
+        headers["x-cache"] = state
+        body = self._variant(key, entry, encoding) if encoding else entry.body
+        return Response(content=body, status_code=entry.status_code, headers=headers)
+
+    async def serve(self, key: str, ttl: float, if_none_match: str | None, fetch, encoding: str | None = None) -> Response:
+        """Answer from cache when possible; `fetch()` returns (status, headers, body).
+
+        `encoding` is the negotiated content-coding; encoded bodies are kept with
+        the entry so repeated hits are not compressed again.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            if time.time() < entry.fresh_until:
+                self.hits += 1
+                return self.respond(key, entry, if_none_match, "HIT", encoding)
+            self.stale_hits += 1
+            self._refresh_in_background(key, ttl, fetch)
+            return self.respond(key, entry, if_none_match, "STALE", encoding)
+
+        self.misses += 1
+        status_code, headers, body = await fetch()
+        if status_code != 200:
+            return Response(content=body, status_code=status_code, headers=headers)
+        entry = self.store(key, status_code, headers, body, ttl)
+        return self.respond(key, entry, if_none_match, "MISS", encoding)
+
+    def _refresh_in_background(self, key: str, ttl: float, fetch):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                status_code, headers, body = await fetch()
+                if status_code == 200:
+                    self.store(key, status_code, headers, body, ttl)
+                    self.refreshes += 1
+                else:
+                    self.refresh_errors += 1
+            except Exception:
+                self.refresh_errors += 1
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+            "purged": self.purged,
+            "compressions": self.compressions,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_STALE_SECONDS)
@@ -0,0 +1,291 @@
+import asyncio
+import time
+
+import httpx
+
+from app.balancer import Balancer, route_to
+from app.metrics import (
+    UPSTREAM_CONNECT,
+    UPSTREAM_DURATION,
+    UPSTREAM_RESPONSES,
+    UPSTREAM_TTFB,
+    add_timing,
+)
+from app.breaker import CircuitBreaker, CircuitOpenError, backoff_delay, retry_budget
+from app.config import (
+    SERVICE_URLS,
+    SERVICE_REPLICAS,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_POOL_TIMEOUT,
+    UPSTREAM_TIMEOUT,
+    ROUTE_TIMEOUTS,
+    UPSTREAM_RETRIES,
+    BREAKER_SLOW_CALL_SECONDS,
+)
+
+# Only requests without side effects (and without a body to replay) are retried
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {502, 503, 504}
+# Errors where the upstream never saw the request or dropped a stale keep-alive
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+def route_timeout(path: str) -> httpx.Timeout:
+    """Pick the read timeout for an upstream path by longest matching prefix."""
+    read = UPSTREAM_TIMEOUT
+    best = -1
+    for prefix, value in ROUTE_TIMEOUTS.items():
+        if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and len(prefix) > best:
+            read = value
+            best = len(prefix)
+    return httpx.Timeout(read, connect=UPSTREAM_CONNECT_TIMEOUT, pool=UPSTREAM_POOL_TIMEOUT)
+
+
+def slow_call_seconds(request: httpx.Request) -> float:
+    """Breaker slow-call threshold for a request, scaled with its read timeout.
+
+    Routes given a longer timeout in ROUTE_TIMEOUTS (file downloads, PDF layout)
+    are expected to take longer, so they only count as slow proportionally later.
+    """
+    read = (request.extensions.get("timeout") or {}).get("read") or UPSTREAM_TIMEOUT
+    return BREAKER_SLOW_CALL_SECONDS * max(1.0, read / UPSTREAM_TIMEOUT)
+
+
+class UpstreamPool:
+    """Pooled keep-alive client for one upstream service plus basic pool stats.
+
+    Each call is routed to one of the service's replicas by the balancer, goes
+    through a per-upstream circuit breaker, and idempotent calls are retried
+    (on another replica when there is one) within the global retry budget.
+    """
+
+    def __init__(self, name: str, base_url: str, replicas: list[str] | None = None):
+        self.name = name
+        self.base_url = base_url
+        self.balancer = Balancer(replicas or [base_url])
+        self.in_flight = 0
+        self.requests_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.breaker = CircuitBreaker(name)
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+        )
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT, pool=UPSTREAM_POOL_TIMEOUT),
+        )
+
+    def _tracer(self):
+        started = time.perf_counter()
+        marks: dict[str, float] = {}
+
+        # The first httpcore trace event after the pool hands out a connection
+        # (fresh connect or reused keep-alive) marks the end of the pool wait.
+        # Connect and time-to-first-byte come from the matching event pairs.
+        async def trace(event_name: str, info: dict):
+            now = time.perf_counter()
+            if not marks:
+                waited = now - started
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            marks.setdefault("first", now)
+            if event_name == "connection.connect_tcp.started":
+                marks["connect"] = now
+            elif event_name == "connection.connect_tcp.complete" and "connect" in marks:
+                UPSTREAM_CONNECT.observe(self.name, value=now - marks["connect"])
+            elif event_name.endswith(".send_request_headers.started"):
+                marks["sent"] = now
+            elif event_name.endswith(".receive_response_headers.complete") and "sent" in marks:
+                UPSTREAM_TTFB.observe(self.name, value=now - marks["sent"])
+
+        return trace
+
+    async def send(self, request: httpx.Request, stream: bool = False, **kwargs) -> httpx.Response:
+        """Send a request through the pooled client, tracking in-flight count and pool wait.
+
+        With ``stream=True`` the body is left unread and the request stays in flight
+        until ``close()`` is called on the response. Raises CircuitOpenError without
+        touching the network while the upstream's breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+        retry_budget.deposit()
+        started = time.perf_counter()
+        try:
+            response = await self._send_with_retries(request, stream, **kwargs)
+        except httpx.TransportError:
+            elapsed = time.perf_counter() - started
+            self.breaker.record(False, elapsed, slow_call_seconds(request))
+            self._observe(request.method, "error", elapsed)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        # The breaker judges the call as the client sees it (after retries on
+        # other replicas); latency is measured to the response headers.
+        elapsed = time.perf_counter() - started
+        self.breaker.record(response.status_code < 500, elapsed, slow_call_seconds(request))
+        self._observe(request.method, response.status_code, elapsed)
+        return response
+
+    def _observe(self, method: str, status, elapsed: float):
+        UPSTREAM_DURATION.observe(self.name, method, value=elapsed)
+        UPSTREAM_RESPONSES.inc(self.name, status)
+        add_timing("upstream", elapsed)
+
+    async def _send_with_retries(self, request: httpx.Request, stream: bool, **kwargs) -> httpx.Response:
+        attempt = 0
+        tried = set()
+        while True:
+            replica = self.balancer.pick(exclude=tried)
+            tried.add(replica)
+            route_to(request, replica)
+            request.extensions["trace"] = self._tracer()
+            self.in_flight += 1
+            self.requests_total += 1
+            self.balancer.start(replica)
+            started = time.perf_counter()
+            try:
+                response = await self.client.send(request, stream=stream, **kwargs)
+            except httpx.TransportError as exc:
+                self.in_flight -= 1
+                self.balancer.release(replica)
+                self.balancer.record(replica, False, time.perf_counter() - started)
+                if isinstance(exc, RETRY_ERRORS) and self._may_retry(request, attempt):
+                    await asyncio.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                raise
+            except BaseException:
+                self.in_flight -= 1
+                self.balancer.release(replica)
+                raise
+            # 4xx are the client's problem, not the replica's
+            self.balancer.record(replica, response.status_code < 500, time.perf_counter() - started)
+            if stream:
+                # The replica stays loaded until close() releases the relayed body
+                response.extensions["replica"] = replica
+            else:
+                self.in_flight -= 1
+                self.balancer.release(replica)
+            if response.status_code in RETRY_STATUSES and self._may_retry(request, attempt):
+                if stream:
+                    await self.close(response)
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            return response
+
+    @staticmethod
+    def _may_retry(request: httpx.Request, attempt: int) -> bool:
+        return (
+            request.method in RETRY_METHODS
+            and attempt < UPSTREAM_RETRIES
+            and retry_budget.try_spend()
+        )
+
+    async def close(self, response: httpx.Response):
+        """Release a streamed response back to the pool."""
+        try:
+            await response.aclose()
+        finally:
+            self.in_flight -= 1
+            replica = response.extensions.get("replica")
+            if replica is not None:
+                self.balancer.release(replica)
+
+    async def request(self, method: str, url: str, follow_redirects: bool = False, **kwargs) -> httpx.Response:
+        request = self.client.build_request(method, url, **kwargs)
+        return await self.send(request, follow_redirects=follow_redirects)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def _connections(self) -> list:
+        pool = getattr(self._transport, "_pool", None)
+        return list(getattr(pool, "connections", []) or [])
+
+    def stats(self) -> dict:
+        connections = self._connections()
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "base_url": self.base_url,
+            "connections": len(connections),
+            "idle": idle,
+            "in_use": len(connections) - idle,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "wait_seconds_avg": (self.wait_seconds_total / self.requests_total) if self.requests_total else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "breaker": self.breaker.state,
+            "replicas": self.balancer.stats(),
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class UpstreamRegistry:
+    """One UpstreamPool per SERVICE_URLS entry, opened and closed with the app lifespan.
+
+    SERVICE_URLS names the service (routers pass it to proxy_request); the pool
+    spreads calls over that service's SERVICE_REPLICAS.
+    """
+
+    def __init__(self, service_urls: dict[str, str]):
+        self._service_urls = service_urls
+        self._pools: dict[str, UpstreamPool] = {}
+
+    def start(self):
+        for name, url in self._service_urls.items():
+            if name not in self._pools:
+                self._pools[name] = UpstreamPool(name, url, SERVICE_REPLICAS.get(name))
+
+    async def close(self):
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            await pool.aclose()
+
+    def pool(self, name: str) -> UpstreamPool:
+        # Created lazily as well so the registry works outside the lifespan (scripts, tests)
+        if name not in self._pools:
+            self._pools[name] = UpstreamPool(name, self._service_urls[name], SERVICE_REPLICAS.get(name))
+        return self._pools[name]
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        return self.pool(name).client
+
+    def name_for_url(self, service_url: str) -> str | None:
+        for name, url in self._service_urls.items():
+            if url == service_url:
+                return name
+        return None
+
+    def pool_for_url(self, service_url: str) -> UpstreamPool:
+        name = self.name_for_url(service_url)
+        if name is not None:
+            return self.pool(name)
+        # Unknown upstream (not in SERVICE_URLS): keep a pool keyed by its URL
+        if service_url not in self._pools:
+            self._pools[service_url] = UpstreamPool(service_url, service_url)
+        return self._pools[service_url]
+
+    def pools(self) -> dict[str, UpstreamPool]:
+        return dict(self._pools)
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def breakers(self) -> dict:
+        return {name: pool.breaker.stats() for name, pool in self._pools.items()}
+
+
+upstreams = UpstreamRegistry(SERVICE_URLS)
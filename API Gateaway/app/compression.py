@@ -0,0 +1,132 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from app.config import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_ENCODINGS,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_TYPES,
+    COMPRESSION_LEVELS,
+)
+
+
+def _supported(encoding: str) -> bool:
+    if encoding == "br":
+        return brotli is not None
+    if encoding == "zstd":
+        return zstandard is not None
+    return encoding == "gzip"
+
+
+# Server preference order, limited to codecs installed in this image
+ENCODINGS = [e for e in COMPRESSION_ENCODINGS if _supported(e)]
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Pick our most preferred encoding the client accepts (q > 0), or None for identity."""
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def _header(headers: dict, name: str) -> str | None:
+    return next((v for k, v in headers.items() if k.lower() == name), None)
+
+
+def compressible(status_code: int, headers: dict, length: int | None) -> bool:
+    """Whether a response may be encoded by the gateway (`length` None when unknown)."""
+    if status_code != 200 or _header(headers, "content-encoding") or _header(headers, "content-range"):
+        return False
+    if "no-transform" in (_header(headers, "cache-control") or ""):
+        return False
+    if length is not None and length < COMPRESSION_MIN_BYTES:
+        return False
+    content_type = (_header(headers, "content-type") or "").lower()
+    return any(content_type.startswith(t) for t in COMPRESSION_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    level = COMPRESSION_LEVELS.get(encoding)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level or 6, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=level or 5)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level or 3).compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class StreamCompressor:
+    """Incremental encoder for relayed bodies; every chunk is flushed so streaming stays live."""
+
+    def __init__(self, encoding: str):
+        level = COMPRESSION_LEVELS.get(encoding)
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level or 6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level or 5)
+        elif encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level or 3).compressobj()
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.compress(chunk) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._obj.process(chunk) + self._obj.flush()
+        return self._obj.compress(chunk) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._obj.flush()
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def encoded_headers(headers: dict, encoding: str) -> dict:
+    """Response headers for a body the gateway encoded itself."""
+    result = {k: v for k, v in headers.items() if k.lower() not in ("content-length", "etag", "vary")}
+    result["content-encoding"] = encoding
+    vary = _header(headers, "vary")
+    result["vary"] = f"{vary}, Accept-Encoding" if vary and "accept-encoding" not in vary.lower() else (vary or "Accept-Encoding")
+    etag = _header(headers, "etag")
+    if etag:
+        # The encoded bytes differ from what the upstream tagged
+        result["etag"] = etag if etag.startswith("W/") else "W/" + etag
+    return result
+
+
+async def compress_stream(chunks, encoding: str):
+    encoder = StreamCompressor(encoding)
+    async for chunk in chunks:
+        if chunk:
+            yield encoder.compress(chunk)
+    yield encoder.finish()
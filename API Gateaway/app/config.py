@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -19,8 +20,204 @@ SERVICE_URLS = {
     "files": "http://fileprocessing:7000",
 }
 
+
+
+def _load_service_replicas() -> dict[str, list[str]]:
+    """Replica URLs per service: SERVICE_REPLICAS_FILE (JSON), then <NAME>_REPLICAS env.
+
+    e.g. ARTICLES_REPLICAS=http://articles-1:8000,http://articles-2:8000. Services
+    without replicas configured keep their single SERVICE_URLS entry.
+    """
+    replicas = {name: [url] for name, url in SERVICE_URLS.items()}
+    replicas_file = os.getenv("SERVICE_REPLICAS_FILE")
+    if replicas_file:
+        with open(replicas_file) as f:
+            for name, urls in json.load(f).items():
+                replicas[name] = [urls] if isinstance(urls, str) else list(urls)
+    for name in SERVICE_URLS:
+        value = os.getenv(f"{name.upper()}_REPLICAS")
+        if value:
+            replicas[name] = [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+    return {name: urls for name, urls in replicas.items() if urls}
+
+
+SERVICE_REPLICAS = _load_service_replicas()
+
+# Gateway path prefix (without API_PREFIX) -> upstream service and auth policy.
+# "auth": "required" runs get_current_user before proxying; otherwise the token is
+# only resolved best-effort and the upstream decides. Explicit routes registered
+# under a prefix (e.g. GET /articles/{article_id}/reviewers) take precedence.
+PROXY_ROUTES = {
+    "/auth": {"service": "auth"},
+    "/users": {"service": "users", "auth": "required"},
+    "/articles": {"service": "articles"},
+    "/volumes": {"service": "articles"},
+    "/reviews": {"service": "reviews"},
+    "/editorial": {"service": "editorial"},
+    "/layout": {"service": "layout"},
+    "/publication": {"service": "publication"},
+    "/notifications": {"service": "notifications"},
+    "/analytics": {"service": "analytics"},
+    "/files": {"service": "files"},
+}
+
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 
+# Key for the X-Identity envelope forwarded to services (shared with all services)
+SHARED_SERVICE_SECRET = os.getenv("SHARED_SERVICE_SECRET", "service-shared-secret")
+
+# Verified-token cache in get_current_user (0 disables it)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+# Upper bound on how long verified claims are reused, even if `exp` is later
+JWT_CACHE_MAX_TTL = float(os.getenv("JWT_CACHE_MAX_TTL", "300"))
+
 # Public prefix for all gateway routes
 API_PREFIX = os.getenv("API_PREFIX", "/api")
+
+# Upstream connection pools (one pooled client per SERVICE_URLS entry)
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30.0"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3.0"))
+UPSTREAM_POOL_TIMEOUT = float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5.0"))
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10.0"))
+
+# Replica selection: "p2c" (power of two choices) or "least_outstanding"
+LB_POLICY = os.getenv("LB_POLICY", "p2c")
+# A replica failing this many calls in a row is taken out of rotation for
+# LB_EJECT_SECONDS (doubling on repeat ejections, up to LB_EJECT_MAX_SECONDS)
+LB_EJECT_FAILURES = int(os.getenv("LB_EJECT_FAILURES", "5"))
+LB_EJECT_SECONDS = float(os.getenv("LB_EJECT_SECONDS", "10.0"))
+LB_EJECT_MAX_SECONDS = float(os.getenv("LB_EJECT_MAX_SECONDS", "120.0"))
+# Never eject more than this share of a service's replicas at once
+LB_MAX_EJECTED_RATIO = float(os.getenv("LB_MAX_EJECTED_RATIO", "0.5"))
+# Returning replicas ramp up from a small share of traffic over this many seconds
+LB_SLOW_START_SECONDS = float(os.getenv("LB_SLOW_START_SECONDS", "30.0"))
+
+# Stream request/response bodies through the gateway instead of buffering them
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() in ("1", "true", "yes")
+# Largest request body the gateway will forward (matches nginx client_max_body_size)
+MAX_REQUEST_BODY_BYTES = int(os.getenv("MAX_REQUEST_BODY_BYTES", str(100 * 1024 * 1024)))
+# Request bodies up to this size are buffered so they can be replayed on an
+# upstream redirect (e.g. FastAPI's trailing-slash 307); larger ones are
+# streamed and the upstream redirect is returned to the client instead
+PROXY_BUFFER_REQUEST_BYTES = int(os.getenv("PROXY_BUFFER_REQUEST_BYTES", str(1024 * 1024)))
+
+# Aggregated /articles/{id}/reviewers: parallel upstream calls and per-call deadline (seconds)
+REVIEWERS_FANOUT_CONCURRENCY = int(os.getenv("REVIEWERS_FANOUT_CONCURRENCY", "10"))
+REVIEWERS_CALL_TIMEOUT = float(os.getenv("REVIEWERS_CALL_TIMEOUT", "3.0"))
+
+# Gateway response cache for anonymous, identity-independent GET routes.
+# Maps path prefix (without API_PREFIX) -> seconds a response stays fresh.
+RESPONSE_CACHE_ROUTES = {
+    "/volumes/public": 30.0,
+}
+# After going stale an entry is still served for this long while it is refreshed
+RESPONSE_CACHE_STALE_SECONDS = float(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "300"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Successful writes under a prefix purge the listed cached prefixes
+RESPONSE_CACHE_INVALIDATE = {
+    "/volumes": ["/volumes/public"],
+    "/articles": ["/volumes/public"],
+    "/layout": ["/volumes/public"],
+}
+
+# Anonymous GETs under these prefixes share one upstream call when identical
+# requests are in flight at the same time (responses up to COALESCE_MAX_BYTES).
+# Cached routes (RESPONSE_CACHE_ROUTES) are always coalesced.
+COALESCE_ROUTES = [
+    "/files",
+]
+COALESCE_MAX_BYTES = int(os.getenv("COALESCE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Per-route read timeouts, matched by longest path prefix (without API_PREFIX).
+# Anything not listed uses UPSTREAM_TIMEOUT.
+ROUTE_TIMEOUTS = {
+    "/files": 60.0,
+    "/layout": 30.0,
+    "/articles/my": 30.0,
+}
+
+# Per-upstream circuit breaker. Over the last BREAKER_WINDOW calls (once at least
+# BREAKER_MIN_CALLS were seen), a share of failures (5xx, connect errors, timeouts,
+# or calls slower than BREAKER_SLOW_CALL_SECONDS) at or above BREAKER_FAILURE_RATE
+# opens the breaker for BREAKER_OPEN_SECONDS; then BREAKER_HALF_OPEN_CALLS trial
+# calls decide whether it closes again. Routes with a longer ROUTE_TIMEOUTS entry
+# get a proportionally longer slow-call threshold (e.g. /files: 60s / 10s x 5s = 30s).
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "5.0"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15.0"))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "3"))
+
+# Retries for GET/HEAD/OPTIONS on connect errors and 502/503/504, with jittered
+# exponential backoff. Retries across all upstreams are capped by a budget of
+# RETRY_BUDGET_RATIO per request plus RETRY_BUDGET_MIN_PER_SECOND.
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.05"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "1.0"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1.0"))
+
+# POST /api/batch: most sub-requests per call and how many run at once
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "20"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "6"))
+
+# Token-bucket rate limiting per user id (verified bearer token) or client IP.
+# Each bucket holds RATE_LIMIT_BURST tokens and refills RATE_LIMIT_PER_SECOND;
+# a request spends the cost of its route (RATE_LIMIT_COSTS, default 1).
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+# "METHOD /prefix" (without API_PREFIX, "*" for any method) -> tokens; longest prefix wins, 0 exempts
+RATE_LIMIT_COSTS = {
+    "POST /auth/login": 10,
+    "POST /auth/register": 10,
+    "GET /articles/unassigned": 5,
+    "POST /files": 10,
+    "POST /layout": 5,
+    "POST /batch": 0,
+    "* /gateway": 0,
+}
+# "memory" (per gateway process) or "redis" (shared between gateway replicas)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://redis:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Use nginx's X-Real-IP for anonymous clients (the gateway sits behind the frontend nginx)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "true").lower() in ("1", "true", "yes")
+
+# Response compression negotiated from Accept-Encoding (server preference order).
+# Bodies already encoded by the upstream are relayed untouched.
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_ENCODINGS = [e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(",") if e.strip()]
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Content types (prefix match) worth compressing; PDFs, images and archives already are
+COMPRESSION_TYPES = [
+    "application/json",
+    "application/problem+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+]
+# Levels tuned for on-the-fly compression rather than maximum ratio
+COMPRESSION_LEVELS = {"gzip": 6, "br": 5, "zstd": 3}
+
+# Idempotency-Key handling for mutating requests. The first response to a key
+# (keys are per caller: user id, else client IP) is stored for IDEMPOTENCY_TTL_SECONDS
+# and replayed to retries; a retry arriving while the first is still running waits
+# for it. Reusing a key for a different request (method, path, query or body) is
+# rejected with 422.
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() in ("1", "true", "yes")
+IDEMPOTENCY_METHODS = {"POST", "PATCH"}
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_MAX_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BYTES", str(32 * 1024 * 1024)))
+# Larger request bodies (e.g. uploads) are forwarded without idempotency protection;
+# larger responses are not stored, so a retry runs the request again
+IDEMPOTENCY_MAX_REQUEST_BYTES = int(os.getenv("IDEMPOTENCY_MAX_REQUEST_BYTES", str(1024 * 1024)))
+IDEMPOTENCY_MAX_RESPONSE_BYTES = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE_BYTES", str(1024 * 1024)))
+# How long a duplicate waits for the original request before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
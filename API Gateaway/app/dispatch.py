@@ -0,0 +1,115 @@
+from dataclasses import dataclass, field
+
+from fastapi import Request
+from starlette.routing import Match, Route, compile_path, get_route_path
+
+from app.config import API_PREFIX, PROXY_ROUTES, SERVICE_URLS
+from app.proxy import proxy_request
+from app.security import get_current_user
+
+PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+
+
+@dataclass
+class ProxyTarget:
+    prefix: str
+    service: str
+    auth_required: bool
+    # Route template for metrics/tracing labels (read as scope["route"].path)
+    path: str = ""
+    # (path regex, methods) of explicit routes under this prefix that win over proxying
+    overrides: list = field(default_factory=list)
+
+
+class PrefixTrie:
+    """Maps path segments to the proxy target of the longest matching prefix."""
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def insert(self, prefix: str, target: ProxyTarget):
+        node = self._root
+        for segment in prefix.strip("/").split("/"):
+            node = node.setdefault(segment, {})
+        node[None] = target
+
+    def lookup(self, path: str) -> ProxyTarget | None:
+        node = self._root
+        found = None
+        for segment in path.strip("/").split("/"):
+            node = node.get(segment)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+def build_trie(routes: dict = PROXY_ROUTES) -> PrefixTrie:
+    trie = PrefixTrie()
+    for prefix, rule in routes.items():
+        trie.insert(prefix, ProxyTarget(
+            prefix=prefix,
+            service=rule["service"],
+            auth_required=rule.get("auth") == "required",
+            path=f"{API_PREFIX}{prefix}/{{path:path}}",
+        ))
+    return trie
+
+
+class ProxyDispatchRoute(Route):
+    """One route for every proxied prefix, resolved with a segment trie instead of regexes.
+
+    Installed first in the router: a proxied path is answered without trying any
+    other route, and any other path falls through to the regular routes.
+    """
+
+    def __init__(self, trie: PrefixTrie):
+        self.trie = trie
+        super().__init__(f"{API_PREFIX}/{{path:path}}", endpoint=self.dispatch, methods=PROXY_METHODS, include_in_schema=False)
+
+    def matches(self, scope) -> tuple[Match, dict]:
+        if scope["type"] != "http":
+            return Match.NONE, {}
+        path = get_route_path(scope)
+        if path != API_PREFIX and not path.startswith(API_PREFIX + "/"):
+            return Match.NONE, {}
+        target = self.trie.lookup(path[len(API_PREFIX):])
+        if target is None:
+            return Match.NONE, {}
+        for regex, methods in target.overrides:
+            if scope["method"] in methods and regex.match(path):
+                return Match.NONE, {}
+        child_scope = {"endpoint": self.endpoint, "path_params": {}, "route": target, "proxy_target": target}
+        if self.methods and scope["method"] not in self.methods:
+            return Match.PARTIAL, child_scope
+        return Match.FULL, child_scope
+
+    @staticmethod
+    async def dispatch(request: Request):
+        target: ProxyTarget = request.scope["proxy_target"]
+        if target.auth_required:
+            # Raises 401 and populates request.state for the identity headers
+            await get_current_user(request)
+        return await proxy_request(SERVICE_URLS[target.service], request)
+
+
+def install(app, routers: list):
+    """Put the proxy dispatcher in front of the app's routes.
+
+    `routers` are the APIRouters included under API_PREFIX; their routes that
+    live under a proxied prefix (e.g. GET /articles/{article_id}/reviewers) are
+    registered as overrides, so only those few patterns are ever regex-matched.
+    """
+    trie = build_trie()
+    for router in routers:
+        for route in router.routes:
+            path = getattr(route, "path", "")
+            target = trie.lookup(path.split("{", 1)[0])
+            if target is None:
+                continue
+            regex, _, _ = compile_path(API_PREFIX + path)
+            methods = set(getattr(route, "methods", None) or PROXY_METHODS)
+            if "GET" in methods:
+                methods.add("HEAD")
+            target.overrides.append((regex, methods))
+    app.router.routes.insert(0, ProxyDispatchRoute(trie))
@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.config import (
+    API_PREFIX,
+    IDEMPOTENCY_ENABLED,
+    IDEMPOTENCY_METHODS,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_MAX_ENTRIES,
+    IDEMPOTENCY_MAX_BYTES,
+    IDEMPOTENCY_MAX_REQUEST_BYTES,
+    IDEMPOTENCY_MAX_RESPONSE_BYTES,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+from app.compression import StreamCompressor, compress, compressible, encoded_headers, negotiate
+from app.ratelimit import client_key
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# Outcomes a retry is expected to change (auth fixed, limit reset, upstream
+# recovered): the key is released instead of pinning the failure to it
+RETRYABLE_STATUSES = {401, 403, 408, 409, 425, 429}
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: list
+    body: bytes
+    expires_at: float
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+
+@dataclass
+class InFlight:
+    fingerprint: str
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """Stored responses by idempotency key plus the keys whose first request is still running.
+
+    Responses live in an LRU bounded by entry count and total bytes and expire
+    after the TTL; in-flight markers are dropped as soon as the request ends.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._responses: OrderedDict[str, StoredResponse] = OrderedDict()
+        self._in_flight: dict[str, InFlight] = {}
+        self._bytes = 0
+        self.stored = 0
+        self.replays = 0
+        self.waits = 0
+        self.conflicts = 0
+        self.timeouts = 0
+        self.released = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> StoredResponse | None:
+        stored = self._responses.get(key)
+        if stored is None:
+            return None
+        if time.time() >= stored.expires_at:
+            self._remove(key)
+            return None
+        self._responses.move_to_end(key)
+        return stored
+
+    def running(self, key: str) -> InFlight | None:
+        return self._in_flight.get(key)
+
+    def begin(self, key: str, request_fingerprint: str) -> InFlight:
+        lock = InFlight(request_fingerprint)
+        self._in_flight[key] = lock
+        return lock
+
+    def finish(self, key: str, lock: InFlight, status: int | None = None, headers: list | None = None, body: bytes = b""):
+        """End the first request for `key`, storing its response (status None releases the key)."""
+        if self._in_flight.get(key) is lock:
+            del self._in_flight[key]
+        if status is None:
+            self.released += 1
+        else:
+            self._store(key, StoredResponse(lock.fingerprint, status, headers or [], body, time.time() + self.ttl))
+        lock.done.set()
+
+    def _store(self, key: str, stored: StoredResponse):
+        self._remove(key)
+        self._responses[key] = stored
+        self._bytes += stored.size
+        self.stored += 1
+        while self._responses and (len(self._responses) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._responses)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        stored = self._responses.pop(key, None)
+        if stored is not None:
+            self._bytes -= stored.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._responses),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "in_flight": len(self._in_flight),
+            "stored": self.stored,
+            "replays": self.replays,
+            "waits": self.waits,
+            "conflicts": self.conflicts,
+            "timeouts": self.timeouts,
+            "released": self.released,
+            "evictions": self.evictions,
+        }
+
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_MAX_BYTES, IDEMPOTENCY_TTL_SECONDS)
+
+
+async def _read_body(receive, limit: int) -> tuple[list[dict], bytes | None]:
+    """Buffer the request body messages; the body is None if it exceeds `limit` or the client left."""
+    messages = []
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return messages, None
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return messages, None
+        if not message.get("more_body", False):
+            return messages, b"".join(chunks)
+
+
+def _replaying(messages: list[dict], receive):
+    pending = list(messages)
+
+    async def replay_receive():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+
+    return replay_receive
+
+
+def _without_accept_encoding(scope) -> dict:
+    """Scope asking the upstream for an unencoded body, so one stored response suits every client."""
+    headers = [(k, v) for k, v in scope.get("headers", []) if k.lower() != b"accept-encoding"]
+    return {**scope, "headers": headers + [(b"accept-encoding", b"identity")]}
+
+
+def _encoding_for(status: int, headers: list, encoding: str | None, length: int | None) -> str | None:
+    if encoding is None:
+        return None
+    as_dict = {k.decode("latin-1"): v.decode("latin-1") for k, v in headers}
+    return encoding if compressible(status, as_dict, length) else None
+
+
+def _encode_headers(headers: list, encoding: str) -> list:
+    """Response headers for a body the middleware encodes (repeated headers such as set-cookie kept)."""
+    replaced = {b"content-length", b"content-encoding", b"etag", b"vary"}
+    encoded = encoded_headers({k.decode("latin-1"): v.decode("latin-1") for k, v in headers}, encoding)
+    return [(k, v) for k, v in headers if k.lower() not in replaced] + [
+        (k.encode("latin-1"), v.encode("latin-1"))
+        for k, v in encoded.items()
+        if k.lower().encode("latin-1") in replaced
+    ]
+
+
+def _content_length(headers: list) -> int | None:
+    value = next((v for k, v in headers if k.lower() == b"content-length"), None)
+    return int(value) if value is not None and value.isdigit() else None
+
+
+async def _send_json(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware making POST/PATCH requests with an Idempotency-Key safe to retry.
+
+    The first request for a key runs normally and its response is stored; a
+    duplicate gets that response back (with Idempotent-Replayed: true) without
+    reaching the upstream again. A duplicate arriving while the first request
+    is still running waits for it. Server errors and the statuses in
+    RETRYABLE_STATUSES are not stored, so the client's retry runs again.
+
+    The response is fetched and stored unencoded and compressed here for each
+    client's own Accept-Encoding, so a retry that accepts a different encoding
+    (or none) still gets a body it can decode.
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not IDEMPOTENCY_ENABLED
+            or scope["method"] not in IDEMPOTENCY_METHODS
+            or not scope["path"].startswith(API_PREFIX + "/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        messages, body = await _read_body(receive, IDEMPOTENCY_MAX_REQUEST_BYTES)
+        receive = _replaying(messages, receive)
+        if body is None:
+            # Too large to fingerprint (or the client is gone): forward unprotected
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{client_key(scope, headers)} {idempotency_key}"
+        accepted = negotiate(headers.get("accept-encoding"))
+        request_fingerprint = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self.store.get(key)
+            running = self.store.running(key) if stored is None else None
+            found = stored or running
+            if found is None:
+                break
+            if found.fingerprint != request_fingerprint:
+                self.store.conflicts += 1
+                await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+                return
+            if stored is not None:
+                self.store.replays += 1
+                replay_headers, replay_body = stored.headers, stored.body
+                encoding = _encoding_for(stored.status, replay_headers, accepted, len(replay_body))
+                if encoding:
+                    replay_body = compress(replay_body, encoding)
+                    replay_headers = _encode_headers(replay_headers, encoding) + [
+                        (b"content-length", str(len(replay_body)).encode())
+                    ]
+                await send({
+                    "type": "http.response.start",
+                    "status": stored.status,
+                    "headers": replay_headers + [(b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": replay_body})
+                return
+            self.store.waits += 1
+            try:
+                await asyncio.wait_for(running.done.wait(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.store.timeouts += 1
+                await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+                return
+            # The first request finished: replay its response, or run if it was released
+
+        lock = self.store.begin(key, request_fingerprint)
+        status = None
+        response_headers = []
+        chunks = []
+        size = 0
+        complete = False
+        encoder = None
+
+        async def capturing_send(message):
+            nonlocal status, response_headers, size, complete, encoder
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+                encoding = _encoding_for(status, response_headers, accepted, _content_length(response_headers))
+                if encoding:
+                    encoder = StreamCompressor(encoding)
+                    message = {**message, "headers": _encode_headers(response_headers, encoding)}
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                if size <= IDEMPOTENCY_MAX_RESPONSE_BYTES:
+                    size += len(chunk)
+                    chunks.append(chunk)
+                    complete = not more_body
+                if encoder is not None:
+                    encoded = encoder.compress(chunk) if chunk else b""
+                    if not more_body:
+                        encoded += encoder.finish()
+                    message = {**message, "body": encoded}
+            await send(message)
+
+        try:
+            await self.app(_without_accept_encoding(scope), receive, capturing_send)
+        finally:
+            if complete and size <= IDEMPOTENCY_MAX_RESPONSE_BYTES and status < 500 and status not in RETRYABLE_STATUSES:
+                self.store.finish(key, lock, status, response_headers, b"".join(chunks))
+            else:
+                self.store.finish(key, lock)
@@ -0,0 +1,25 @@
+"""Signed identity envelope (X-Identity) forwarded to upstream services.
+
+Format: ``base64url(json).base64url(hmac_sha256)`` with SHARED_SERVICE_SECRET.
+Services check it with their ``app/identity.py`` instead of decoding the JWT.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from app.config import SHARED_SERVICE_SECRET
+
+IDENTITY_HEADER = "X-Identity"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def sign_identity(user_id: int, roles: list[str]) -> str:
+    claims = {"sub": int(user_id), "roles": list(roles or []), "iat": int(time.time())}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    digest = hmac.new(SHARED_SERVICE_SECRET.encode(), payload.encode(), hashlib.sha256).digest()
+    return f"{payload}.{_b64encode(digest)}"
@@ -1,43 +1,78 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import API_PREFIX
+from app.clients import upstreams
+from app.breaker import OPEN, HALF_OPEN
+from app import tracing
+from app.ratelimit import RateLimitMiddleware, rate_limiter
+from app.idempotency import IdempotencyMiddleware
+from app.metrics import MetricsMiddleware, registry, UPSTREAM_IN_FLIGHT, UPSTREAM_BREAKER_STATE
+from app import dispatch
 from app.routers import (
-    auth,
-    users,
     articles,
-    reviews,
-    editorial,
-    layout,
-    publication,
-    notifications,
-    analytics,
-    fileprocessing,
-    volumes,
+    gateway,
+    batch,
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep one pooled keep-alive client per upstream for the whole process lifetime
+    upstreams.start()
+    try:
+        yield
+    finally:
+        await upstreams.close()
+        await rate_limiter.close()
+
+
 app = FastAPI(
     title="API Gateway",
+    lifespan=lifespan,
     docs_url=f"{API_PREFIX}/docs",
     openapi_url=f"{API_PREFIX}/openapi.json",
     redoc_url=None,
 )
 
+# Middleware added later wraps the ones added before it.
+# Innermost: replays still pass rate limiting, CORS, metrics and tracing
+app.add_middleware(IdempotencyMiddleware)
+# Inside CORS so 429 responses still carry Access-Control-* headers for the browser
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy", "Retry-After",
+                    "Idempotent-Replayed"],
 )
+# Outermost, so timings include CORS handling and every response gets Server-Timing
+app.add_middleware(MetricsMiddleware)
+# Added last so the trace span wraps everything, including the metrics middleware
+tracing.setup(app, "api-gateway")
+
+
+@registry.collector
+def _collect_upstreams():
+    for name, pool in upstreams.pools().items():
+        UPSTREAM_IN_FLIGHT.set(name, value=pool.in_flight)
+        state = pool.breaker.state
+        UPSTREAM_BREAKER_STATE.set(name, value=2 if state == OPEN else 1 if state == HALF_OPEN else 0)
+
+
+# Prometheus scrape endpoint; deliberately outside API_PREFIX so nginx does not expose it
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
-app.include_router(auth.router, prefix=API_PREFIX)
-app.include_router(users.router, prefix=API_PREFIX)
+# Aggregated/gateway-owned endpoints; everything else under PROXY_ROUTES is
+# forwarded by the dispatcher installed below.
 app.include_router(articles.router, prefix=API_PREFIX)
-app.include_router(reviews.router, prefix=API_PREFIX)
-app.include_router(editorial.router, prefix=API_PREFIX)
-app.include_router(layout.router, prefix=API_PREFIX)
-app.include_router(publication.router, prefix=API_PREFIX)
-app.include_router(notifications.router, prefix=API_PREFIX)
-app.include_router(analytics.router, prefix=API_PREFIX)
-app.include_router(fileprocessing.router, prefix=API_PREFIX)
-app.include_router(volumes.router, prefix=API_PREFIX)
+app.include_router(gateway.router, prefix=API_PREFIX)
+app.include_router(batch.router, prefix=API_PREFIX)
+dispatch.install(app, [articles.router, gateway.router, batch.router])
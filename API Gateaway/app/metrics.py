@@ -0,0 +1,236 @@
+import bisect
+import time
+from contextvars import ContextVar
+
+# Latency buckets in seconds (Prometheus client defaults plus a 30s/60s tail for uploads)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        self._values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value: float):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Holds metrics in process memory and renders the Prometheus text format.
+
+    Collectors are callables run at scrape time for values that already live
+    elsewhere (pool in-flight counts, breaker state, cache counters).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "gateway_requests_total", "Requests handled by the gateway.", ("route", "method", "status")))
+REQUEST_DURATION = registry.register(Histogram(
+    "gateway_request_duration_seconds", "Time until the last response byte was sent.", ("route", "method")))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "gateway_requests_in_flight", "Requests currently being handled."))
+REQUEST_BYTES = registry.register(Counter(
+    "gateway_request_bytes_total", "Request body bytes received from clients.", ("route",)))
+RESPONSE_BYTES = registry.register(Counter(
+    "gateway_response_bytes_total", "Response body bytes sent to clients.", ("route",)))
+
+UPSTREAM_DURATION = registry.register(Histogram(
+    "gateway_upstream_request_duration_seconds",
+    "Upstream call time until response headers, including retries.", ("upstream", "method")))
+UPSTREAM_CONNECT = registry.register(Histogram(
+    "gateway_upstream_connect_seconds", "TCP connect time for new upstream connections.", ("upstream",)))
+UPSTREAM_TTFB = registry.register(Histogram(
+    "gateway_upstream_ttfb_seconds",
+    "Time from sending the request to the upstream response headers, per attempt.", ("upstream",)))
+UPSTREAM_RESPONSES = registry.register(Counter(
+    "gateway_upstream_responses_total", "Upstream responses by status (error for transport failures).",
+    ("upstream", "status")))
+UPSTREAM_IN_FLIGHT = registry.register(Gauge(
+    "gateway_upstream_in_flight", "Upstream requests in flight (streamed ones until fully relayed).", ("upstream",)))
+UPSTREAM_BREAKER_STATE = registry.register(Gauge(
+    "gateway_upstream_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("upstream",)))
+
+
+# Per-request phase durations for the Server-Timing header
+_timings: ContextVar[dict | None] = ContextVar("gateway_timings", default=None)
+
+
+def start_timings() -> dict:
+    timings: dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def add_timing(name: str, seconds: float):
+    """Add to a phase of the current request (no-op outside a request)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def server_timing(timings: dict, total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route metrics and adding a Server-Timing header.
+
+    Routes are labelled by their template (e.g. /api/articles/{path:path}) so the
+    label set stays bounded; unmatched paths are labelled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = start_timings()
+        method = scope["method"]
+        status = 500
+        request_bytes = 0
+        response_bytes = 0
+        REQUESTS_IN_FLIGHT.inc()
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def timed_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, timed_send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUESTS_IN_FLIGHT.dec()
+            REQUESTS.inc(route, method, status)
+            REQUEST_DURATION.observe(route, method, value=time.perf_counter() - started)
+            REQUEST_BYTES.inc(route, amount=request_bytes)
+            RESPONSE_BYTES.inc(route, amount=response_bytes)
@@ -1,6 +1,30 @@
+import math
+
 import httpx
 from fastapi import Request, Response
-from app.config import API_PREFIX
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.config import (
+    API_PREFIX,
+    PROXY_STREAMING,
+    MAX_REQUEST_BODY_BYTES,
+    PROXY_BUFFER_REQUEST_BYTES,
+    COALESCE_ROUTES,
+    COALESCE_MAX_BYTES,
+)
+from app.clients import upstreams, route_timeout
+from app.breaker import CircuitOpenError
+from app.identity import IDENTITY_HEADER, sign_identity
+from app.security import resolve_identity
+from app.cache import response_cache, cache_ttl
+from app.singleflight import coalescer
+from app.compression import negotiate, compressible, compress, compress_stream, encoded_headers
+
+# Identity headers are only ever set by the gateway; never trust client copies
+GATEWAY_IDENTITY_HEADERS = {
+    IDENTITY_HEADER.lower(),
+    "x-user-id",
+    "x-user-roles",
+}
 
 # Remove hop-by-hop headers so we do not forward connection-specific metadata
 HOP_BY_HOP_HEADERS = {
@@ -23,6 +47,200 @@ def _filter_headers(headers) -> dict:
     }
 
 
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+def _declared_length(request: Request) -> int | None:
+    value = request.headers.get("content-length")
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+async def _limited_body(request: Request):
+    """Yield the client body chunk by chunk, aborting once it exceeds the size limit."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if MAX_REQUEST_BODY_BYTES and received > MAX_REQUEST_BODY_BYTES:
+            raise RequestBodyTooLarge()
+        if chunk:
+            yield chunk
+
+
+async def _resume(head: list[bytes], rest):
+    for chunk in head:
+        yield chunk
+    async for chunk in rest:
+        yield chunk
+
+
+async def _request_content(request: Request) -> tuple[object, bool]:
+    """(content, replayable): small bodies as bytes, larger ones as a one-shot stream.
+
+    A streamed body cannot be sent twice, so its request must not follow redirects.
+    """
+    # Requests without a body (plain GET/DELETE etc.) must not be sent as chunked uploads
+    length = _declared_length(request)
+    if length == 0 or (length is None and "transfer-encoding" not in request.headers):
+        return None, True
+    body = _limited_body(request)
+    if length is not None and length > PROXY_BUFFER_REQUEST_BYTES:
+        return body, False
+    head = []
+    size = 0
+    async for chunk in body:
+        head.append(chunk)
+        size += len(chunk)
+        if size > PROXY_BUFFER_REQUEST_BYTES:
+            # Undeclared (chunked) body outgrew the buffer: send what was read, then the rest
+            return _resume(head, body), False
+    return b"".join(head), True
+
+
+async def _relay(pool, resp: httpx.Response):
+    # Closing in finally also covers client disconnects mid-download
+    try:
+        async for chunk in resp.aiter_raw():
+            yield chunk
+    finally:
+        await pool.close(resp)
+
+
+# Caller-specific request headers never sent upstream for shared (cached/coalesced) responses
+PRIVATE_REQUEST_HEADERS = {
+    "authorization",
+    "cookie",
+    "if-none-match",
+    "if-modified-since",
+    "range",
+    "if-range",
+    "accept-encoding",
+} | GATEWAY_IDENTITY_HEADERS
+
+
+# Requests carrying any of these depend on who is asking or on partial content
+NON_SHAREABLE_REQUEST_HEADERS = {"authorization", "cookie", "range", "if-range"}
+
+
+class _Unshared:
+    """A streamed upstream response too large to fan out: one caller relays it."""
+
+    def __init__(self, pool, resp: httpx.Response):
+        self.pool = pool
+        self._resp = resp
+
+    def claim(self) -> httpx.Response | None:
+        resp, self._resp = self._resp, None
+        return resp
+
+
+def _shared_fetch(pool, url: str, upstream_path: str, request: Request, headers: dict, max_bytes: int | None = None):
+    """Build a caller-independent GET whose result is (status, headers, body).
+
+    When the body would exceed ``max_bytes`` (or its size is not declared) it is
+    not read; the result then carries the still open response as an _Unshared.
+    """
+    fetch_headers = {k: v for k, v in headers.items() if k.lower() not in PRIVATE_REQUEST_HEADERS}
+    # Fetch an unencoded body so one result can be served to every client
+    fetch_headers["accept-encoding"] = "identity"
+    params = httpx.QueryParams(str(request.query_params))
+
+    async def fetch():
+        resp = await pool.send(
+            pool.client.build_request(
+                "GET", url, params=params, headers=fetch_headers, timeout=route_timeout(upstream_path)
+            ),
+            stream=True,
+            follow_redirects=True,
+        )
+        declared = resp.headers.get("content-length")
+        if max_bytes is not None and (declared is None or int(declared) > max_bytes):
+            return resp.status_code, _filter_headers(resp.headers), _Unshared(pool, resp)
+        try:
+            body = b"".join([chunk async for chunk in resp.aiter_raw()])
+        finally:
+            await pool.close(resp)
+        return resp.status_code, _filter_headers(resp.headers), body
+
+    return fetch
+
+
+def _coalescable(upstream_path: str, request: Request) -> bool:
+    if any(h in request.headers for h in NON_SHAREABLE_REQUEST_HEADERS):
+        return False
+    return any(
+        upstream_path == prefix or upstream_path.startswith(prefix.rstrip("/") + "/")
+        for prefix in COALESCE_ROUTES
+    )
+
+
+async def _serve_cached(pool, url: str, upstream_path: str, request: Request, headers: dict, ttl: float) -> Response:
+    key = response_cache.key(upstream_path, request.url.query)
+    fetch = _shared_fetch(pool, url, upstream_path, request, headers)
+
+    # Concurrent misses (and background refreshes) for one key share one upstream call
+    async def fetch_once():
+        return await coalescer.do("cache:" + key, fetch)
+
+    return await response_cache.serve(
+        key, ttl, request.headers.get("if-none-match"), fetch_once, _negotiate(request)
+    )
+
+
+async def _serve_coalesced(pool, url: str, upstream_path: str, request: Request, headers: dict) -> Response | None:
+    """Fan one upstream response out to identical concurrent GETs.
+
+    A response too large to share is streamed to the first caller to pick it
+    up (normally the one that started the call); None tells the others to make
+    their own request.
+    """
+    key = response_cache.key(upstream_path, request.url.query)
+    fetch = _shared_fetch(pool, url, upstream_path, request, headers, max_bytes=COALESCE_MAX_BYTES)
+    status_code, resp_headers, body = await coalescer.do("get:" + key, fetch)
+    if isinstance(body, _Unshared):
+        resp = body.claim()
+        if resp is None:
+            return None
+        return _streamed_response(body.pool, resp, resp_headers, _negotiate(request))
+    return _buffered_response(status_code, resp_headers, body, _negotiate(request))
+
+
+def _negotiate(request: Request) -> str | None:
+    if request.method == "HEAD":
+        return None
+    return negotiate(request.headers.get("accept-encoding"))
+
+
+def _buffered_response(status_code: int, headers: dict, body: bytes, encoding: str | None) -> Response:
+    if encoding and compressible(status_code, headers, len(body)):
+        return Response(content=compress(body, encoding), status_code=status_code, headers=encoded_headers(headers, encoding))
+    return Response(content=body, status_code=status_code, headers=headers)
+
+
+def _streamed_response(pool, resp: httpx.Response, headers: dict, encoding: str | None) -> StreamingResponse:
+    # Raw (still encoded) bytes are relayed as they arrive, so upstream
+    # Content-Length/Content-Encoding/ETag/Content-Range stay valid and the
+    # client's read pace throttles the upstream read. Bodies the upstream left
+    # unencoded are compressed chunk by chunk when the client accepts it.
+    declared = resp.headers.get("content-length")
+    if encoding and compressible(resp.status_code, headers, int(declared) if declared and declared.isdigit() else None):
+        return StreamingResponse(
+            compress_stream(_relay(pool, resp), encoding),
+            status_code=resp.status_code,
+            headers=encoded_headers(headers, encoding),
+        )
+    return StreamingResponse(
+        _relay(pool, resp),
+        status_code=resp.status_code,
+        headers=headers,
+    )
+
+
 def _strip_api_prefix(path: str) -> str:
     prefix = (API_PREFIX or "").rstrip("/")
     if not prefix:
@@ -35,9 +253,42 @@ def _strip_api_prefix(path: str) -> str:
     return path
 
 
-async def proxy_request(service_url: str, request: Request) -> Response:
+def _gateway_location(headers: dict, service_url: str) -> dict:
+    """Point an upstream redirect the gateway did not follow back at the gateway path."""
+    for name, value in headers.items():
+        if name.lower() == "location" and value.startswith(service_url.rstrip("/") + "/"):
+            headers[name] = (API_PREFIX or "").rstrip("/") + value[len(service_url.rstrip("/")):]
+    return headers
+
+
+def _upstream_error(exc: httpx.TransportError | httpx.StreamError) -> Response:
+    """Translate a failed upstream call into the gateway's own 503/504/502."""
+    if isinstance(exc, CircuitOpenError):
+        return JSONResponse(
+            {"detail": str(exc)},
+            status_code=503,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
+    if isinstance(exc, httpx.TimeoutException):
+        return JSONResponse({"detail": "Upstream timed out"}, status_code=504)
+    return JSONResponse({"detail": "Upstream unavailable"}, status_code=502)
+
+
+async def proxy_request(service_url: str, request: Request, stream: bool | None = None) -> Response:
+    if stream is None:
+        stream = PROXY_STREAMING
+
+    # Reject oversized uploads up front when the client declares the size
+    length = _declared_length(request)
+    if MAX_REQUEST_BODY_BYTES and length is not None and length > MAX_REQUEST_BODY_BYTES:
+        return Response(content="Request body too large", status_code=413)
+
     # Start with client headers minus hop-by-hop ones
-    headers = dict(_filter_headers(request.headers))
+    headers = {
+        key: value
+        for key, value in _filter_headers(request.headers).items()
+        if key.lower() not in GATEWAY_IDENTITY_HEADERS
+    }
 
     # Always pass the upstream host so redirects don't point back to the gateway.
     try:
@@ -47,6 +298,10 @@ async def proxy_request(service_url: str, request: Request) -> Response:
         # If parsing fails, httpx will fill the host header from the request URL.
         headers.pop("host", None)
 
+    # Verify the bearer token once here (cached) so services can trust the
+    # signed envelope instead of decoding the JWT again.
+    resolve_identity(request)
+
     # If auth middleware/dependency resolved user, forward minimal identity
     user_id = getattr(request.state, "user_id", None)
     roles = getattr(request.state, "roles", None)
@@ -55,23 +310,49 @@ async def proxy_request(service_url: str, request: Request) -> Response:
     if roles is not None:
         # Forward roles as a simple comma-separated list
         headers["X-User-Roles"] = ",".join(roles)
+    if user_id is not None and roles is not None:
+        headers[IDENTITY_HEADER] = sign_identity(user_id, roles)
 
     upstream_path = _strip_api_prefix(request.url.path)
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.request(
+    pool = upstreams.pool_for_url(service_url)
+
+    try:
+        if request.method == "GET":
+            ttl = cache_ttl(upstream_path)
+            if ttl is not None:
+                return await _serve_cached(pool, service_url + upstream_path, upstream_path, request, headers, ttl)
+            if _coalescable(upstream_path, request):
+                shared = await _serve_coalesced(pool, service_url + upstream_path, upstream_path, request, headers)
+                if shared is not None:
+                    return shared
+
+        content, replayable = await _request_content(request)
+        upstream_request = pool.client.build_request(
             method=request.method,
             url=service_url + upstream_path,
             params=request.query_params,
-            content=await request.body(),
+            content=content,
             headers=headers,
+            timeout=route_timeout(upstream_path),
+        )
+        resp = await pool.send(
+            upstream_request,
+            stream=stream,
             # Follow upstream redirects (e.g. trailing slash) inside the cluster so
             # browsers don't try to hit internal Docker hostnames like "articles".
-            follow_redirects=True,
+            # A streamed body is already consumed, so its redirect goes to the client.
+            follow_redirects=replayable,
         )
+    except RequestBodyTooLarge:
+        return Response(content="Request body too large", status_code=413)
+    except (httpx.TransportError, httpx.StreamError) as exc:
+        return _upstream_error(exc)
 
-    return Response(
-        content=resp.content,
-        status_code=resp.status_code,
-        headers=_filter_headers(resp.headers),
-    )
+    response_cache.invalidate_for(request.method, upstream_path, resp.status_code)
+
+    encoding = _negotiate(request)
+    if not stream:
+        return _buffered_response(resp.status_code, _gateway_location(_filter_headers(resp.headers), service_url), resp.content, encoding)
+
+    return _streamed_response(pool, resp, _gateway_location(_filter_headers(resp.headers), service_url), encoding)
@@ -0,0 +1,233 @@
+import json
+import math
+import time
+from collections import OrderedDict
+
+from jose import JWTError
+
+from app.config import (
+    API_PREFIX,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_SECOND,
+    RATE_LIMIT_COSTS,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_TRUST_FORWARDED,
+)
+from app.security import decode_token
+
+
+class MemoryBackend:
+    """Token buckets in process memory (LRU-bounded; an evicted bucket starts full again)."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> tuple[bool, float]:
+        """Spend `cost` tokens if available; returns (allowed, tokens left)."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    async def close(self):
+        pass
+
+
+# Same bucket arithmetic as MemoryBackend, done atomically inside Redis
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Token buckets shared by every gateway replica through Redis (or any server speaking its protocol)."""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[self.prefix + key], args=[capacity, rate, cost, time.time()])
+        return bool(int(allowed)), float(tokens)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {name}")
+
+
+def route_cost(method: str, path: str) -> float:
+    """Token cost of a request by longest matching "METHOD /prefix" in RATE_LIMIT_COSTS."""
+    cost = 1.0
+    best = -1
+    for rule, value in RATE_LIMIT_COSTS.items():
+        rule_method, _, prefix = rule.partition(" ")
+        if rule_method not in ("*", method):
+            continue
+        if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and len(prefix) > best:
+            cost = float(value)
+            best = len(prefix)
+    return cost
+
+
+def client_key(scope, headers: dict) -> str:
+    """Bucket key: the verified user id when a valid bearer token is sent, else the client IP."""
+    auth = headers.get("authorization", "").split()
+    if len(auth) == 2 and auth[0].lower() == "bearer":
+        try:
+            user_id = decode_token(auth[1]).get("sub")
+        except JWTError:
+            user_id = None
+        if user_id is not None:
+            return f"user:{user_id}"
+    ip = None
+    if RATE_LIMIT_TRUST_FORWARDED:
+        ip = headers.get("x-real-ip") or headers.get("x-forwarded-for", "").split(",")[0].strip() or None
+    if ip is None and scope.get("client"):
+        ip = scope["client"][0]
+    return f"ip:{ip or 'unknown'}"
+
+
+class RateLimiter:
+    """Buckets plus counters shared by the middleware and the /gateway/ratelimit endpoint."""
+
+    def __init__(self, capacity: float = RATE_LIMIT_BURST, rate: float = RATE_LIMIT_PER_SECOND):
+        self.capacity = capacity
+        self.rate = rate
+        self.backend = None
+        self.allowed = 0
+        self.limited = 0
+        self.backend_errors = 0
+
+    async def check(self, key: str, cost: float) -> tuple[bool, float] | None:
+        """(allowed, tokens left), or None when the backend failed and the request should pass."""
+        if self.backend is None:
+            self.backend = create_backend()
+        try:
+            allowed, tokens = await self.backend.take(key, cost, self.capacity, self.rate)
+        except Exception:
+            self.backend_errors += 1
+            return None
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed, tokens
+
+    def headers(self, tokens: float) -> list[tuple[bytes, bytes]]:
+        window = math.ceil(self.capacity / self.rate)
+        reset = math.ceil((self.capacity - tokens) / self.rate)
+        return [
+            (b"ratelimit-policy", f"{int(self.capacity)};w={window}".encode()),
+            (b"ratelimit-limit", str(int(self.capacity)).encode()),
+            (b"ratelimit-remaining", str(int(tokens)).encode()),
+            (b"ratelimit-reset", str(reset).encode()),
+        ]
+
+    async def close(self):
+        backend, self.backend = self.backend, None
+        if backend is not None:
+            await backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": RATE_LIMIT_BACKEND,
+            "burst": self.capacity,
+            "per_second": self.rate,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "backend_errors": self.backend_errors,
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing token buckets and adding RateLimit-* response headers.
+
+    Batch sub-requests pass through here again, so each item is charged on its own.
+    If the shared backend is unreachable requests are let through (fail open).
+    """
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED or not scope["path"].startswith(API_PREFIX + "/"):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"][len(API_PREFIX):]
+        cost = min(route_cost(scope["method"], path), self.limiter.capacity)
+        if cost <= 0 or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        result = await self.limiter.check(client_key(scope, headers), cost)
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, tokens = result
+        limit_headers = self.limiter.headers(tokens)
+        if not allowed:
+            retry_after = max(1, math.ceil((cost - tokens) / self.limiter.rate))
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": limit_headers + [
+                    (b"retry-after", str(retry_after).encode()),
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + limit_headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -1,40 +1,128 @@
+import asyncio
+
+import httpx
 from fastapi import APIRouter, Request, HTTPException
-from app.proxy import proxy_request
-from app.config import SERVICE_URLS
+from app.config import SERVICE_URLS, REVIEWERS_FANOUT_CONCURRENCY, REVIEWERS_CALL_TIMEOUT, SHARED_SERVICE_SECRET
 from app.security import get_current_user
-import httpx
+from app.clients import upstreams
 
 router = APIRouter(prefix="/articles")
 
+# Upper bound on ids per batch lookup; the Auth and User Profile batch endpoints reject more
+BATCH_MAX_IDS = 100
+
+
+async def _get(service: str, path: str, semaphore: asyncio.Semaphore, **kwargs) -> httpx.Response | None:
+    """GET from an upstream with a per-call deadline; None if it failed or timed out."""
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(
+                upstreams.pool(service).get(f"{SERVICE_URLS[service]}{path}", **kwargs),
+                timeout=REVIEWERS_CALL_TIMEOUT,
+            )
+        except (httpx.HTTPError, asyncio.TimeoutError):
+            return None
+
+
+async def _fetch_users(
+    service: str,
+    batch_path: str,
+    single_path: str,
+    id_field: str,
+    user_ids: list[int],
+    semaphore: asyncio.Semaphore,
+) -> tuple[dict[int, dict], bool]:
+    """Look up users by id, in batches of BATCH_MAX_IDS when the upstream supports it.
+
+    Returns the found records keyed by user id and whether every lookup
+    completed (a 404 counts as completed, a timeout or 5xx does not).
+    """
+    chunks = [user_ids[i:i + BATCH_MAX_IDS] for i in range(0, len(user_ids), BATCH_MAX_IDS)]
+    results = await asyncio.gather(
+        *(_fetch_users_chunk(service, batch_path, single_path, id_field, chunk, semaphore) for chunk in chunks)
+    )
+    found: dict[int, dict] = {}
+    complete = True
+    for chunk_found, chunk_complete in results:
+        found.update(chunk_found)
+        complete = complete and chunk_complete
+    return found, complete
+
+
+async def _fetch_users_chunk(
+    service: str,
+    batch_path: str,
+    single_path: str,
+    id_field: str,
+    user_ids: list[int],
+    semaphore: asyncio.Semaphore,
+) -> tuple[dict[int, dict], bool]:
+    resp = await _get(
+        service,
+        batch_path,
+        semaphore,
+        params={"ids": user_ids},
+        headers={"X-Service-Secret": SHARED_SERVICE_SECRET},
+    )
+    if resp is not None and resp.status_code == 200:
+        return {item.get(id_field): item for item in resp.json() or []}, True
+
+    # Upstream without the batch endpoint (or batch failed): one call per id, in parallel
+    responses = await asyncio.gather(
+        *(_get(service, single_path.format(user_id=uid), semaphore) for uid in user_ids)
+    )
+    found: dict[int, dict] = {}
+    complete = True
+    for uid, r in zip(user_ids, responses):
+        if r is not None and r.status_code == 200:
+            found[uid] = r.json()
+        elif r is None or r.status_code != 404:
+            complete = False
+    return found, complete
+
+
 @router.get("/{article_id}/reviewers")
 async def get_article_reviewers(article_id: int, request: Request):
     """
     Aggregated endpoint: returns reviewers assigned to an article with deadlines.
     Access: editor or the article's responsible author.
+
+    Upstream calls run concurrently (bounded by REVIEWERS_FANOUT_CONCURRENCY),
+    each with its own deadline. If some reviewer lookups fail, the reviews are
+    still returned with `partial: true` and missing fields left empty.
     """
     # Validate JWT and get roles
     current = await get_current_user(request)
+    semaphore = asyncio.Semaphore(REVIEWERS_FANOUT_CONCURRENCY)
 
-    # Authorization: allow editors; else verify responsible author via Articles service
-    if "editor" not in (current.get("roles") or []):
-        # Verify author access by calling Article Service's /my/{article_id}
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            raise HTTPException(status_code=401, detail="Missing Authorization header")
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                f"{SERVICE_URLS['articles']}/articles/my/{article_id}",
+    # Fetch reviews while the author access check (if any) is in flight
+    reviews_task = asyncio.ensure_future(_get("reviews", f"/reviews/article/{article_id}", semaphore))
+    try:
+        # Authorization: allow editors; else verify responsible author via Articles service
+        if "editor" not in (current.get("roles") or []):
+            # Verify author access by calling Article Service's /my/{article_id}
+            auth_header = request.headers.get("Authorization")
+            if not auth_header:
+                raise HTTPException(status_code=401, detail="Missing Authorization header")
+            resp = await _get(
+                "articles",
+                f"/articles/my/{article_id}",
+                semaphore,
                 headers={"Authorization": auth_header},
             )
-        if resp.status_code == 404:
-            raise HTTPException(status_code=404, detail="Article not found")
-        if resp.status_code != 200:
-            # 403 or any other -> forbid
-            raise HTTPException(status_code=403, detail="Access denied")
-
-    # Fetch reviews for article
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        rev_resp = await client.get(f"{SERVICE_URLS['reviews']}/reviews/article/{article_id}")
+            if resp is None:
+                raise HTTPException(status_code=504, detail="Article service unavailable")
+            if resp.status_code == 404:
+                raise HTTPException(status_code=404, detail="Article not found")
+            if resp.status_code != 200:
+                # 403 or any other -> forbid
+                raise HTTPException(status_code=403, detail="Access denied")
+        rev_resp = await reviews_task
+    finally:
+        reviews_task.cancel()
+
+    if rev_resp is None:
+        raise HTTPException(status_code=504, detail="Review service unavailable")
     if rev_resp.status_code == 404:
         reviews = []
     elif rev_resp.status_code != 200:
@@ -42,43 +130,35 @@ async def get_article_reviewers(article_id: int, request: Request):
     else:
         reviews = rev_resp.json() or []
 
-    # Enrich reviewers with full info
+    # Enrich reviewers with full info (profile and auth lookups run side by side)
     unique_ids = sorted({r.get("reviewer_id") for r in reviews if r.get("reviewer_id") is not None})
     profiles: dict[int, dict] = {}
+    partial = False
     if unique_ids:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            for uid in unique_ids:
-                prof = None
-                auth = None
-                try:
-                    p = await client.get(f"{SERVICE_URLS['users']}/users/{uid}")
-                    if p.status_code == 200:
-                        prof = p.json()
-                except Exception:
-                    prof = None
-                try:
-                    a = await client.get(f"{SERVICE_URLS['auth']}/auth/users/{uid}")
-                    if a.status_code == 200:
-                        auth = a.json()
-                except Exception:
-                    auth = None
-
-                merged = {
-                    "id": (prof or {}).get("id"),
-                    "user_id": uid,
-                    "full_name": (prof or {}).get("full_name") or (auth or {}).get("full_name"),
-                    "phone": (prof or {}).get("phone"),
-                    "organization": (prof or {}).get("organization") or (auth or {}).get("organization"),
-                    "roles": (prof or {}).get("roles", []),
-                    "preferred_language": (prof or {}).get("preferred_language"),
-                    "is_active": (auth or {}).get("is_active"),
-                    "username": (auth or {}).get("username"),
-                    "email": (auth or {}).get("email"),
-                    "first_name": (auth or {}).get("first_name"),
-                    "last_name": (auth or {}).get("last_name"),
-                    "institution": (auth or {}).get("institution"),
-                }
-                profiles[uid] = merged
+        (prof_by_id, prof_complete), (auth_by_id, auth_complete) = await asyncio.gather(
+            _fetch_users("users", "/users/batch", "/users/{user_id}", "user_id", unique_ids, semaphore),
+            _fetch_users("auth", "/auth/users/batch", "/auth/users/{user_id}", "id", unique_ids, semaphore),
+        )
+        partial = not (prof_complete and auth_complete)
+        for uid in unique_ids:
+            prof = prof_by_id.get(uid)
+            auth = auth_by_id.get(uid)
+            merged = {
+                "id": (prof or {}).get("id"),
+                "user_id": uid,
+                "full_name": (prof or {}).get("full_name") or (auth or {}).get("full_name"),
+                "phone": (prof or {}).get("phone"),
+                "organization": (prof or {}).get("organization") or (auth or {}).get("organization"),
+                "roles": (prof or {}).get("roles", []),
+                "preferred_language": (prof or {}).get("preferred_language"),
+                "is_active": (auth or {}).get("is_active"),
+                "username": (auth or {}).get("username"),
+                "email": (auth or {}).get("email"),
+                "first_name": (auth or {}).get("first_name"),
+                "last_name": (auth or {}).get("last_name"),
+                "institution": (auth or {}).get("institution"),
+            }
+            profiles[uid] = merged
 
     result_reviews = []
     for r in reviews:
@@ -90,11 +170,4 @@ async def get_article_reviewers(article_id: int, request: Request):
             "reviewer": profiles.get(r.get("reviewer_id"))
         })
 
-    return {"article_id": article_id, "reviews": result_reviews}
-
-# Accept /api/articles with or without trailing slash to avoid FastAPI redirects
-@router.api_route("", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-@router.api_route("/", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-@router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-async def proxy(request: Request, path: str = ""):
-    return await proxy_request(SERVICE_URLS["articles"], request)
+    return {"article_id": article_id, "reviews": result_reviews, "partial": partial}
@@ -1,10 +0,0 @@
-from fastapi import APIRouter, Request
-from app.proxy import proxy_request
-from app.config import SERVICE_URLS
-
-router = APIRouter(prefix="/auth")
-
-@router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-async def proxy(path: str, request: Request):
-    service_url = SERVICE_URLS["auth"]
-    return await proxy_request(service_url, request)
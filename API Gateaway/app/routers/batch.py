@@ -0,0 +1,144 @@
+import asyncio
+import base64
+import json
+from typing import Any
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from app.config import API_PREFIX, BATCH_MAX_ITEMS, BATCH_CONCURRENCY
+from app.security import resolve_identity
+
+router = APIRouter()
+
+# Headers a sub-request inherits from the batch call unless it sets its own
+INHERITED_HEADERS = ("authorization", "accept-language", "user-agent")
+
+
+class BatchItem(BaseModel):
+    id: str | None = None
+    method: str = "GET"
+    # Full gateway path, e.g. /api/articles/5?include=authors
+    path: str
+    headers: dict[str, str] = {}
+    body: Any = None
+
+
+def _encode_body(item: BatchItem, headers: dict[str, str]) -> bytes:
+    if item.body is None:
+        return b""
+    if isinstance(item.body, str):
+        headers.setdefault("content-type", "text/plain; charset=utf-8")
+        return item.body.encode()
+    headers.setdefault("content-type", "application/json")
+    return json.dumps(item.body).encode()
+
+
+def _decode_body(headers: dict[str, str], body: bytes) -> dict:
+    if not body:
+        return {"body": None}
+    content_type = headers.get("content-type", "")
+    if "json" in content_type:
+        try:
+            return {"body": json.loads(body)}
+        except ValueError:
+            pass
+    if content_type.startswith("text/") or "json" in content_type:
+        try:
+            return {"body": body.decode()}
+        except UnicodeDecodeError:
+            pass
+    return {"body": base64.b64encode(body).decode(), "encoding": "base64"}
+
+
+async def _dispatch(request: Request, item: BatchItem, state: dict) -> dict:
+    """Run one sub-request through the gateway app itself (routing, auth, proxy_request)."""
+    parts = urlsplit(item.path)
+    headers = {k: v for k, v in request.headers.items() if k in INHERITED_HEADERS}
+    headers.update({k.lower(): v for k, v in item.headers.items()})
+    body = _encode_body(item, headers)
+    headers["content-length"] = str(len(body))
+
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method.upper(),
+        "scheme": request.url.scheme,
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        # Identity resolved once for the whole batch; proxy_request reads it from state
+        "state": dict(state),
+    }
+
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Nothing more to read; block like a client that keeps the connection open
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status = 500
+    response_headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for k, v in message.get("headers", []):
+                response_headers[k.decode("latin-1").lower()] = v.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await request.app(scope, receive, send)
+    response_headers.pop("content-length", None)
+    return {
+        "id": item.id,
+        "status": status,
+        "headers": response_headers,
+        **_decode_body(response_headers, b"".join(chunks)),
+    }
+
+
+@router.post("/batch")
+async def batch(items: list[BatchItem], request: Request):
+    """
+    Execute independent sub-requests concurrently and return their results in order.
+    The caller's token is verified once and reused for every item.
+    """
+    if not items:
+        return []
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    for item in items:
+        if not item.path.startswith(API_PREFIX + "/") or urlsplit(item.path).path.rstrip("/") == f"{API_PREFIX}/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid sub-request path: {item.path}")
+
+    if request.headers.get("Authorization"):
+        resolve_identity(request)
+        if getattr(request.state, "user_id", None) is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    state = {}
+    if getattr(request.state, "user_id", None) is not None:
+        state = {"user_id": request.state.user_id, "roles": request.state.roles}
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(item: BatchItem) -> dict:
+        async with semaphore:
+            try:
+                return await _dispatch(request, item, state)
+            except Exception:
+                return {"id": item.id, "status": 502, "headers": {}, "body": {"detail": "Sub-request failed"}}
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -1,13 +0,0 @@
-from fastapi import APIRouter, Request
-from app.proxy import proxy_request
-from app.config import SERVICE_URLS
-
-router = APIRouter(prefix="/files")
-
-# Accept both /api/files and /api/files/... without FastAPI adding a redirect that
-# breaks streaming uploads in the browser.
-@router.api_route("", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-@router.api_route("/", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-@router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
-async def proxy(request: Request, path: str = ""):
-    return await proxy_request(SERVICE_URLS["files"], request)
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.clients import upstreams
+from app.breaker import retry_budget
+from app.cache import response_cache
+from app.singleflight import coalescer
+from app.ratelimit import rate_limiter
+from app.idempotency import idempotency_store
+from app.security import token_cache, get_current_user
+
+
+async def require_operator(current_user=Depends(get_current_user)):
+    """Gateway internals (upstream topology, cache keys, limiter state) are for editors/admins only."""
+    if not {"editor", "admin"} & set(current_user.get("roles") or []):
+        raise HTTPException(status_code=403, detail="Editor role required")
+    return current_user
+
+
+router = APIRouter(prefix="/gateway", dependencies=[Depends(require_operator)])
+
+
+@router.get("/pools")
+async def pool_stats():
+    # Per-upstream connection pool metrics: in-use/idle connections, in-flight requests, pool wait
+    return upstreams.stats()
+
+
+@router.get("/breakers")
+async def breaker_stats():
+    # Circuit breaker state per upstream plus the shared retry budget
+    return {"upstreams": upstreams.breakers(), "retry_budget": retry_budget.stats()}
+
+
+@router.get("/auth-cache")
+async def auth_cache_stats():
+    # Hit/miss counters of the verified-JWT cache used by get_current_user
+    return token_cache.stats()
+
+
+@router.get("/cache")
+async def response_cache_stats():
+    # Hit/stale/miss/304 counters and size of the public GET response cache
+    return response_cache.stats()
+
+
+@router.get("/coalescing")
+async def coalescing_stats():
+    # Upstream calls started (leaders) vs. requests that joined one in flight (followers)
+    return coalescer.stats()
+
+
+@router.get("/ratelimit")
+async def rate_limit_stats():
+    # Requests allowed vs. rejected with 429, and backend failures (requests let through)
+    return rate_limiter.stats()
+
+
+@router.get("/idempotency")
+async def idempotency_stats():
+    # Stored Idempotency-Key responses, replays, duplicates that waited, and key reuse conflicts
+    return idempotency_store.stats()
+
+
+@router.delete("/cache")
+async def purge_response_cache(prefix: str | None = None):
+    """Purge cached responses, optionally only paths starting with `prefix` (e.g. /volumes/public)."""
+    return {"purged": response_cache.purge(prefix)}
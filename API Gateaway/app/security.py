@@ -1,11 +1,99 @@
+import hashlib
+import time
+from collections import OrderedDict
+
 from fastapi import HTTPException, Request
 from jose import jwt, JWTError
 
-from app.config import SECRET_KEY, ALGORITHM
+from app.metrics import add_timing
+from app.config import SECRET_KEY, ALGORITHM, JWT_CACHE_SIZE, JWT_CACHE_MAX_TTL
 
 
-async def get_current_user(request: Request):
-    """Validate JWT from Authorization header and attach user info to request.state."""
+class TokenCache:
+    """Bounded LRU of verified token claims, keyed by token digest.
+
+    Entries expire at the token's own `exp` (capped by `max_ttl`), so a cached
+    token is never accepted after the point where jwt.decode would reject it.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        claims, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: dict):
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.max_ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        self._entries[key] = (claims, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(JWT_CACHE_SIZE, JWT_CACHE_MAX_TTL)
+
+
+def decode_token(token: str, use_cache: bool = True) -> dict:
+    """Return verified claims for a bearer token, consulting the cache first."""
+    started = time.perf_counter()
+    try:
+        if use_cache:
+            claims = token_cache.get(token)
+            if claims is not None:
+                return claims
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if use_cache:
+            token_cache.put(token, claims)
+        return claims
+    finally:
+        add_timing("auth", time.perf_counter() - started)
+
+
+async def _authenticate(request: Request, use_cache: bool):
     auth_header = request.headers.get("Authorization")
     if not auth_header:
         raise HTTPException(status_code=401, detail="Missing Authorization header")
@@ -19,7 +107,7 @@ async def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail="Invalid authorization scheme")
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token, use_cache=use_cache)
         user_id = payload.get("sub")
         roles = payload.get("roles", [])
         if user_id is None:
@@ -33,3 +121,41 @@ async def get_current_user(request: Request):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+
+def resolve_identity(request: Request):
+    """Best-effort: attach user info from a valid bearer token without failing the request.
+
+    Used by the proxy for routes that do not require authentication; a missing or
+    invalid token simply leaves request.state untouched and the upstream decides.
+    """
+    if getattr(request.state, "user_id", None) is not None:
+        return
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return
+    parts = auth_header.split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return
+    try:
+        payload = decode_token(parts[1])
+    except JWTError:
+        return
+    user_id = payload.get("sub")
+    # Tokens without roles (e.g. refresh tokens) keep the upstream's own defaults
+    if user_id is None or "roles" not in payload:
+        return
+    try:
+        request.state.user_id = int(user_id)
+    except (TypeError, ValueError):
+        return
+    request.state.roles = payload.get("roles") or []
+
+
+async def get_current_user(request: Request):
+    """Validate JWT from Authorization header and attach user info to request.state."""
+    return await _authenticate(request, use_cache=True)
+
+
+async def get_current_user_uncached(request: Request):
+    """Same as get_current_user but always re-verifies the token (for sensitive routes)."""
+    return await _authenticate(request, use_cache=False)
@@ -0,0 +1,61 @@
+"""Thundering herd on one file: N identical concurrent GETs through the proxy.
+
+Compares upstream calls and client latency with coalescing on and off, for a
+file small enough to share and one above COALESCE_MAX_BYTES (streamed to the
+first caller, the rest fetch their own).
+
+    python -m benchmarks.coalescing [concurrency]
+"""
+import asyncio
+import sys
+
+from app import proxy
+from app.clients import UpstreamPool, upstreams
+from app.config import SERVICE_URLS
+from app.singleflight import coalescer
+from benchmarks.stub import gateway_request, json_app, read, serve, summary, timed
+
+FILES = SERVICE_URLS["files"]
+DELAY = 0.05
+upstream_calls = [0]
+
+
+async def stub(path, query):
+    upstream_calls[0] += 1
+    await asyncio.sleep(DELAY)
+    return 200, {"path": path, "data": "x" * 4096}
+
+
+async def herd(concurrency: int, label: str):
+    async def get():
+        response = await proxy.proxy_request(FILES, gateway_request("/api/files/7"))
+        assert response.status_code == 200
+        await read(response)
+
+    upstream_calls[0] = 0
+    durations = await timed(get, concurrency, concurrency)
+    print(summary(label, durations), f"upstream_calls={upstream_calls[0]}")
+
+
+async def run(base_url: str, concurrency: int):
+    upstreams._pools["files"] = UpstreamPool("files", FILES, [base_url])
+    routes = proxy.COALESCE_ROUTES
+    for label, coalesce, max_bytes in (
+        ("no coalescing", [], proxy.COALESCE_MAX_BYTES),
+        ("coalesced", routes, proxy.COALESCE_MAX_BYTES),
+        ("coalesced, too large", routes, 1024),
+    ):
+        proxy.COALESCE_ROUTES, proxy.COALESCE_MAX_BYTES = coalesce, max_bytes
+        await herd(concurrency, label)
+    print("coalescer:", coalescer.stats())
+    await upstreams.close()
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with serve(json_app(stub)) as base_url:
+        asyncio.run(run(base_url, concurrency))
+
+
+if __name__ == "__main__":
+    main()
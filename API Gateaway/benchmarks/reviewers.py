@@ -0,0 +1,73 @@
+"""GET /articles/{id}/reviewers latency with 1, 10 and 50 reviewers against stub upstreams.
+
+Each stub call takes DELAY seconds. "batch" uses the /users/batch endpoints,
+"per-id" is an upstream without them (one call per reviewer, fanned out), and
+"serial" is per-id with a concurrency of 1, i.e. the old 2 x N round trips.
+
+    python -m benchmarks.reviewers [rounds]
+"""
+import asyncio
+import sys
+import time
+
+from jose import jwt
+
+from app.clients import UpstreamPool, upstreams
+from app.config import ALGORITHM, SECRET_KEY, SERVICE_URLS
+from app.routers import articles
+from benchmarks.stub import gateway_request, json_app, serve, summary, timed
+
+DELAY = 0.005
+STUBBED = ("reviews", "users", "auth")
+MODES = {
+    "batch": (True, articles.REVIEWERS_FANOUT_CONCURRENCY),
+    "per-id": (False, articles.REVIEWERS_FANOUT_CONCURRENCY),
+    "serial": (False, 1),
+}
+settings = {"reviewers": 1, "batch": True}
+
+
+async def stub(path, query):
+    await asyncio.sleep(DELAY)
+    if path.startswith("/reviews/article/"):
+        return 200, [{"id": uid, "reviewer_id": uid, "status": "assigned"} for uid in range(1, settings["reviewers"] + 1)]
+    if path.endswith("/batch"):
+        if not settings["batch"]:
+            return 404, {"detail": "Not Found"}
+        ids = [int(part[4:]) for part in query.split("&") if part.startswith("ids=")]
+        return 200, [{"id": uid, "user_id": uid, "full_name": f"User {uid}"} for uid in ids]
+    uid = int(path.rsplit("/", 1)[1])
+    return 200, {"id": uid, "user_id": uid, "full_name": f"User {uid}"}
+
+
+def editor_request():
+    token = jwt.encode({"sub": "1", "roles": ["editor"], "exp": int(time.time()) + 3600}, SECRET_KEY, algorithm=ALGORITHM)
+    return gateway_request("/api/articles/1/reviewers", {"authorization": f"Bearer {token}"})
+
+
+async def run(base_url: str, rounds: int):
+    # Point the stubbed services' pools at the stub (requests are routed to the replica URL)
+    for name in STUBBED:
+        upstreams._pools[name] = UpstreamPool(name, SERVICE_URLS[name], [base_url])
+
+    async def call():
+        result = await articles.get_article_reviewers(1, editor_request())
+        assert not result["partial"] and len(result["reviews"]) == settings["reviewers"]
+
+    for reviewers in (1, 10, 50):
+        for mode, (batch, concurrency) in MODES.items():
+            settings.update(reviewers=reviewers, batch=batch)
+            articles.REVIEWERS_FANOUT_CONCURRENCY = concurrency
+            await timed(call, 3, 1)
+            print(summary(f"{reviewers:>2} reviewers, {mode}", await timed(call, rounds, 1)))
+    await upstreams.close()
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with serve(json_app(stub)) as base_url:
+        asyncio.run(run(base_url, rounds))
+
+
+if __name__ == "__main__":
+    main()
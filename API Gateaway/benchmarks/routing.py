@@ -0,0 +1,67 @@
+"""Route resolution cost: the prefix-trie dispatcher vs one catch-all route per prefix.
+
+The baseline mirrors the old layout: the gateway's own routes followed by a
+"{prefix}" and a "{prefix}/{path:path}" route per PROXY_ROUTES entry, each tried
+in order by Starlette's regex matching.
+
+    python -m benchmarks.routing [iterations]
+"""
+import sys
+import time
+
+from starlette.routing import Match, Route
+
+from app.config import API_PREFIX, PROXY_ROUTES
+from app.dispatch import PROXY_METHODS
+from app.main import app
+
+PATHS = [
+    ("GET", "/api/articles/42"),
+    ("GET", "/api/articles/42/reviewers"),
+    ("POST", "/api/files/upload"),
+    ("GET", "/api/notifications/unread"),
+    ("GET", "/api/analytics/summary/2024"),
+    ("GET", "/api/gateway/pools"),
+    ("GET", "/api/unknown/path"),
+]
+
+
+async def proxied(request):
+    pass
+
+
+def catch_all_routes() -> list:
+    own = app.router.routes[1:]
+    per_prefix = []
+    for prefix in PROXY_ROUTES:
+        per_prefix.append(Route(f"{API_PREFIX}{prefix}", proxied, methods=PROXY_METHODS))
+        per_prefix.append(Route(f"{API_PREFIX}{prefix}/{{path:path}}", proxied, methods=PROXY_METHODS))
+    return own + per_prefix
+
+
+def resolve(routes: list, scope: dict):
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def per_lookup(label: str, routes: list, iterations: int):
+    scopes = [{"type": "http", "method": m, "path": p, "root_path": "", "headers": []} for m, p in PATHS]
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for scope in scopes:
+            resolve(routes, scope)
+    seconds = (time.perf_counter() - started) / (iterations * len(scopes))
+    print(f"{label:<28} {len(routes):>3} routes  {seconds * 1e6:6.2f}us/lookup")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    per_lookup("catch-all route per prefix", catch_all_routes(), iterations)
+    per_lookup("prefix-trie dispatcher", app.router.routes, iterations)
+
+
+if __name__ == "__main__":
+    main()
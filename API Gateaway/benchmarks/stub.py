@@ -0,0 +1,91 @@
+"""Local stub upstreams for the gateway benchmarks (run from the API Gateaway directory)."""
+import asyncio
+import json
+import socket
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+from starlette.requests import Request
+
+
+def json_app(handler):
+    """Tiny ASGI app: ``await handler(path, query)`` returns (status, payload) sent as JSON."""
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        status, payload = await handler(scope["path"], scope["query_string"].decode())
+        body = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(app):
+    """Run ``app`` with uvicorn in a background thread; yields its base URL."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+async def timed(fn, count: int, concurrency: int) -> list[float]:
+    """Run ``await fn()`` ``count`` times, ``concurrency`` at a time; returns per-call seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await fn()
+            durations.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return durations
+
+
+def summary(label: str, durations: list[float]) -> str:
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f"{label:<28} n={len(ordered):<6} p50={statistics.median(ordered) * 1000:7.2f}ms "
+        f"p99={p99 * 1000:7.2f}ms max={ordered[-1] * 1000:7.2f}ms"
+    )
+
+
+def gateway_request(path: str, headers: dict | None = None, query: str = "") -> Request:
+    """A bodiless GET as the gateway's routes receive it."""
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+async def read(response) -> bytes:
+    if hasattr(response, "body_iterator"):
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return response.body
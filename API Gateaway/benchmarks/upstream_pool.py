@@ -0,0 +1,47 @@
+"""Upstream call latency: a new httpx client per request vs the pooled UpstreamPool.
+
+    python -m benchmarks.upstream_pool [requests] [concurrency]
+"""
+import asyncio
+import sys
+
+import httpx
+
+from app.clients import UpstreamPool
+from benchmarks.stub import json_app, serve, summary, timed
+
+
+async def ok(path, query):
+    return 200, {"id": 1, "title": "stub"}
+
+
+async def run(base_url: str, count: int, concurrency: int):
+    url = base_url + "/articles/1"
+
+    async def per_request_client():
+        async with httpx.AsyncClient() as client:
+            (await client.get(url)).raise_for_status()
+
+    pool = UpstreamPool("bench", base_url)
+
+    async def pooled():
+        (await pool.get(url)).raise_for_status()
+
+    # Warm up both paths (imports, first connections) before measuring
+    await timed(per_request_client, 20, concurrency)
+    await timed(pooled, 20, concurrency)
+    print(summary("new client per request", await timed(per_request_client, count, concurrency)))
+    print(summary("pooled UpstreamPool", await timed(pooled, count, concurrency)))
+    print("pool:", {k: v for k, v in pool.stats().items() if k != "replicas"})
+    await pool.aclose()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with serve(json_app(ok)) as base_url:
+        asyncio.run(run(base_url, count, concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.config import ALGORITHM, SECRET_KEY, SERVICE_URLS, SHARED_SERVICE_SECRET
+from app.routers import articles
+
+from conftest import make_request, reply
+
+USERS = SERVICE_URLS["users"]
+AUTH = SERVICE_URLS["auth"]
+REVIEWS = SERVICE_URLS["reviews"]
+
+
+@pytest.mark.anyio
+async def test_user_lookup_is_chunked_and_carries_service_secret(upstream):
+    async def batch(request):
+        if request.headers.get("x-service-secret") != SHARED_SERVICE_SECRET:
+            return reply(403)
+        ids = [int(v) for v in request.url.params.get_list("ids")]
+        if len(ids) > articles.BATCH_MAX_IDS:
+            return reply(422)
+        return reply(200, json=[{"user_id": uid} for uid in ids])
+
+    calls = upstream(USERS, batch)
+    user_ids = list(range(1, 251))
+
+    found, complete = await articles._fetch_users(
+        "users", "/users/batch", "/users/{user_id}", "user_id", user_ids, asyncio.Semaphore(10)
+    )
+
+    assert complete
+    assert sorted(found) == user_ids
+    assert sorted(len(c.url.params.get_list("ids")) for c in calls.calls) == [50, 100, 100]
+
+
+def editor_request(article_id: int = 1):
+    token = jwt.encode({"sub": "1", "roles": ["editor"], "exp": int(time.time()) + 60}, SECRET_KEY, algorithm=ALGORITHM)
+    return make_request("GET", f"/api/articles/{article_id}/reviewers", {"authorization": f"Bearer {token}"})
+
+
+def reviews_of(reviewer_ids):
+    async def handler(request):
+        return reply(200, json=[{"id": 100 + uid, "reviewer_id": uid, "status": "assigned"} for uid in reviewer_ids])
+
+    return handler
+
+
+def per_id_users(id_field: str, delay: float = 0.0, slow_ids=(), tracker=None):
+    """Upstream without a batch endpoint: 404 on /batch, one record per id otherwise."""
+    async def handler(request):
+        if request.url.path.endswith("/batch"):
+            return reply(404)
+        uid = int(request.url.path.rsplit("/", 1)[1])
+        if tracker is not None:
+            tracker.enter()
+        try:
+            await asyncio.sleep(10 if uid in slow_ids else delay)
+        finally:
+            if tracker is not None:
+                tracker.leave()
+        return reply(200, json={id_field: uid, "full_name": f"{id_field} {uid}"})
+
+    return handler
+
+
+class Tracker:
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    def enter(self):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+
+    def leave(self):
+        self.current -= 1
+
+
+@pytest.mark.anyio
+async def test_per_id_fallback_runs_concurrently_within_the_limit(upstream, monkeypatch):
+    monkeypatch.setattr(articles, "REVIEWERS_FANOUT_CONCURRENCY", 10)
+    tracker = Tracker()
+    reviewer_ids = list(range(1, 51))
+    upstream(REVIEWS, reviews_of(reviewer_ids))
+    profile_calls = upstream(USERS, per_id_users("user_id", delay=0.01, tracker=tracker))
+    auth_calls = upstream(AUTH, per_id_users("id", delay=0.01, tracker=tracker))
+
+    result = await articles.get_article_reviewers(1, editor_request())
+
+    assert not result["partial"]
+    assert [r["reviewer"]["user_id"] for r in result["reviews"]] == reviewer_ids
+    assert len(profile_calls.calls) == len(auth_calls.calls) == 1 + len(reviewer_ids)
+    assert 1 < tracker.peak <= 10
+
+
+@pytest.mark.anyio
+async def test_slow_lookup_returns_partial_result(upstream, monkeypatch):
+    monkeypatch.setattr(articles, "REVIEWERS_CALL_TIMEOUT", 0.1)
+    upstream(REVIEWS, reviews_of([1, 2, 3]))
+    upstream(USERS, per_id_users("user_id", slow_ids={2}))
+    upstream(AUTH, per_id_users("id"))
+
+    result = await articles.get_article_reviewers(1, editor_request())
+
+    assert result["partial"]
+    reviewers = {r["reviewer_id"]: r["reviewer"] for r in result["reviews"]}
+    assert reviewers[1]["full_name"] == "user_id 1"
+    # The profile lookup timed out; the auth record still fills in what it can
+    assert reviewers[2]["full_name"] == "id 2"
+    assert reviewers[2]["phone"] is None
+
+
+@pytest.mark.anyio
+async def test_unavailable_review_service_is_a_gateway_timeout(upstream, monkeypatch):
+    async def down(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    monkeypatch.setattr("app.clients.UPSTREAM_RETRIES", 0)
+    upstream(REVIEWS, down)
+
+    with pytest.raises(HTTPException) as exc:
+        await articles.get_article_reviewers(1, editor_request())
+    assert exc.value.status_code == 504
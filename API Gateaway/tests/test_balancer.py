@@ -0,0 +1,119 @@
+import asyncio
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from app import balancer, clients
+from app.clients import upstreams
+from app.config import LB_EJECT_FAILURES, LB_SLOW_START_SECONDS, SERVICE_URLS
+
+from conftest import reply
+
+ARTICLES = SERVICE_URLS["articles"]
+REPLICAS = ["http://articles-1:8000", "http://articles-2:8000", "http://articles-3:8000"]
+SLOW, FAST_1, FAST_2 = "articles-1", "articles-2", "articles-3"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def replicas(monkeypatch, upstream):
+    """Three articles replicas served by one handler that sees which replica was picked."""
+    monkeypatch.setitem(clients.SERVICE_REPLICAS, "articles", REPLICAS)
+    random.seed(1)
+
+    def install(handler):
+        return upstream(ARTICLES, handler)
+
+    return install
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the balancer's view of time; the event loop keeps the real monotonic clock
+    monkeypatch.setattr(balancer, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def latency(delays: dict[str, float], failing: set[str] = frozenset()):
+    async def handler(request):
+        await asyncio.sleep(delays.get(request.url.host, 0.001))
+        return reply(503 if request.url.host in failing else 200, json={"replica": request.url.host})
+
+    return handler
+
+
+async def load(method: str, count: int, concurrency: int = 10) -> list:
+    pool = upstreams.pool("articles")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await pool.request(method, ARTICLES + "/articles/1")
+
+    return await asyncio.gather(*(one() for _ in range(count)))
+
+
+def shares(calls, start: int = 0) -> Counter:
+    return Counter(call.url.host for call in calls.calls[start:])
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("policy", ["p2c", "least_outstanding"])
+async def test_traffic_moves_away_from_slow_replica(replicas, policy):
+    calls = replicas(latency({SLOW: 0.05, FAST_1: 0.002, FAST_2: 0.002}))
+    upstreams.pool("articles").balancer.policy = policy
+
+    await load("GET", 300)
+
+    served = shares(calls)
+    assert sum(served.values()) == 300
+    assert served[SLOW] < 300 * 0.15
+    assert served[FAST_1] > served[SLOW] and served[FAST_2] > served[SLOW]
+
+
+@pytest.mark.anyio
+async def test_failing_replica_is_ejected(replicas, clock):
+    calls = replicas(latency({}, failing={FAST_2}))
+
+    await load("POST", 50)
+    before = len(calls.calls)
+    responses = await load("POST", 100)
+
+    # Calls already in flight when it was ejected still land there, later ones do not
+    assert shares(calls, 0)[FAST_2] >= LB_EJECT_FAILURES
+    assert shares(calls, before)[FAST_2] == 0
+    assert all(r.status_code == 200 for r in responses)
+    stats = {r["url"]: r for r in upstreams.pool("articles").balancer.stats()}
+    assert stats["http://articles-3:8000"]["ejected"]
+    assert stats["http://articles-3:8000"]["ejections"] == 1
+
+
+@pytest.mark.anyio
+async def test_recovered_replica_ramps_back_up(replicas, clock):
+    failing = {FAST_2}
+    calls = replicas(latency({SLOW: 0.005, FAST_1: 0.005, FAST_2: 0.005}, failing))
+    await load("POST", 30)
+    failing.clear()
+    replica = next(r for r in upstreams.pool("articles").balancer.replicas if r.url.endswith("articles-3:8000"))
+    recovered_at = replica.ejected_until
+
+    share = []
+    for ramp in (0.0, 0.5, 1.0):
+        clock.now = recovered_at + ramp * LB_SLOW_START_SECONDS
+        start = len(calls.calls)
+        await load("GET", 150)
+        share.append(shares(calls, start)[FAST_2] / 150)
+
+    assert share[0] < share[1] < share[2]
+    assert share[0] < 0.15
+    assert share[2] > 0.25
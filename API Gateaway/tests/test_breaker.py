@@ -0,0 +1,81 @@
+import pytest
+
+from app import clients
+from app.breaker import CLOSED, OPEN, CircuitBreaker
+from app.clients import upstreams
+from app.config import BREAKER_MIN_CALLS, SERVICE_URLS
+
+from conftest import reply
+
+ARTICLES = SERVICE_URLS["articles"]
+FILES = SERVICE_URLS["files"]
+LAYOUT = SERVICE_URLS["layout"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def slow_upstream(clock: Clock, seconds: float, status_code: int = 200):
+    async def handler(request):
+        clock.now += seconds
+        return reply(status_code, json={"ok": True})
+
+    return handler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(clients.time, "perf_counter", clock)
+    return clock
+
+
+def test_failures_open_the_breaker():
+    breaker = CircuitBreaker("svc", window=10, min_calls=4, failure_rate=0.5)
+    for ok in (True, False, True):
+        breaker.record(ok, 0.01)
+    assert breaker.state == CLOSED
+
+    breaker.record(False, 0.01)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_slow_call_threshold_can_be_overridden_per_call():
+    breaker = CircuitBreaker("svc", window=4, min_calls=4, failure_rate=0.5, slow_call_seconds=5)
+    for _ in range(4):
+        breaker.record(True, 6, slow_call_seconds=30)
+    assert breaker.state == CLOSED
+
+    for _ in range(4):
+        breaker.record(True, 6)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.anyio
+async def test_slow_calls_on_default_route_open_the_breaker(upstream, clock):
+    upstream(ARTICLES, slow_upstream(clock, 6))
+    pool = upstreams.pool("articles")
+
+    for _ in range(BREAKER_MIN_CALLS):
+        await pool.get(ARTICLES + "/articles/1", timeout=clients.route_timeout("/articles/1"))
+
+    assert pool.breaker.state == OPEN
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("service_url, path, seconds", [(FILES, "/files/7", 25), (LAYOUT, "/layout/3/pdf", 12)])
+async def test_long_timeout_routes_are_not_slow_within_their_own_threshold(upstream, clock, service_url, path, seconds):
+    upstream(service_url, slow_upstream(clock, seconds))
+    pool = upstreams.pool_for_url(service_url)
+
+    for _ in range(BREAKER_MIN_CALLS):
+        await pool.get(service_url + path, timeout=clients.route_timeout(path))
+
+    assert pool.breaker.state == CLOSED
@@ -0,0 +1,99 @@
+import httpx
+import pytest
+
+from app import proxy
+from app.clients import UpstreamRegistry, route_timeout, upstreams
+from app.config import SERVICE_URLS, UPSTREAM_TIMEOUT
+
+from conftest import make_request, read_body, reply
+
+ARTICLES = SERVICE_URLS["articles"]
+FILES = SERVICE_URLS["files"]
+
+
+async def ok(request):
+    return reply(200, json={"ok": True})
+
+
+def test_one_pool_per_service():
+    assert upstreams.pool("articles") is upstreams.pool_for_url(ARTICLES)
+    assert upstreams.pool("articles") is not upstreams.pool("files")
+
+
+def test_unknown_upstream_gets_its_own_pool():
+    pool = upstreams.pool_for_url("http://elsewhere:9000")
+
+    assert pool is upstreams.pool_for_url("http://elsewhere:9000")
+    assert pool.base_url == "http://elsewhere:9000"
+
+
+@pytest.mark.parametrize(
+    "path, read",
+    [
+        ("/files/7", 60.0),
+        ("/files", 60.0),
+        ("/layout/3/pdf", 30.0),
+        ("/articles/my", 30.0),
+        ("/articles/my/5", 30.0),
+        ("/articles/5", UPSTREAM_TIMEOUT),
+        ("/filesystem", UPSTREAM_TIMEOUT),
+    ],
+)
+def test_route_timeout_uses_longest_prefix(path, read):
+    assert route_timeout(path).read == read
+
+
+@pytest.mark.anyio
+async def test_proxied_calls_reuse_the_pool_client_with_route_timeout(upstream):
+    calls = upstream(FILES, ok)
+
+    # Authorized requests are never coalesced, so each one reaches the upstream
+    for _ in range(3):
+        response = await proxy.proxy_request(FILES, make_request("GET", "/api/files/7", {"authorization": "Bearer x"}))
+        assert await read_body(response) == b'{"ok":true}'
+
+    pool = upstreams.pool("files")
+    assert len(calls.calls) == 3
+    assert pool.stats()["requests_total"] == 3
+    assert pool.stats()["in_flight"] == 0
+    assert {call.extensions["timeout"]["read"] for call in calls.calls} == {60.0}
+
+
+@pytest.mark.anyio
+async def test_streamed_response_stays_in_flight_until_closed(upstream):
+    upstream(ARTICLES, ok)
+    pool = upstreams.pool("articles")
+
+    resp = await pool.send(pool.client.build_request("GET", ARTICLES + "/articles/1"), stream=True)
+    assert pool.in_flight == 1
+
+    await pool.close(resp)
+    assert pool.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_registry_close_closes_every_pool():
+    registry = UpstreamRegistry({"a": "http://a:8000", "b": "http://b:8000"})
+    registry.start()
+    pools = registry.pools()
+
+    await registry.close()
+
+    assert set(pools) == {"a", "b"}
+    assert all(pool.client.is_closed for pool in pools.values())
+    assert registry.pools() == {}
+
+
+def test_lifespan_opens_and_closes_pools(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    registry = UpstreamRegistry({"articles": ARTICLES})
+    monkeypatch.setattr("app.main.upstreams", registry)
+
+    with TestClient(app):
+        pool = registry.pools()["articles"]
+        assert not pool.client.is_closed
+
+    assert pool.client.is_closed
+    assert registry.pools() == {}
@@ -0,0 +1,92 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.routing import Match
+
+from app import dispatch
+from app.config import API_PREFIX, SERVICE_URLS
+from app.main import app
+
+from conftest import reply
+
+ARTICLES = SERVICE_URLS["articles"]
+
+
+def scope(method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "root_path": "", "headers": []}
+
+
+@pytest.fixture
+def dispatcher() -> dispatch.ProxyDispatchRoute:
+    route = app.router.routes[0]
+    assert isinstance(route, dispatch.ProxyDispatchRoute)
+    return route
+
+
+@pytest.mark.parametrize(
+    "path, prefix",
+    [
+        ("/articles", "/articles"),
+        ("/articles/5/versions", "/articles"),
+        ("/volumes/public", "/volumes"),
+        ("/users/me", "/users"),
+        ("/articlesx", None),
+        ("/gateway/pools", None),
+        ("/", None),
+    ],
+)
+def test_trie_finds_longest_configured_prefix(path, prefix):
+    target = dispatch.build_trie().lookup(path)
+    assert (target.prefix if target else None) == prefix
+
+
+def test_auth_policy_comes_from_the_route_table():
+    trie = dispatch.build_trie()
+    assert trie.lookup("/users/me").auth_required
+    assert not trie.lookup("/articles/1").auth_required
+
+
+@pytest.mark.parametrize(
+    "method, path, match",
+    [
+        ("GET", "/api/articles/5", Match.FULL),
+        ("DELETE", "/api/files/5", Match.FULL),
+        # Explicit aggregated route registered under a proxied prefix
+        ("GET", "/api/articles/5/reviewers", Match.NONE),
+        ("HEAD", "/api/articles/5/reviewers", Match.NONE),
+        ("POST", "/api/articles/5/reviewers", Match.FULL),
+        # Gateway-owned and unknown paths fall through to the regular routes
+        ("GET", "/api/gateway/pools", Match.NONE),
+        ("GET", "/api/unknown", Match.NONE),
+        ("GET", "/metrics", Match.NONE),
+    ],
+)
+def test_dispatcher_matches_only_proxied_paths(dispatcher, method, path, match):
+    assert dispatcher.matches(scope(method, path))[0] == match
+
+
+def test_route_label_is_the_prefix_template(dispatcher):
+    _, child = dispatcher.matches(scope("GET", "/api/articles/5/versions"))
+    assert child["route"].path == f"{API_PREFIX}/articles/{{path:path}}"
+
+
+def test_proxied_request_reaches_the_service(upstream):
+    async def handler(request):
+        return reply(200, json={"path": request.url.path})
+
+    calls = upstream(ARTICLES, handler)
+
+    response = TestClient(app).get("/api/articles/5/versions", params={"page": 2})
+
+    assert response.status_code == 200
+    assert response.json() == {"path": "/articles/5/versions"}
+    assert str(calls.calls[0].url.params) == "page=2"
+
+
+def test_auth_required_prefix_rejects_anonymous_calls_before_proxying(upstream):
+    async def handler(request):
+        return reply(200, json={})
+
+    calls = upstream(SERVICE_URLS["users"], handler)
+
+    assert TestClient(app).get("/api/users/me").status_code == 401
+    assert calls.calls == []
@@ -0,0 +1,41 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.config import ALGORITHM, SECRET_KEY
+from app.routers import gateway
+
+DIAGNOSTICS = ["/pools", "/breakers", "/auth-cache", "/cache", "/coalescing", "/ratelimit", "/idempotency"]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(gateway.router)
+    return TestClient(app)
+
+
+def bearer(roles: list[str]) -> dict:
+    token = jwt.encode({"sub": "1", "roles": roles, "exp": int(time.time()) + 60}, SECRET_KEY, algorithm=ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.parametrize("path", DIAGNOSTICS)
+def test_diagnostics_require_authentication(client, path):
+    assert client.get(f"/gateway{path}").status_code == 401
+
+
+@pytest.mark.parametrize("path", DIAGNOSTICS)
+def test_diagnostics_require_editor_or_admin(client, path):
+    assert client.get(f"/gateway{path}", headers=bearer(["author"])).status_code == 403
+    assert client.get(f"/gateway{path}", headers=bearer(["editor"])).status_code == 200
+    assert client.get(f"/gateway{path}", headers=bearer(["admin"])).status_code == 200
+
+
+def test_cache_purge_requires_editor(client):
+    assert client.delete("/gateway/cache").status_code == 401
+    assert client.delete("/gateway/cache", headers=bearer(["reviewer"])).status_code == 403
+    assert client.delete("/gateway/cache", headers=bearer(["editor"])).json() == {"purged": 0}
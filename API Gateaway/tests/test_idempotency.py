@@ -0,0 +1,126 @@
+import gzip
+import json
+
+import pytest
+
+from app import idempotency
+from app.config import COMPRESSION_MIN_BYTES
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+BODY = json.dumps({"id": 1, "abstract": "x" * (COMPRESSION_MIN_BYTES + 100)}).encode()
+
+
+class Upstream:
+    """ASGI app standing in for the proxy: records what it was asked, returns a JSON body in two chunks."""
+
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.accept_encodings = []
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope["headers"])
+        self.accept_encodings.append(headers.get(b"accept-encoding"))
+        while (await receive()).get("more_body"):
+            pass
+        await send({
+            "type": "http.response.start",
+            "status": self.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(BODY)).encode()),
+                (b"etag", b'"v1"'),
+                (b"set-cookie", b"a=1"),
+                (b"set-cookie", b"b=2"),
+            ],
+        })
+        half = len(BODY) // 2
+        await send({"type": "http.response.body", "body": BODY[:half], "more_body": True})
+        await send({"type": "http.response.body", "body": BODY[half:]})
+
+
+async def call(app, accept_encoding: str | None):
+    headers = [(b"idempotency-key", b"k1"), (b"content-type", b"application/json")]
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    scope = {
+        "type": "http",
+        "method": "PATCH",
+        "path": "/api/articles/1",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("10.0.0.1", 1234),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"title_en": "t"}', "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], start["headers"], body
+
+
+def header(headers, name: bytes) -> bytes | None:
+    return next((v for k, v in headers if k == name), None)
+
+
+@pytest.fixture
+def middleware(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_ENABLED", True)
+    upstream = Upstream()
+    return IdempotencyMiddleware(upstream, IdempotencyStore(100, 1024 * 1024, 60)), upstream
+
+
+@pytest.mark.anyio
+async def test_replay_is_encoded_for_the_retry_not_the_first_request(middleware):
+    app, upstream = middleware
+
+    status, headers, body = await call(app, "gzip")
+    assert status == 200
+    assert header(headers, b"content-encoding") == b"gzip"
+    assert header(headers, b"content-length") is None
+    assert gzip.decompress(body) == BODY
+
+    status, headers, body = await call(app, None)
+    assert header(headers, b"idempotent-replayed") == b"true"
+    assert header(headers, b"content-encoding") is None
+    assert body == BODY
+
+    status, headers, body = await call(app, "gzip, deflate")
+    assert header(headers, b"content-encoding") == b"gzip"
+    assert int(header(headers, b"content-length")) == len(body)
+    assert gzip.decompress(body) == BODY
+
+    # The upstream ran once and was asked for an unencoded body
+    assert upstream.accept_encodings == [b"identity"]
+
+
+@pytest.mark.anyio
+async def test_identity_first_request_replays_compressed(middleware):
+    app, _ = middleware
+
+    _, headers, body = await call(app, "identity")
+    assert header(headers, b"content-encoding") is None
+    assert body == BODY
+
+    _, headers, body = await call(app, "gzip")
+    assert header(headers, b"content-encoding") == b"gzip"
+    assert header(headers, b"etag") == b'W/"v1"'
+    assert [v for k, v in headers if k == b"set-cookie"] == [b"a=1", b"b=2"]
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.anyio
+async def test_non_compressible_status_passes_through(monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_ENABLED", True)
+    app = IdempotencyMiddleware(Upstream(status=201), IdempotencyStore(100, 1024 * 1024, 60))
+
+    for _ in range(2):
+        status, headers, body = await call(app, "gzip")
+        assert status == 201
+        assert header(headers, b"content-encoding") is None
+        assert body == BODY
@@ -0,0 +1,115 @@
+import os
+import resource
+import sys
+
+import httpx
+import pytest
+
+from app import proxy
+from app.config import SERVICE_URLS
+
+from conftest import make_request, read_body, reply
+
+ARTICLES = SERVICE_URLS["articles"]
+CHUNK = 64 * 1024
+
+
+async def trailing_slash_redirect(request: httpx.Request) -> httpx.Response:
+    # FastAPI answers POST /articles with a 307 to /articles/
+    if request.url.path == "/articles":
+        return reply(307, headers={"location": f"{ARTICLES}/articles/"})
+    body = await request.aread()
+    return reply(200, json={"path": request.url.path, "received": len(body)})
+
+
+@pytest.mark.anyio
+async def test_small_post_follows_upstream_redirect(upstream):
+    calls = upstream(ARTICLES, trailing_slash_redirect)
+    body = b'{"title_en": "x"}'
+    request = make_request("POST", "/api/articles", {"content-type": "application/json", "content-length": str(len(body))}, [body])
+
+    response = await proxy.proxy_request(ARTICLES, request)
+
+    assert response.status_code == 200
+    assert b'"received":17' in await read_body(response)
+    assert [c.url.path for c in calls.calls] == ["/articles", "/articles/"]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("declared", [True, False], ids=["content-length", "chunked"])
+async def test_streamed_post_returns_redirect_instead_of_replaying(upstream, monkeypatch, declared):
+    monkeypatch.setattr(proxy, "PROXY_BUFFER_REQUEST_BYTES", 1024)
+    calls = upstream(ARTICLES, trailing_slash_redirect)
+    chunks = [b"x" * 1000] * 4
+    headers = {"content-length": "4000"} if declared else {"transfer-encoding": "chunked"}
+
+    response = await proxy.proxy_request(ARTICLES, make_request("POST", "/api/articles", headers, chunks))
+
+    # The consumed stream cannot be resent: the client gets the redirect, pointed at the gateway
+    assert response.status_code == 307
+    assert response.headers["location"] == "/api/articles/"
+    assert len(calls.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_stream_error_is_a_bad_gateway(upstream):
+    async def consumed(request):
+        raise httpx.StreamConsumed()
+
+    upstream(ARTICLES, consumed)
+    response = await proxy.proxy_request(ARTICLES, make_request("POST", "/api/articles", {"content-length": "2"}, [b"{}"]))
+
+    assert response.status_code == 502
+
+
+def _peak_rss_bytes() -> int:
+    # Peak resident size of the process so far (kilobytes on Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RepeatedChunks(httpx.AsyncByteStream):
+    def __init__(self, total: int):
+        self.total = total
+
+    async def __aiter__(self):
+        chunk = b"\0" * CHUNK
+        for _ in range(self.total // CHUNK):
+            yield chunk
+
+
+@pytest.mark.anyio
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss units differ outside Linux")
+async def test_500_mb_upload_and_download_stay_at_constant_memory(upstream, monkeypatch):
+    total = int(os.getenv("PROXY_MEMORY_TEST_MB", "500")) * 1024 * 1024
+    ceiling = 64 * 1024 * 1024
+    monkeypatch.setattr(proxy, "MAX_REQUEST_BODY_BYTES", 2 * total)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            received = 0
+            async for chunk in request.stream:
+                received += len(chunk)
+            return reply(200, json={"received": received})
+        return httpx.Response(200, headers={"content-length": str(total), "etag": '"v1"'}, stream=RepeatedChunks(total))
+
+    upstream(ARTICLES, handler)
+    baseline = _peak_rss_bytes()
+
+    chunk = b"\0" * CHUNK
+    upload = make_request(
+        "POST", "/api/articles/files", {"content-length": str(total)}, (chunk for _ in range(total // CHUNK))
+    )
+    response = await proxy.proxy_request(ARTICLES, upload)
+    assert response.status_code == 200
+    assert f'"received":{total}'.encode() in await read_body(response)
+
+    response = await proxy.proxy_request(ARTICLES, make_request("GET", "/api/articles/files/1"))
+    assert response.headers["content-length"] == str(total)
+    assert response.headers["etag"] == '"v1"'
+    relayed = 0
+    async for part in response.body_iterator:
+        relayed += len(part)
+    assert relayed == total
+
+    peak = _peak_rss_bytes()
+    assert peak - baseline < ceiling, f"RSS grew by {(peak - baseline) >> 20} MiB while proxying {total >> 20} MiB"
@@ -0,0 +1,131 @@
+import pytest
+
+from app import ratelimit
+from app.ratelimit import MemoryBackend, RateLimiter, RateLimitMiddleware, RedisBackend
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis runs EVALSHA through lupa
+
+
+class Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # RedisBackend passes wall time to the script, MemoryBackend uses monotonic time
+    monkeypatch.setattr(ratelimit.time, "time", clock)
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """Each RedisBackend built in the test gets its own client on one shared fake server."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr("redis.asyncio.from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    return server
+
+
+@pytest.mark.anyio
+async def test_redis_script_spends_and_refills_tokens(redis_server, clock):
+    backend = RedisBackend()
+
+    results = [await backend.take("ip:1", 1, capacity=3, rate=1) for _ in range(4)]
+    assert results == [(True, 2.0), (True, 1.0), (True, 0.0), (False, 0.0)]
+
+    clock.now += 1.5
+    assert await backend.take("ip:1", 1, capacity=3, rate=1) == (True, 0.5)
+    # Other keys have their own bucket
+    assert await backend.take("ip:2", 1, capacity=3, rate=1) == (True, 2.0)
+    await backend.close()
+
+
+@pytest.mark.anyio
+async def test_redis_buckets_are_shared_between_replicas(redis_server, clock):
+    replicas = [RedisBackend(), RedisBackend()]
+
+    allowed = [(await replicas[i % 2].take("user:7", 1, capacity=4, rate=0.1))[0] for i in range(6)]
+
+    assert allowed == [True, True, True, True, False, False]
+
+
+@pytest.mark.anyio
+async def test_redis_and_memory_backends_agree(redis_server, clock):
+    redis_backend, memory_backend = RedisBackend(), MemoryBackend()
+    steps = [(1, 0), (5, 0), (2, 0.3), (4, 0.1), (1, 2.0), (10, 0), (3, 0.25)]
+
+    for cost, elapsed in steps:
+        clock.now += elapsed
+        via_redis = await redis_backend.take("k", cost, capacity=10, rate=4)
+        via_memory = await memory_backend.take("k", cost, capacity=10, rate=4)
+        assert via_redis[0] == via_memory[0]
+        assert via_redis[1] == pytest.approx(via_memory[1])
+
+
+@pytest.mark.anyio
+async def test_bucket_key_expires_once_full_again(redis_server, clock):
+    backend = RedisBackend()
+    await backend.take("ip:1", 1, capacity=2, rate=1)
+
+    ttl_ms = await backend._client.pttl("ratelimit:ip:1")
+
+    assert 0 < ttl_ms <= 3000
+
+
+async def _call(app, path="/api/articles/", headers=None):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": headers or [],
+        "client": ("10.0.0.1", 1234),
+    }
+    await app(scope, receive, send)
+    return sent[0]
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+@pytest.mark.anyio
+async def test_middleware_with_redis_backend_answers_429(redis_server, clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    limiter = RateLimiter(capacity=2, rate=1)
+    limiter.backend = RedisBackend()
+    app = RateLimitMiddleware(_ok, limiter)
+
+    statuses = [(await _call(app))["status"] for _ in range(3)]
+    rejected = await _call(app)
+
+    assert statuses == [200, 200, 429]
+    assert dict(rejected["headers"])[b"retry-after"] == b"1"
+    assert limiter.stats()["limited"] == 2
+
+
+@pytest.mark.anyio
+async def test_unreachable_redis_fails_open(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    limiter = RateLimiter(capacity=1, rate=1)
+    limiter.backend = RedisBackend(url="redis://127.0.0.1:1/0")
+    app = RateLimitMiddleware(_ok, limiter)
+
+    statuses = [(await _call(app))["status"] for _ in range(3)]
+
+    assert statuses == [200, 200, 200]
+    assert limiter.stats()["backend_errors"] == 3
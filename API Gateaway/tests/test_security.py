@@ -0,0 +1,124 @@
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import security
+from app.config import ALGORITHM, SECRET_KEY
+from app.security import TokenCache
+
+from conftest import make_request
+
+NOW = 1_700_000_000.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(security.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TokenCache(max_size=3, max_ttl=300)
+    monkeypatch.setattr(security, "token_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Count jwt.decode calls (signature checks); `exp` is left to the cache's fake clock."""
+    calls = []
+    real_decode = jwt.decode
+
+    def decode(token, *args, **kwargs):
+        calls.append(token)
+        return real_decode(token, *args, **kwargs, options={"verify_exp": False})
+
+    monkeypatch.setattr(security.jwt, "decode", decode)
+    return calls
+
+
+def token(sub: str = "1", exp: float = NOW + 60, roles=("author",)) -> str:
+    return jwt.encode({"sub": sub, "roles": list(roles), "exp": int(exp)}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def test_repeated_token_is_verified_once(clock, cache, decodes):
+    t = token()
+
+    assert security.decode_token(t) == security.decode_token(t)
+
+    assert decodes == [t]
+    assert cache.stats()["hits"] == 1
+
+
+def test_entry_expires_at_token_exp(clock, cache, decodes):
+    t = token(exp=NOW + 60)
+    security.decode_token(t)
+
+    clock.now = NOW + 59
+    assert cache.get(t) is not None
+    clock.now = NOW + 60
+    assert cache.get(t) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_max_ttl_caps_long_lived_tokens(clock, cache, decodes):
+    t = token(exp=NOW + 3600)
+    security.decode_token(t)
+
+    clock.now = NOW + 300
+    assert cache.get(t) is None
+
+
+def test_expired_token_is_not_cached(clock, cache, decodes):
+    security.decode_token(token(exp=NOW - 1))
+
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_token_is_evicted(clock, cache, decodes):
+    tokens = [token(sub=str(i)) for i in range(4)]
+    for t in tokens[:3]:
+        security.decode_token(t)
+    cache.get(tokens[0])
+
+    security.decode_token(tokens[3])
+
+    assert cache.get(tokens[1]) is None
+    assert all(cache.get(t) is not None for t in (tokens[0], tokens[2], tokens[3]))
+    assert cache.stats()["evictions"] == 1
+
+
+def test_opt_out_always_verifies_and_does_not_populate(clock, cache, decodes):
+    t = token()
+
+    security.decode_token(t, use_cache=False)
+    security.decode_token(t, use_cache=False)
+
+    assert decodes == [t, t]
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.anyio
+async def test_uncached_dependency_rejects_tampered_token_even_if_original_is_cached(clock, cache, decodes):
+    t = token()
+    security.decode_token(t)
+    header, payload, signature = t.split(".")
+    tampered = ".".join([header, payload, signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")])
+
+    with pytest.raises(HTTPException) as exc:
+        await security.get_current_user_uncached(make_request("GET", "/api/users/me", {"authorization": f"Bearer {tampered}"}))
+    assert exc.value.status_code == 401
+
+    user = await security.get_current_user(make_request("GET", "/api/users/me", {"authorization": f"Bearer {t}"}))
+    assert user == {"user_id": 1, "roles": ["author"]}
+    assert decodes == [t, tampered]
@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import proxy
+from app.clients import upstreams
+from app.config import SERVICE_URLS
+
+from conftest import _Body, make_request, read_body, reply
+
+FILES = SERVICE_URLS["files"]
+CONCURRENCY = 20
+
+
+def slow_file():
+    async def handler(request):
+        # Keep the first call in flight long enough for every other request to arrive
+        await asyncio.sleep(0.05)
+        body = b"file-bytes:" + request.url.path.encode()
+        return reply(200, content=body, headers={"content-length": str(len(body)), "content-type": "text/plain"})
+
+    return handler
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_gets_share_one_upstream_call(upstream):
+    calls = upstream(FILES, slow_file())
+
+    responses = await asyncio.gather(
+        *(proxy.proxy_request(FILES, make_request("GET", "/api/files/7")) for _ in range(CONCURRENCY))
+    )
+
+    assert len(calls.calls) == 1
+    assert [r.status_code for r in responses] == [200] * CONCURRENCY
+    assert {await read_body(r) for r in responses} == {b"file-bytes:/files/7"}
+
+
+@pytest.mark.anyio
+async def test_finished_call_is_not_reused(upstream):
+    calls = upstream(FILES, slow_file())
+
+    await proxy.proxy_request(FILES, make_request("GET", "/api/files/7"))
+    await proxy.proxy_request(FILES, make_request("GET", "/api/files/7"))
+
+    assert len(calls.calls) == 2
+
+
+@pytest.mark.anyio
+async def test_different_queries_and_private_requests_are_not_coalesced(upstream):
+    calls = upstream(FILES, slow_file())
+
+    await asyncio.gather(
+        proxy.proxy_request(FILES, make_request("GET", "/api/files/7", query="v=1")),
+        proxy.proxy_request(FILES, make_request("GET", "/api/files/7", query="v=2")),
+        proxy.proxy_request(FILES, make_request("GET", "/api/files/7", {"range": "bytes=0-3"})),
+        proxy.proxy_request(FILES, make_request("GET", "/api/files/7", {"range": "bytes=0-3"})),
+    )
+
+    assert len(calls.calls) == 4
+
+
+def unshareable_file(kind: str):
+    """Upstream response the gateway will not buffer: too large, or of undeclared size."""
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        body = b"large-file:" + request.url.path.encode()
+        if kind == "chunked":
+            return httpx.Response(200, headers={"content-type": "text/plain"}, stream=_Body(body))
+        return reply(200, content=body, headers={"content-type": "text/plain"})
+
+    return handler
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("kind", ["oversized", "chunked"])
+async def test_unshareable_response_is_streamed_to_one_caller(upstream, monkeypatch, kind):
+    monkeypatch.setattr(proxy, "COALESCE_MAX_BYTES", 8)
+    calls = upstream(FILES, unshareable_file(kind))
+
+    responses = await asyncio.gather(
+        *(proxy.proxy_request(FILES, make_request("GET", "/api/files/7")) for _ in range(CONCURRENCY))
+    )
+
+    # The first caller relays the response it already holds; only the others ask again
+    assert len(calls.calls) <= CONCURRENCY
+    assert [r.status_code for r in responses] == [200] * CONCURRENCY
+    assert {await read_body(r) for r in responses} == {b"large-file:/files/7"}
+    assert upstreams.pool("files").in_flight == 0
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
+from app import tracing
 
 app = FastAPI(title="Analytics Service")
+tracing.setup(app, "analytics")
 
 
 @app.get("/health")
@@ -0,0 +1,31 @@
+"""Add (status, created_at, id) index for the editor article listing
+
+Also merges the two heads (20251130_04 and 20251201_add_layout) so that
+``alembic upgrade head`` has a single target again.
+
+Revision ID: 20251202_01
+Revises: 20251130_04, 20251201_add_layout
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_01'
+down_revision = ('20251130_04', '20251201_add_layout')
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves ORDER BY created_at DESC, id DESC (backward scan) for one status and
+    # the keyset condition (created_at, id) < (:created_at, :id)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_articles_status_created_at_id ON articles (status, created_at, id)")
+    # Same order for status=all
+    op.execute("CREATE INDEX IF NOT EXISTS ix_articles_created_at_id ON articles (created_at, id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_articles_created_at_id")
+    op.execute("DROP INDEX IF EXISTS ix_articles_status_created_at_id")
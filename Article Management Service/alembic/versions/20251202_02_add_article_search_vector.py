@@ -0,0 +1,41 @@
+"""Add generated search_vector (tsvector) with a GIN index to articles
+
+Replaces the six ILIKE '%term%' clauses of the editor search with an indexed
+full-text match. Adding a stored generated column rewrites the articles table.
+
+Revision ID: 20251202_02
+Revises: 20251202_01
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_02'
+down_revision = '20251202_01'
+branch_labels = None
+depends_on = None
+
+# Same expression as app.models.SEARCH_VECTOR_SQL at the time of this migration
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(title_ru, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(title_en, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(title_kz, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(abstract_ru, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(abstract_en, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(abstract_kz, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_articles_search_vector")
+    op.execute("ALTER TABLE articles DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,41 @@
+"""Add pg_trgm GIN indexes for author names and keyword titles
+
+Serve ILIKE '%x%' filters of the editor listing and the fuzzy autocomplete
+endpoints (/articles/authors/search, /articles/keywords/suggest).
+
+Revision ID: 20251202_03
+Revises: 20251202_02
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_03'
+down_revision = '20251202_02'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ("authors", "first_name"),
+    ("authors", "last_name"),
+    ("authors", "patronymic"),
+    ("keywords", "title_kz"),
+    ("keywords", "title_en"),
+    ("keywords", "title_ru"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in TRIGRAM_INDEXES:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+            f"ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    for table, column in TRIGRAM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_trgm")
@@ -0,0 +1,52 @@
+"""Merge duplicate keywords and make (title_kz, title_en, title_ru) unique
+
+Links to duplicates are moved to the lowest id of each group before the
+duplicates are deleted, so keywords can be upserted with ON CONFLICT.
+
+Revision ID: 20251202_04
+Revises: 20251202_03
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_04'
+down_revision = '20251202_03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TEMP TABLE keyword_duplicates ON COMMIT DROP AS
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY title_kz, title_en, title_ru) AS keep_id
+            FROM keywords
+        ) ranked
+        WHERE id <> keep_id
+        """
+    )
+    for table, owner in (("article_keywords", "article_id"), ("article_version_keywords", "version_id")):
+        op.execute(
+            f"""
+            INSERT INTO {table} ({owner}, keyword_id)
+            SELECT DISTINCT t.{owner}, d.keep_id
+            FROM {table} t JOIN keyword_duplicates d ON d.id = t.keyword_id
+            ON CONFLICT DO NOTHING
+            """
+        )
+        op.execute(f"DELETE FROM {table} WHERE keyword_id IN (SELECT id FROM keyword_duplicates)")
+    op.execute("DELETE FROM keywords WHERE id IN (SELECT id FROM keyword_duplicates)")
+
+    exists = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_constraint WHERE conname = 'uq_keywords_titles'")
+    ).scalar()
+    if not exists:
+        op.create_unique_constraint('uq_keywords_titles', 'keywords', ['title_kz', 'title_en', 'title_ru'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_keywords_titles', 'keywords', type_='unique')
@@ -0,0 +1,50 @@
+"""Store article versions as keyframes and deltas (snapshot JSONB, content_hash)
+
+New versions keep their content in `snapshot`: the whole snapshot for a
+keyframe, only changed fields for a delta against `base_version_id`. The
+full-copy columns become nullable; existing rows keep them until they are
+converted with `python -m app.version_store compact`.
+
+Revision ID: 20251202_05
+Revises: 20251202_04
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_05'
+down_revision = '20251202_04'
+branch_labels = None
+depends_on = None
+
+LEGACY_NOT_NULL = ("title_kz", "title_en", "title_ru", "article_type")
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE article_versions ADD COLUMN IF NOT EXISTS content_hash varchar(64)")
+    op.execute(
+        "ALTER TABLE article_versions ADD COLUMN IF NOT EXISTS base_version_id integer "
+        "REFERENCES article_versions (id)"
+    )
+    op.execute("ALTER TABLE article_versions ADD COLUMN IF NOT EXISTS snapshot jsonb")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_article_versions_content_hash ON article_versions (content_hash)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_article_versions_base_version_id ON article_versions (base_version_id)")
+    for column in LEGACY_NOT_NULL:
+        op.alter_column('article_versions', column, nullable=True)
+
+
+def downgrade() -> None:
+    # Versions written as snapshots have no full-copy columns to fall back to
+    remaining = op.get_bind().execute(
+        sa.text("SELECT count(*) FROM article_versions WHERE snapshot IS NOT NULL")
+    ).scalar()
+    if remaining:
+        raise RuntimeError(f"{remaining} article versions are stored as snapshots; downgrade would lose them")
+    for column in LEGACY_NOT_NULL:
+        op.alter_column('article_versions', column, nullable=False)
+    op.execute("DROP INDEX IF EXISTS ix_article_versions_base_version_id")
+    op.execute("DROP INDEX IF EXISTS ix_article_versions_content_hash")
+    for column in ("snapshot", "base_version_id", "content_hash"):
+        op.execute(f"ALTER TABLE article_versions DROP COLUMN IF EXISTS {column}")
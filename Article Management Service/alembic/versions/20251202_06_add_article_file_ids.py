@@ -0,0 +1,37 @@
+"""Add <kind>_file_id columns next to the file URL columns of articles
+
+Existing rows are backfilled from URLs of the form /files/{file_id}/download;
+other URLs (external links) keep a NULL file id.
+
+Revision ID: 20251202_06
+Revises: 20251202_05
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_06'
+down_revision = '20251202_05'
+branch_labels = None
+depends_on = None
+
+FILE_KINDS = ("manuscript", "antiplagiarism", "author_info", "cover_letter")
+
+
+def upgrade() -> None:
+    for kind in FILE_KINDS:
+        op.execute(f"ALTER TABLE articles ADD COLUMN IF NOT EXISTS {kind}_file_id varchar")
+        op.execute(
+            f"""
+            UPDATE articles
+            SET {kind}_file_id = substring({kind}_file_url from '^/files/([^/]+)/download$')
+            WHERE {kind}_file_id IS NULL AND {kind}_file_url LIKE '/files/%/download'
+            """
+        )
+
+
+def downgrade() -> None:
+    for kind in FILE_KINDS:
+        op.execute(f"ALTER TABLE articles DROP COLUMN IF EXISTS {kind}_file_id")
@@ -0,0 +1,50 @@
+"""Add outbox_events: calls to other services committed with the change that caused them
+
+Rows are written by app.outbox.enqueue() in the request transaction and sent
+by the dispatcher thread after commit.
+
+Revision ID: 20251202_07
+Revises: 20251202_06
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251202_07'
+down_revision = '20251202_06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox_events (
+            id bigserial PRIMARY KEY,
+            event_type varchar(100) NOT NULL,
+            key varchar(200),
+            method varchar(10) NOT NULL,
+            url text NOT NULL,
+            payload json,
+            service_secret boolean NOT NULL DEFAULT false,
+            on_behalf_of json,
+            status varchar(20) NOT NULL DEFAULT 'pending',
+            attempts integer NOT NULL DEFAULT 0,
+            next_attempt_at timestamptz NOT NULL DEFAULT now(),
+            last_error text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            delivered_at timestamptz
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_outbox_events_status_next_attempt_at "
+        "ON outbox_events (status, next_attempt_at)"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_outbox_events_key ON outbox_events (key)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS outbox_events")
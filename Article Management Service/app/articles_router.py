@@ -1,46 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from typing import List
 from jose import jwt, JWTError
+from datetime import datetime
+import base64
+import enum
+import json
 import httpx
-from app import models, schemas, database, config
+from app import models, schemas, database, config, identity, file_storage, fulltext, outbox, version_diff, version_store
 import httpx
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
 
-def _file_id_to_url(file_id: str | None):
-    if not file_id:
-        return None
-    return f"/files/{file_id}/download"
+def _manuscript_file_id(article: models.Article) -> str:
+    """id рукописи в File Storage: 404, если файла нет, 400 — если это не файл File Storage."""
+    ref = file_storage.get_ref(article, "manuscript")
+    if not ref.url:
+        raise HTTPException(status_code=404, detail="Manuscript file not found")
+    if not ref.file_id:
+        raise HTTPException(status_code=400, detail="Invalid manuscript file URL")
+    return ref.file_id
+
+
+def _set_files_from_ids(article: models.Article, fields: dict):
+    """Файлы статьи по полям <kind>_file_id запроса (забирает их из fields): id и URL задаются парой."""
+    for kind in models.FILE_KINDS:
+        if f"{kind}_file_id" in fields:
+            file_storage.set_ref(article, kind, file_storage.FileRef.from_id(fields.pop(f"{kind}_file_id")))
+
+
+def _enqueue_new_article_broadcast(db: Session, article: models.Article, current_user: dict):
+    """Уведомление редакторов о новой статье; отправляется через outbox после коммита."""
+    notifications_url = getattr(config, "NOTIFICATION_SERVICE_URL", "http://notifications:8000")
+    outbox.enqueue(
+        db,
+        "article.submitted",
+        "POST",
+        f"{notifications_url}/notifications/editor/broadcast-new-article",
+        json={
+            "article_id": article.id,
+            "title": article.title_ru or article.title_en or article.title_kz or "New article",
+            "message": None,
+        },
+        on_behalf_of=current_user,
+    )
 
 
-def _prefer_url(file_id: str | None, file_url: str | None):
+def _upsert_keywords(db: Session, payloads: list[schemas.KeywordCreate]) -> list[int]:
     """
-    Prefer constructing API download URL from file_id; otherwise use provided file_url.
+    Id ключевых слов (в порядке payloads, без повторов), создавая недостающие.
+    Не больше двух запросов: INSERT ... ON CONFLICT DO NOTHING RETURNING для новых
+    и один SELECT для уже существовавших.
     """
-    if file_id:
-        return _file_id_to_url(file_id)
-    return file_url
+    triples = list(dict.fromkeys((kw.title_kz, kw.title_en, kw.title_ru) for kw in payloads))
+    if not triples:
+        return []
+    table = models.Keyword.__table__
+    statement = (
+        insert(table)
+        .values([{"title_kz": kz, "title_en": en, "title_ru": ru} for kz, en, ru in triples])
+        .on_conflict_do_nothing(constraint="uq_keywords_titles")
+        .returning(table.c.id, table.c.title_kz, table.c.title_en, table.c.title_ru)
+    )
+    ids = {(row.title_kz, row.title_en, row.title_ru): row.id for row in db.execute(statement)}
+    missing = [triple for triple in triples if triple not in ids]
+    if missing:
+        existing = db.execute(
+            select(table.c.id, table.c.title_kz, table.c.title_en, table.c.title_ru)
+            .where(tuple_(table.c.title_kz, table.c.title_en, table.c.title_ru).in_(missing))
+        )
+        ids.update({(row.title_kz, row.title_en, row.title_ru): row.id for row in existing})
+    return [ids[triple] for triple in triples]
 
 
-def _get_or_create_keyword(db: Session, kw: schemas.KeywordCreate) -> models.Keyword:
-    existing = (
-        db.query(models.Keyword)
-        .filter(
-            models.Keyword.title_kz == kw.title_kz,
-            models.Keyword.title_en == kw.title_en,
-            models.Keyword.title_ru == kw.title_ru,
-        )
-        .first()
-    )
-    if existing:
-        return existing
-    new_kw = models.Keyword(title_kz=kw.title_kz, title_en=kw.title_en, title_ru=kw.title_ru)
-    db.add(new_kw)
-    db.flush()
-    return new_kw
+def _ensure_exist(db: Session, model, ids: list[int], detail: str) -> list[int]:
+    """Уникальные id в исходном порядке; 400, если каких-то записей нет."""
+    unique_ids = list(dict.fromkeys(ids))
+    if unique_ids:
+        found = db.query(model.id).filter(model.id.in_(unique_ids)).count()
+        if found != len(unique_ids):
+            raise HTTPException(status_code=400, detail=detail)
+    return unique_ids
+
+
+def _link(db: Session, table, article_id: int, column: str, ids: list[int]):
+    """Связи статьи одним многострочным INSERT."""
+    if ids:
+        db.execute(table.insert().values([{"article_id": article_id, column: i} for i in ids]))
+
+
+def _attach_authors_and_keywords(db: Session, article_id: int, article: schemas.ArticleCreateWithIds):
+    """Авторы по id, ключевые слова по id и по названиям (создаются при необходимости)."""
+    author_ids = _ensure_exist(db, models.Author, article.author_ids or [], "One or more authors not found")
+    _link(db, models.article_authors, article_id, "author_id", author_ids)
+
+    keyword_ids = _ensure_exist(db, models.Keyword, article.keyword_ids or [], "One or more keywords not found")
+    if getattr(article, "keywords", None):
+        keyword_ids = list(dict.fromkeys(keyword_ids + _upsert_keywords(db, article.keywords)))
+    _link(db, models.article_keywords, article_id, "keyword_id", keyword_ids)
 
 
 def get_db():
@@ -51,7 +111,16 @@ def get_db():
         db.close()
 
 
-def get_current_user(authorization: str = Header(...)):
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    x_identity: str | None = Header(default=None, alias=identity.IDENTITY_HEADER),
+):
+    # Prefer the signed identity forwarded by the API Gateway (no JWT decode needed)
+    user = identity.identity_from_header(x_identity)
+    if user is not None:
+        return user
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing Authorization header")
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token")
     token = authorization.replace("Bearer ", "")
@@ -81,57 +150,38 @@ def ensure_service_secret(x_service_secret: str | None):
         raise HTTPException(status_code=403, detail="Invalid service secret")
 
 
-def _create_article_version_snapshot(db: Session, article: models.Article, version_number: int, version_code: str) -> models.ArticleVersion:
+def _suggest(db: Session, model, columns, q: str, page: int, page_size: int) -> dict:
     """
-    Создает полный снимок статьи в виде версии.
-    Сохраняет все данные статьи, включая авторов и ключевые слова.
+    Ранжированные подсказки: сначала записи, где слова запроса совпали с началом
+    слов в полях, затем по сходству (pg_trgm word_similarity), с пагинацией на сервере.
     """
-    new_version = models.ArticleVersion(
-        article_id=article.id,
-        version_number=version_number,
-        version_code=version_code,
-        # Полный снимок данных статьи
-        title_kz=article.title_kz,
-        title_en=article.title_en,
-        title_ru=article.title_ru,
-        abstract_kz=article.abstract_kz,
-        abstract_en=article.abstract_en,
-        abstract_ru=article.abstract_ru,
-        doi=article.doi,
-        article_type=article.article_type,
-        manuscript_file_url=article.manuscript_file_url,
-        antiplagiarism_file_url=article.antiplagiarism_file_url,
-        author_info_file_url=article.author_info_file_url,
-        cover_letter_file_url=article.cover_letter_file_url,
-        not_published_elsewhere=article.not_published_elsewhere,
-        plagiarism_free=article.plagiarism_free,
-        authors_agree=article.authors_agree,
-        generative_ai_info=article.generative_ai_info,
-        # Legacy поле для обратной совместимости
-        file_url=article.manuscript_file_url,
+    words = fulltext.query_words(q)
+    if not words:
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Page must be >= 1")
+    if page_size < 1 or page_size > 50:
+        raise HTTPException(status_code=400, detail="Page size must be between 1 and 50")
+
+    fulltext.set_similarity_threshold(db, config.TRGM_WORD_SIMILARITY_THRESHOLD)
+    prefix_hits, similarity = fulltext.fuzzy_rank(columns, words)
+    rows = (
+        db.query(model)
+        .filter(fulltext.fuzzy_match(columns, words))
+        .order_by(prefix_hits.desc(), similarity.desc(), *columns[:1], model.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+        .all()
     )
-    db.add(new_version)
-    db.flush()
-    
-    # Копируем авторов
-    for author in article.authors:
-        db.execute(
-            models.article_version_authors.insert().values(
-                version_id=new_version.id,
-                author_id=author.id
-            )
-        )
-    
-    # Копируем ключевые слова
-    for keyword in article.keywords:
-        db.execute(
-            models.article_version_keywords.insert().values(
-                version_id=new_version.id,
-                keyword_id=keyword.id
-            )
-        )
-    
-    return new_version
+    return {
+        "items": rows[:page_size],
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "has_next": len(rows) > page_size,
+            "has_prev": page > 1,
+        },
+    }
 
 
 @router.get("/keywords", response_model=List[schemas.KeywordOut])
@@ -142,6 +192,22 @@ def list_keywords(
     return db.query(models.Keyword).all()
 
 
+@router.get("/keywords/suggest", response_model=schemas.KeywordSuggestPage)
+def suggest_keywords(
+    q: str,
+    page: int = 1,
+    page_size: int = 10,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Подсказки ключевых слов по началу слова или нечеткому совпадению на любом из
+    языков (kz/en/ru).
+    """
+    columns = [models.Keyword.title_en, models.Keyword.title_ru, models.Keyword.title_kz]
+    return _suggest(db, models.Keyword, columns, q, page, page_size)
+
+
 @router.get("/my", response_model=List[schemas.ArticleOut])
 def list_my_articles(
     db: Session = Depends(get_db),
@@ -151,12 +217,14 @@ def list_my_articles(
     Список статей текущего пользователя-автора.
     Фильтр по responsible_user_id == current_user["user_id"].
     """
-    from sqlalchemy.orm import joinedload
+    from sqlalchemy.orm import joinedload, selectinload
     articles = (
         db.query(models.Article)
         .options(
             joinedload(models.Article.authors),
-            joinedload(models.Article.keywords)
+            joinedload(models.Article.keywords),
+            # Версии всех статей одним запросом (ArticleOut.versions), а не запросом на статью
+            selectinload(models.Article.versions),
         )
         .filter(models.Article.responsible_user_id == current_user["user_id"])
         .order_by(models.Article.created_at.desc())
@@ -165,6 +233,39 @@ def list_my_articles(
     return articles
 
 
+def _encode_cursor(created_at, article_id: int) -> str:
+    payload = json.dumps({"c": created_at.isoformat(), "i": article_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _estimate_count(db: Session, query) -> int:
+    """
+    Оценка количества строк по плану запроса (EXPLAIN) вместо COUNT(*).
+    Небольшие оценки уточняются точным подсчетом: он дешев, а планировщик на них ошибается сильнее всего.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return query.count()
+    compiled = query.statement.compile(dialect=bind.dialect)
+    # Enum-параметры хранятся по имени; bind-процессоры при exec_driver_sql не применяются
+    params = {k: (v.name if isinstance(v, enum.Enum) else v) for k, v in compiled.params.items()}
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate < config.COUNT_ESTIMATE_EXACT_BELOW:
+        return query.count()
+    return estimate
+
+
 @router.get("/unassigned")
 def list_unassigned_articles(
     db: Session = Depends(get_db),
@@ -179,6 +280,8 @@ def list_unassigned_articles(
     # Пагинация
     page: int = 1,
     page_size: int = 10,
+    cursor: str = None,
+    count: str = "exact",
 ):
     """
     Список статей для редактора с фильтрацией и пагинацией.
@@ -189,11 +292,16 @@ def list_unassigned_articles(
     - year: Год создания статьи
     - article_type: Тип статьи (original, review)
     - keywords: Ключевые слова через запятую (поиск по любому из них)
-    - search: Общий поиск по заголовку и аннотации (на всех языках)
+    - search: Общий поиск по заголовку и аннотации (на всех языках, по словам
+      с учетом словоформ; ранжированный поиск — GET /articles/search)
     
     Параметры пагинации:
     - page: Номер страницы (начиная с 1)
     - page_size: Количество элементов на странице (по умолчанию 10)
+    - cursor: Токен продолжения (pagination.next_cursor предыдущего ответа). Если передан,
+      page игнорируется и следующая страница выбирается по (created_at, id) без OFFSET.
+    - count: exact (по умолчанию) — точное total_count; estimate — оценка по плану
+      запроса; none — без подсчета (total_count и total_pages = null)
     
     Возвращает статьи со статусом 'submitted' по умолчанию.
     Доступно только для пользователей с ролью 'editor'.
@@ -201,16 +309,19 @@ def list_unassigned_articles(
     ensure_editor(current_user)
     
     from sqlalchemy.orm import joinedload
-    from sqlalchemy import extract, or_, and_
+    from sqlalchemy import or_
+
+    # Валидация параметров пагинации
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Page must be >= 1")
+    if page_size < 1 or page_size > 100:
+        raise HTTPException(status_code=400, detail="Page size must be between 1 and 100")
+    if count not in ("exact", "estimate", "none"):
+        raise HTTPException(status_code=400, detail="count must be one of: exact, estimate, none")
     
-    # Базовый запрос
-    query = (
-        db.query(models.Article)
-        .options(
-            joinedload(models.Article.authors),
-            joinedload(models.Article.keywords)
-        )
-    )
+    # Фильтры применяются к запросу только по id: авторы и ключевые слова
+    # проверяются через EXISTS, поэтому дублей строк и DISTINCT нет
+    query = db.query(models.Article.id)
     
     # Фильтр по статусу (по умолчанию только submitted)
     # Особый кейс: если status == "all", не фильтруем по статусу.
@@ -229,17 +340,22 @@ def list_unassigned_articles(
     
     # Фильтр по автору
     if author_name:
-        query = query.join(models.Article.authors).filter(
-            or_(
-                models.Author.first_name.ilike(f"%{author_name}%"),
-                models.Author.last_name.ilike(f"%{author_name}%"),
-                models.Author.patronymic.ilike(f"%{author_name}%")
+        query = query.filter(
+            models.Article.authors.any(
+                or_(
+                    models.Author.first_name.ilike(f"%{author_name}%"),
+                    models.Author.last_name.ilike(f"%{author_name}%"),
+                    models.Author.patronymic.ilike(f"%{author_name}%")
+                )
             )
         )
     
-    # Фильтр по году
+    # Фильтр по году (диапазоном, чтобы работал индекс по created_at)
     if year:
-        query = query.filter(extract('year', models.Article.created_at) == year)
+        query = query.filter(
+            models.Article.created_at >= datetime(year, 1, 1),
+            models.Article.created_at < datetime(year + 1, 1, 1),
+        )
     
     # Фильтр по типу статьи
     if article_type:
@@ -262,50 +378,168 @@ def list_unassigned_articles(
                         models.Keyword.title_ru.ilike(f"%{keyword_text}%")
                     )
                 )
-            query = query.join(models.Article.keywords).filter(or_(*keyword_filters))
+            query = query.filter(models.Article.keywords.any(or_(*keyword_filters)))
     
-    # Общий поиск по заголовку и аннотации
+    # Общий поиск по заголовку и аннотации (полнотекстовый, по GIN-индексу search_vector)
     if search:
-        search_filter = or_(
-            models.Article.title_kz.ilike(f"%{search}%"),
-            models.Article.title_en.ilike(f"%{search}%"),
-            models.Article.title_ru.ilike(f"%{search}%"),
-            models.Article.abstract_kz.ilike(f"%{search}%"),
-            models.Article.abstract_en.ilike(f"%{search}%"),
-            models.Article.abstract_ru.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
+        query = query.filter(fulltext.matches(fulltext.ts_query(search)))
     
     # Убран фильтр назначенности редактору по полю assigned_editor_id.
     # Эндпоинт больше не ограничивает результаты по назначению редактора.
 
-    # Подсчет общего количества записей
-    total_count = query.distinct().count()
+    # Подсчет общего количества записей (по запросу только из id)
+    total_count = None
+    if count == "exact":
+        total_count = query.count()
+    elif count == "estimate":
+        total_count = _estimate_count(db, query)
     
-    # Применяем сортировку и пагинацию
-    query = query.distinct().order_by(models.Article.created_at.desc())
+    # Страница id в порядке (created_at, id) по убыванию; id делает порядок
+    # однозначным. Лишняя строка показывает, есть ли следующая страница.
+    page_query = (
+        query.with_entities(models.Article.id, models.Article.created_at)
+        .order_by(models.Article.created_at.desc(), models.Article.id.desc())
+    )
+    if cursor:
+        after_created_at, after_id = _decode_cursor(cursor)
+        page_query = page_query.filter(
+            tuple_(models.Article.created_at, models.Article.id) < tuple_(after_created_at, after_id)
+        )
+    else:
+        page_query = page_query.offset((page - 1) * page_size)
+    rows = page_query.limit(page_size + 1).all()
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if count == "estimate":
+        # Оценка не может быть меньше числа уже увиденных строк
+        seen = len(rows) + (1 if has_next else 0) + (0 if cursor else (page - 1) * page_size)
+        total_count = max(total_count, seen)
     
-    # Валидация параметров пагинации
-    if page < 1:
-        raise HTTPException(status_code=400, detail="Page must be >= 1")
-    if page_size < 1 or page_size > 100:
-        raise HTTPException(status_code=400, detail="Page size must be between 1 and 100")
+    # Полные статьи с авторами и ключевыми словами загружаются только для этой страницы
+    articles = []
+    if rows:
+        loaded = {
+            article.id: article
+            for article in db.query(models.Article)
+            .options(
+                joinedload(models.Article.authors),
+                joinedload(models.Article.keywords)
+            )
+            .filter(models.Article.id.in_([row.id for row in rows]))
+            .all()
+        }
+        articles = [loaded[row.id] for row in rows if row.id in loaded]
+    next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id) if has_next else None
     
-    offset = (page - 1) * page_size
-    articles = query.offset(offset).limit(page_size).all()
+    if cursor:
+        return {
+            "items": articles,
+            "pagination": {
+                "total_count": total_count,
+                "page_size": page_size,
+                "has_next": has_next,
+                "next_cursor": next_cursor,
+            }
+        }
     
     # Рассчитываем информацию о пагинации
-    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 0
+    total_pages = None
+    if total_count is not None:
+        total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 0
     
     return {
         "items": articles,
+        "pagination": {
+            "total_count": total_count,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "has_next": has_next,
+            "has_prev": page > 1,
+            "next_cursor": next_cursor,
+        }
+    }
+
+
+@router.get("/search")
+def search_articles(
+    q: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    status: str = None,
+    page: int = 1,
+    page_size: int = 10,
+):
+    """
+    Полнотекстовый поиск статей по заголовкам и аннотациям на всех языках.
+
+    - q: Поисковый запрос (синтаксис websearch: "точная фраза", or, -исключить)
+    - status: Статус статьи; по умолчанию ищется по всем статусам
+    - page, page_size: Пагинация
+
+    Результаты упорядочены по релевантности (ts_rank; совпадения в заголовке весят
+    больше, чем в аннотации). Для каждой статьи возвращаются подсвеченные
+    фрагменты (HTML, совпадения в <mark>).
+    Доступно только для пользователей с ролью 'editor'.
+    """
+    ensure_editor(current_user)
+
+    from sqlalchemy.orm import joinedload
+
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Page must be >= 1")
+    if page_size < 1 or page_size > 100:
+        raise HTTPException(status_code=400, detail="Page size must be between 1 and 100")
+
+    ts_query = fulltext.ts_query(q)
+    rank = fulltext.rank(ts_query).label("rank")
+    query = db.query(models.Article.id).filter(fulltext.matches(ts_query))
+    if status and status.lower() != "all":
+        try:
+            query = query.filter(models.Article.status == models.ArticleStatus(status))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+
+    total_count = query.count()
+    rows = (
+        query.with_entities(models.Article.id, rank)
+        .order_by(rank.desc(), models.Article.created_at.desc(), models.Article.id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+
+    ids = [row.id for row in rows]
+    loaded = {}
+    if ids:
+        loaded = {
+            article.id: article
+            for article in db.query(models.Article)
+            .options(
+                joinedload(models.Article.authors),
+                joinedload(models.Article.keywords)
+            )
+            .filter(models.Article.id.in_(ids))
+            .all()
+        }
+    snippets = fulltext.highlights(db, ids, ts_query)
+    total_pages = (total_count + page_size - 1) // page_size if total_count > 0 else 0
+
+    return {
+        "items": [
+            {"article": loaded[row.id], "rank": round(row.rank, 6), "highlights": snippets.get(row.id, {})}
+            for row in rows
+            if row.id in loaded
+        ],
         "pagination": {
             "total_count": total_count,
             "page": page,
             "page_size": page_size,
             "total_pages": total_pages,
             "has_next": page < total_pages,
-            "has_prev": page > 1
+            "has_prev": page > 1,
         }
     }
 
@@ -329,8 +563,7 @@ def get_article_detail_for_editor(
         .options(
             joinedload(models.Article.authors),
             joinedload(models.Article.keywords),
-            joinedload(models.Article.versions).joinedload(models.ArticleVersion.authors),
-            joinedload(models.Article.versions).joinedload(models.ArticleVersion.keywords)
+            joinedload(models.Article.versions),
         )
         .filter(models.Article.id == article_id)
         .first()
@@ -357,11 +590,7 @@ def get_article_version_detail_for_editor(
     from sqlalchemy.orm import joinedload
     version = (
         db.query(models.ArticleVersion)
-        .options(
-            joinedload(models.ArticleVersion.authors),
-            joinedload(models.ArticleVersion.keywords),
-            joinedload(models.ArticleVersion.article),
-        )
+        .options(joinedload(models.ArticleVersion.article))
         .filter(
             models.ArticleVersion.id == version_id,
             models.ArticleVersion.article_id == article_id,
@@ -373,6 +602,54 @@ def get_article_version_detail_for_editor(
     return version
 
 
+@router.get(
+    "/editor/{article_id}/versions/{version_a}/diff/{version_b}",
+    response_model=schemas.ArticleVersionDiff,
+    response_model_exclude_none=True,
+)
+def diff_article_versions_for_editor(
+    article_id: int,
+    version_a: int,
+    version_b: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Сравнение двух версий рукописи для редактора (от version_a к version_b).
+    Заголовки и аннотации сравниваются по словам, остальные поля — целиком,
+    авторы и ключевые слова — как множества. Возвращаются только изменения.
+    """
+    ensure_editor(current_user)
+    versions = {
+        v.id: v
+        for v in db.query(models.ArticleVersion).filter(
+            models.ArticleVersion.article_id == article_id,
+            models.ArticleVersion.id.in_([version_a, version_b]),
+        )
+    }
+    if version_a not in versions or version_b not in versions:
+        raise HTTPException(status_code=404, detail="Article version not found")
+    old, new = versions[version_a], versions[version_b]
+
+    # Версии неизменяемы: пара хэшей содержимого однозначно задает diff
+    key = tuple(v.content_hash or version_store.content_hash(version_store.full_snapshot(db, v)) for v in (old, new))
+    diff = version_diff.diff_cache.get(key)
+    if diff is None:
+        diff = version_diff.diff_snapshots(version_store.full_snapshot(db, old), version_store.full_snapshot(db, new))
+        version_diff.diff_cache.put(key, diff)
+
+    result = {"article_id": article_id, "from_version": old, "to_version": new, "fields": diff["fields"]}
+    for name, model in (("authors", models.Author), ("keywords", models.Keyword)):
+        if name in diff:
+            ids = diff[name]["added"] + diff[name]["removed"]
+            found = {obj.id: obj for obj in db.query(model).filter(model.id.in_(ids))}
+            result[name] = {
+                change: [found[i] for i in diff[name][change] if i in found]
+                for change in ("added", "removed")
+            }
+    return result
+
+
 @router.get("/my/{article_id}", response_model=schemas.ArticleOut)
 def get_article_detail(
     article_id: int,
@@ -416,11 +693,7 @@ def get_article_version_detail(
     from sqlalchemy.orm import joinedload
     version = (
         db.query(models.ArticleVersion)
-        .options(
-            joinedload(models.ArticleVersion.authors),
-            joinedload(models.ArticleVersion.keywords),
-            joinedload(models.ArticleVersion.article),
-        )
+        .options(joinedload(models.ArticleVersion.article))
         .filter(
             models.ArticleVersion.id == version_id,
             models.ArticleVersion.article_id == article_id,
@@ -466,55 +739,34 @@ async def get_article_manuscript(
     if article.responsible_user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="You are not the responsible user for this article")
     
-    if not article.manuscript_file_url:
-        raise HTTPException(status_code=404, detail="Manuscript file not found")
-    
-    # Извлекаем file_id из manuscript_file_url (формат: /files/{file_id}/download)
-    try:
-        file_id = article.manuscript_file_url.split("/files/")[1].split("/download")[0]
-    except (IndexError, AttributeError):
-        raise HTTPException(status_code=400, detail="Invalid manuscript file URL")
+    file_id = _manuscript_file_id(article)
     
-    # Запрос к микросервису FileProcessing для получения ссылки на файл
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{config.FILE_SERVICE_URL}/files/{file_id}",
-                timeout=10.0
-            )
-            
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="File not found in storage")
-            elif response.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to retrieve file from storage service")
-            
-            file_data = response.json()
-            
-            return {
-                "article_id": article_id,
-                "file_id": file_id,
-                "download_url": f"{config.API_GATEWAY_URL}{getattr(config, 'API_PREFIX', '/api')}/files/{file_id}/download",
-                "filename": file_data.get("filename"),
-                "file_size": file_data.get("file_size"),
-                "content_type": file_data.get("content_type"),
-                "uploaded_at": file_data.get("uploaded_at")
-            }
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="File service timeout")
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=502, detail=f"Failed to connect to file service: {str(e)}")
+    # Метаданные файла: из кэша или запросом к микросервису FileProcessing
+    file_data = await file_storage.get_metadata(file_id)
+    return {
+        "article_id": article_id,
+        "file_id": file_id,
+        "download_url": f"{config.API_GATEWAY_URL}{getattr(config, 'API_PREFIX', '/api')}/files/{file_id}/download",
+        # File Storage отдает original_name/size_bytes/created_at
+        "filename": file_data.get("filename", file_data.get("original_name")),
+        "file_size": file_data.get("file_size", file_data.get("size_bytes")),
+        "content_type": file_data.get("content_type"),
+        "uploaded_at": file_data.get("uploaded_at", file_data.get("created_at"))
+    }
 
 
 @router.get("/my/{article_id}/file/download")
 async def download_article_manuscript(
     article_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
     Прямое скачивание файла рукописи статьи.
     Доступна только ответственному пользователю (responsible_user_id).
-    Проксирует файл из микросервиса FileProcessing.
+    Проксирует файл из микросервиса FileProcessing потоком, поддерживая Range/If-Range
+    (докачка, 206) и ETag/Last-Modified, без загрузки файла в память.
     """
     article = (
         db.query(models.Article)
@@ -528,55 +780,8 @@ async def download_article_manuscript(
     if article.responsible_user_id != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="You are not the responsible user for this article")
     
-    if not article.manuscript_file_url:
-        raise HTTPException(status_code=404, detail="Manuscript file not found")
-    
-    # Извлекаем file_id из manuscript_file_url
-    try:
-        file_id = article.manuscript_file_url.split("/files/")[1].split("/download")[0]
-    except (IndexError, AttributeError):
-        raise HTTPException(status_code=400, detail="Invalid manuscript file URL")
-    
-    # Запрос к микросервису FileProcessing для скачивания файла
-    try:
-        async with httpx.AsyncClient() as client:
-            # Сначала получаем метаданные файла
-            metadata_response = await client.get(
-                f"{config.FILE_SERVICE_URL}/files/{file_id}",
-                timeout=10.0
-            )
-            
-            if metadata_response.status_code == 404:
-                raise HTTPException(status_code=404, detail="File not found in storage")
-            elif metadata_response.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to retrieve file metadata")
-            
-            file_data = metadata_response.json()
-            filename = file_data.get("filename", "manuscript.pdf")
-            content_type = file_data.get("content_type", "application/octet-stream")
-            
-            # Теперь скачиваем сам файл
-            download_response = await client.get(
-                f"{config.FILE_SERVICE_URL}/files/{file_id}/download",
-                timeout=30.0
-            )
-            
-            if download_response.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to download file from storage service")
-            
-            # Возвращаем файл с правильными заголовками
-            return StreamingResponse(
-                iter([download_response.content]),
-                media_type=content_type,
-                headers={
-                    "Content-Disposition": f'attachment; filename="{filename}"',
-                    "Content-Length": str(len(download_response.content))
-                }
-            )
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="File service timeout")
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=502, detail=f"Failed to connect to file service: {str(e)}")
+    # Потоковая передача файла из микросервиса FileProcessing
+    return await file_storage.stream_download(_manuscript_file_id(article), request.headers)
 
 
 @router.get("/keywords/{keyword_id}", response_model=schemas.KeywordOut)
@@ -605,22 +810,8 @@ def create_keyword(
     create without needing an extra click).
     """
     ensure_author(current_user)
-    # Try to reuse if identical keyword exists
-    existing = (
-        db.query(models.Keyword)
-        .filter(
-            models.Keyword.title_kz == keyword.title_kz,
-            models.Keyword.title_en == keyword.title_en,
-            models.Keyword.title_ru == keyword.title_ru,
-        )
-        .first()
-    )
-    if existing:
-        new_keyword = existing
-    else:
-        new_keyword = models.Keyword(**keyword.dict())
-        db.add(new_keyword)
-        db.flush()
+    # Reuse the keyword if an identical one exists (safe against concurrent creates)
+    new_keyword = db.get(models.Keyword, _upsert_keywords(db, [keyword])[0])
 
     # If article_id provided, link keyword to article
     if article_id is not None:
@@ -655,6 +846,22 @@ def list_authors(
     return db.query(models.Author).all()
 
 
+@router.get("/authors/search", response_model=schemas.AuthorSearchPage)
+def search_authors(
+    q: str,
+    page: int = 1,
+    page_size: int = 10,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Поиск авторов по фамилии, имени и отчеству: каждое слово запроса должно
+    совпасть с началом одного из полей или быть похожим на него (опечатки).
+    """
+    columns = [models.Author.last_name, models.Author.first_name, models.Author.patronymic]
+    return _suggest(db, models.Author, columns, q, page, page_size)
+
+
 @router.post("/authors", response_model=schemas.AuthorOut)
 def create_author(
     author: schemas.AuthorCreate,
@@ -695,67 +902,21 @@ def create_article(article: schemas.ArticleCreateWithIds, db: Session = Depends(
         status=models.ArticleStatus.submitted,
         article_type=article.article_type,
         responsible_user_id=article.responsible_user_id,
-        antiplagiarism_file_url=_file_id_to_url(article.antiplagiarism_file_id),
         not_published_elsewhere=article.not_published_elsewhere,
         plagiarism_free=article.plagiarism_free,
         authors_agree=article.authors_agree,
         generative_ai_info=article.generative_ai_info,
-        manuscript_file_url=_file_id_to_url(article.manuscript_file_id),
-        author_info_file_url=_file_id_to_url(article.author_info_file_id),
-        cover_letter_file_url=_file_id_to_url(article.cover_letter_file_id),
     )
+    _set_files_from_ids(new_article, article.dict())
     db.add(new_article)
     db.flush()
 
-    if article.author_ids:
-        authors = db.query(models.Author).filter(models.Author.id.in_(article.author_ids)).all()
-        if len(authors) != len(set(article.author_ids)):
-            raise HTTPException(status_code=400, detail="One or more authors not found")
-        for author in authors:
-            db.execute(models.article_authors.insert().values(article_id=new_article.id, author_id=author.id))
-
-    # Link existing keywords by IDs
-    attached_keyword_ids: set[int] = set()
-    if article.keyword_ids:
-        keywords = db.query(models.Keyword).filter(models.Keyword.id.in_(article.keyword_ids)).all()
-        if len(keywords) != len(set(article.keyword_ids)):
-            raise HTTPException(status_code=400, detail="One or more keywords not found")
-        for keyword in keywords:
-            if keyword.id not in attached_keyword_ids:
-                db.execute(models.article_keywords.insert().values(article_id=new_article.id, keyword_id=keyword.id))
-                attached_keyword_ids.add(keyword.id)
-
-    # Create/link keywords passed by names
-    if getattr(article, "keywords", None):
-        for kw_payload in article.keywords:
-            kw = _get_or_create_keyword(db, kw_payload)
-            if kw.id not in attached_keyword_ids:
-                db.execute(models.article_keywords.insert().values(article_id=new_article.id, keyword_id=kw.id))
-                attached_keyword_ids.add(kw.id)
+    # Authors and existing keywords by IDs, plus keywords passed by names (created or reused)
+    _attach_authors_and_keywords(db, new_article.id, article)
 
+    _enqueue_new_article_broadcast(db, new_article, current_user)
     db.commit()
     db.refresh(new_article)
-
-    # Notify editors about new article
-    try:
-        notifications_url = getattr(config, "NOTIFICATION_SERVICE_URL", "http://notifications:8000")
-        with httpx.Client(timeout=5.0) as client:
-            client.post(
-                f"{notifications_url}/notifications/editor/broadcast-new-article",
-                json={
-                    "article_id": new_article.id,
-                    "title": new_article.title_ru or new_article.title_en or new_article.title_kz or "New article",
-                    "message": None,
-                },
-                headers={
-                    # Forward same Authorization so Notification Service can resolve user for audit if needed
-                    "Authorization": f"Bearer {jwt.encode({'sub': str(current_user['user_id']), 'roles': current_user.get('roles', [])}, config.SECRET_KEY, algorithm=config.ALGORITHM)}"
-                },
-            )
-    except Exception:
-        # soft-fail on notifications
-        pass
-
     return new_article
 
 
@@ -804,63 +965,20 @@ def create_article_by_ids(
         status=article.status,
         article_type=article.article_type,
         responsible_user_id=article.responsible_user_id,
-        antiplagiarism_file_url=_file_id_to_url(article.antiplagiarism_file_id),
         not_published_elsewhere=article.not_published_elsewhere,
         plagiarism_free=article.plagiarism_free,
         authors_agree=article.authors_agree,
         generative_ai_info=article.generative_ai_info,
-        manuscript_file_url=_file_id_to_url(article.manuscript_file_id),
-        author_info_file_url=_file_id_to_url(article.author_info_file_id),
-        cover_letter_file_url=_file_id_to_url(article.cover_letter_file_id),
     )
+    _set_files_from_ids(new_article, article.dict())
     db.add(new_article)
     db.flush()
 
-    if article.author_ids:
-        authors = db.query(models.Author).filter(models.Author.id.in_(article.author_ids)).all()
-        if len(authors) != len(set(article.author_ids)):
-            raise HTTPException(status_code=400, detail="One or more authors not found")
-        for author in authors:
-            db.execute(models.article_authors.insert().values(article_id=new_article.id, author_id=author.id))
-
-    attached_keyword_ids: set[int] = set()
-    if article.keyword_ids:
-        keywords = db.query(models.Keyword).filter(models.Keyword.id.in_(article.keyword_ids)).all()
-        if len(keywords) != len(set(article.keyword_ids)):
-            raise HTTPException(status_code=400, detail="One or more keywords not found")
-        for keyword in keywords:
-            if keyword.id not in attached_keyword_ids:
-                db.execute(models.article_keywords.insert().values(article_id=new_article.id, keyword_id=keyword.id))
-                attached_keyword_ids.add(keyword.id)
-
-    if getattr(article, "keywords", None):
-        for kw_payload in article.keywords:
-            kw = _get_or_create_keyword(db, kw_payload)
-            if kw.id not in attached_keyword_ids:
-                db.execute(models.article_keywords.insert().values(article_id=new_article.id, keyword_id=kw.id))
-                attached_keyword_ids.add(kw.id)
+    _attach_authors_and_keywords(db, new_article.id, article)
 
+    _enqueue_new_article_broadcast(db, new_article, current_user)
     db.commit()
     db.refresh(new_article)
-
-    # Notify editors about new article
-    try:
-        notifications_url = getattr(config, "NOTIFICATION_SERVICE_URL", "http://notifications:8000")
-        with httpx.Client(timeout=5.0) as client:
-            client.post(
-                f"{notifications_url}/notifications/editor/broadcast-new-article",
-                json={
-                    "article_id": new_article.id,
-                    "title": new_article.title_ru or new_article.title_en or new_article.title_kz or "New article",
-                    "message": None,
-                },
-                headers={
-                    "Authorization": f"Bearer {jwt.encode({'sub': str(current_user['user_id']), 'roles': current_user.get('roles', [])}, config.SECRET_KEY, algorithm=config.ALGORITHM)}"
-                },
-            )
-    except Exception:
-        pass
-
     return new_article
 
 
@@ -903,15 +1021,8 @@ def update_article(
     # Обновляем только переданные поля
     update_data = article.dict(exclude_unset=True)
     
-    # Обрабатываем file_id -> file_url конвертацию
-    if "antiplagiarism_file_id" in update_data:
-        existing_article.antiplagiarism_file_url = _file_id_to_url(update_data.pop("antiplagiarism_file_id"))
-    if "manuscript_file_id" in update_data:
-        existing_article.manuscript_file_url = _file_id_to_url(update_data.pop("manuscript_file_id"))
-    if "author_info_file_id" in update_data:
-        existing_article.author_info_file_url = _file_id_to_url(update_data.pop("author_info_file_id"))
-    if "cover_letter_file_id" in update_data:
-        existing_article.cover_letter_file_url = _file_id_to_url(update_data.pop("cover_letter_file_id"))
+    # Обрабатываем file_id -> file_id + file_url
+    _set_files_from_ids(existing_article, update_data)
     
     # Обновляем авторов
     if "author_ids" in update_data:
@@ -921,14 +1032,8 @@ def update_article(
             models.article_authors.delete().where(models.article_authors.c.article_id == article_id)
         )
         # Добавляем новые связи
-        if author_ids:
-            authors = db.query(models.Author).filter(models.Author.id.in_(author_ids)).all()
-            if len(authors) != len(set(author_ids)):
-                raise HTTPException(status_code=400, detail="One or more authors not found")
-            for author in authors:
-                db.execute(
-                    models.article_authors.insert().values(article_id=article_id, author_id=author.id)
-                )
+        author_ids = _ensure_exist(db, models.Author, author_ids or [], "One or more authors not found")
+        _link(db, models.article_authors, article_id, "author_id", author_ids)
     
     # Обновляем ключевые слова
     if "keyword_ids" in update_data:
@@ -938,14 +1043,8 @@ def update_article(
             models.article_keywords.delete().where(models.article_keywords.c.article_id == article_id)
         )
         # Добавляем новые связи
-        if keyword_ids:
-            keywords = db.query(models.Keyword).filter(models.Keyword.id.in_(keyword_ids)).all()
-            if len(keywords) != len(set(keyword_ids)):
-                raise HTTPException(status_code=400, detail="One or more keywords not found")
-            for keyword in keywords:
-                db.execute(
-                    models.article_keywords.insert().values(article_id=article_id, keyword_id=keyword.id)
-                )
+        keyword_ids = _ensure_exist(db, models.Keyword, keyword_ids or [], "One or more keywords not found")
+        _link(db, models.article_keywords, article_id, "keyword_id", keyword_ids)
     
     # Обновляем остальные поля статьи
     for field, value in update_data.items():
@@ -956,23 +1055,9 @@ def update_article(
     if existing_article.status not in [models.ArticleStatus.published]:
         existing_article.status = models.ArticleStatus.submitted
     
-    # Создаем новую версию с префиксом TAU-V{номер}
-    max_version = (
-        db.query(models.ArticleVersion)
-        .filter(models.ArticleVersion.article_id == article_id)
-        .order_by(models.ArticleVersion.version_number.desc())
-        .first()
-    )
-    version_number = max_version.version_number + 1 if max_version else 1
-    version_code = f"TAU-V{version_number}"
-    
-    # Создаем полный снимок статьи
-    new_version = _create_article_version_snapshot(
-        db=db,
-        article=existing_article,
-        version_number=version_number,
-        version_code=version_code
-    )
+    # Создаем новую версию с префиксом TAU-V{номер}; если содержимое не изменилось,
+    # остается последняя версия
+    new_version, _ = version_store.save_version(db, existing_article)
     
     # Обновляем ссылку на текущую версию
     existing_article.current_version_id = new_version.id
@@ -988,7 +1073,7 @@ def add_version(article_id: int, version: schemas.ArticleVersionBase, db: Sessio
     """
     Создание новой версии статьи.
     Доступна только ответственному пользователю (responsible_user_id).
-    Создает полный снимок статьи на текущий момент.
+    Создает снимок статьи на текущий момент, если она изменилась с последней версии.
     """
     from sqlalchemy.orm import joinedload
     
@@ -1007,18 +1092,8 @@ def add_version(article_id: int, version: schemas.ArticleVersionBase, db: Sessio
     if current_user["user_id"] != article.responsible_user_id:
         raise HTTPException(status_code=403, detail="You are not the responsible user for this article")
 
-    max_version = db.query(models.ArticleVersion).filter(models.ArticleVersion.article_id == article_id)\
-                   .order_by(models.ArticleVersion.version_number.desc()).first()
-    version_number = max_version.version_number + 1 if max_version else 1
-    version_code = f"TAU-V{version_number}"
-
-    # Создаем полный снимок статьи
-    new_version = _create_article_version_snapshot(
-        db=db,
-        article=article,
-        version_number=version_number,
-        version_code=version_code
-    )
+    # Снимок статьи (ключевой кадр или дельта); без изменений возвращается последняя версия
+    new_version, _ = version_store.save_version(db, article)
 
     article.current_version_id = new_version.id
     db.commit()
@@ -1043,32 +1118,26 @@ def change_status(
     # Если переводим в статус проверки редактором — закрепляем текущего редактора
     if payload.status == models.ArticleStatus.editor_check:
         article.assigned_editor_id = int(current_user["user_id"])
-    db.commit()
-    db.refresh(article)
     notifications_url = getattr(config, "NOTIFICATION_SERVICE_URL", "http://notifications:8081")
 
-    # 1) Уведомление автора о комментариях редактора (если есть комментарий)
-    try:
-
-        with httpx.Client(timeout=5.0) as client:
-            editor_sub = str(article.assigned_editor_id or current_user.get("user_id") or 0)
-            token = jwt.encode({"sub": editor_sub, "roles": ["editor"]}, config.SECRET_KEY, algorithm=config.ALGORITHM)
-
-            client.post(
-                f"{notifications_url}/notifications/article",
-                json={
-                    "user_id": int(article.responsible_user_id),
-                    "article_id": int(article.id),
-                    "comments": payload.comment_for_author,
-                    "title": "Комментарии по рукописи",
-                    "type": "article_status",
-                },
-                headers={"Authorization": f"Bearer {token}"},
-            )
-    except Exception:
-        # Нефатальная ошибка уведомлений
-        pass
-
+    # Уведомление автора о комментариях редактора уходит через outbox после коммита
+    editor_id = int(article.assigned_editor_id or current_user.get("user_id") or 0)
+    outbox.enqueue(
+        db,
+        "article.status_changed",
+        "POST",
+        f"{notifications_url}/notifications/article",
+        json={
+            "user_id": int(article.responsible_user_id),
+            "article_id": int(article.id),
+            "comments": payload.comment_for_author,
+            "title": "Комментарии по рукописи",
+            "type": "article_status",
+        },
+        on_behalf_of={"user_id": editor_id, "roles": ["editor"]},
+    )
+    db.commit()
+    db.refresh(article)
     return {"id": article.id, "status": article.status}
 
 
@@ -1088,11 +1157,14 @@ def set_antiplagiarism_file(
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    new_url = _prefer_url(payload.file_id, payload.file_url)
-    if not new_url:
+    if payload.file_id:
+        ref = file_storage.FileRef.from_id(payload.file_id)
+    else:
+        ref = file_storage.FileRef.from_url(payload.file_url)
+    if not ref.url:
         raise HTTPException(status_code=400, detail="file_id or file_url is required")
 
-    article.antiplagiarism_file_url = new_url
+    file_storage.set_ref(article, "antiplagiarism", ref)
     db.commit()
     db.refresh(article)
     return article
@@ -14,3 +14,24 @@ LAYOUT_SERVICE_URL = os.getenv("LAYOUT_SERVICE_URL", "http://layout:8000")
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 SHARED_SERVICE_SECRET = os.getenv("SHARED_SERVICE_SECRET", "service-shared-secret")
+
+# X-Identity envelope from the API Gateway: replay window and tolerated clock skew (seconds)
+IDENTITY_MAX_AGE = int(os.getenv("IDENTITY_MAX_AGE", "30"))
+IDENTITY_CLOCK_SKEW = int(os.getenv("IDENTITY_CLOCK_SKEW", "5"))
+
+# count=estimate on article listings: planner estimates below this are replaced by an exact COUNT
+COUNT_ESTIMATE_EXACT_BELOW = int(os.getenv("COUNT_ESTIMATE_EXACT_BELOW", "1000"))
+# Autocomplete (/articles/authors/search, /articles/keywords/suggest): minimal pg_trgm
+# word_similarity for a fuzzy match; prefix matches are always returned
+TRGM_WORD_SIMILARITY_THRESHOLD = float(os.getenv("TRGM_WORD_SIMILARITY_THRESHOLD", "0.4"))
+# Article versions: a full keyframe every N versions, the ones between store only changed fields
+VERSION_KEYFRAME_INTERVAL = int(os.getenv("VERSION_KEYFRAME_INTERVAL", "10"))
+# Version diffs (/articles/editor/{id}/versions/{a}/diff/{b}) kept in memory, keyed by content hashes
+VERSION_DIFF_CACHE_SIZE = int(os.getenv("VERSION_DIFF_CACHE_SIZE", "512"))
+# Pooled client for File Storage downloads: connect/pool timeout, per-read timeout while streaming, pool size
+FILE_SERVICE_TIMEOUT = float(os.getenv("FILE_SERVICE_TIMEOUT", "10"))
+FILE_SERVICE_READ_TIMEOUT = float(os.getenv("FILE_SERVICE_READ_TIMEOUT", "30"))
+FILE_SERVICE_MAX_CONNECTIONS = int(os.getenv("FILE_SERVICE_MAX_CONNECTIONS", "100"))
+# File metadata cache (GET /files/{id} of File Storage): entries, and seconds a 404 is remembered
+FILE_METADATA_CACHE_SIZE = int(os.getenv("FILE_METADATA_CACHE_SIZE", "4096"))
+FILE_METADATA_NEGATIVE_TTL = float(os.getenv("FILE_METADATA_NEGATIVE_TTL", "30"))
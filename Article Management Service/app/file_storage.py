@@ -0,0 +1,183 @@
+"""
+Клиент File Storage: один пул keep-alive соединений на процесс.
+
+Файлы не читаются в память целиком: тело ответа File Storage передается
+клиенту по мере поступления, а Range/If-Range и условные заголовки уходят в
+File Storage как есть, поэтому докачка (206) и ETag/Last-Modified работают
+без участия этого сервиса.
+
+Загруженные файлы неизменяемы, поэтому их метаданные кэшируются в LRU
+без срока жизни; ответ 404 запоминается на FILE_METADATA_NEGATIVE_TTL секунд.
+"""
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import httpx
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from app import config
+
+# Заголовки клиента, от которых зависит ответ File Storage (частичный или 304)
+FORWARDED_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+FORWARDED_RESPONSE_HEADERS = (
+    "content-type",
+    "content-length",
+    "content-range",
+    "content-encoding",
+    "content-disposition",
+    "accept-ranges",
+    "etag",
+    "last-modified",
+    "cache-control",
+)
+# Ответы File Storage, которые отдаются клиенту как есть
+PASSTHROUGH_STATUSES = {200, 206, 304, 416}
+
+FILE_URL_RE = re.compile(r"^/files/(?P<file_id>[^/]+)/download$")
+
+
+@dataclass(frozen=True)
+class FileRef:
+    """Файл статьи: id в File Storage и URL скачивания (id None для внешних URL)."""
+
+    file_id: str | None = None
+    url: str | None = None
+
+    @classmethod
+    def from_id(cls, file_id: str | None) -> "FileRef":
+        return cls(file_id, f"/files/{file_id}/download") if file_id else cls()
+
+    @classmethod
+    def from_url(cls, url: str | None) -> "FileRef":
+        match = FILE_URL_RE.match(url or "")
+        return cls(match["file_id"] if match else None, url or None)
+
+
+def get_ref(article, kind: str) -> FileRef:
+    """Файл статьи вида kind (models.FILE_KINDS); для строк без file_id он берется из URL."""
+    file_id = getattr(article, f"{kind}_file_id")
+    url = getattr(article, f"{kind}_file_url")
+    return FileRef(file_id, url) if file_id else FileRef.from_url(url)
+
+
+def set_ref(article, kind: str, ref: FileRef):
+    setattr(article, f"{kind}_file_id", ref.file_id)
+    setattr(article, f"{kind}_file_url", ref.url)
+
+
+class MetadataCache:
+    """LRU метаданных по file_id; None — файл не найден (до истечения negative_ttl)."""
+
+    def __init__(self, max_entries: int, negative_ttl: float):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, tuple[dict | None, float]] = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, file_id: str) -> tuple[bool, dict | None]:
+        """(найдено в кэше, метаданные или None для запомненного 404)."""
+        entry = self._entries.get(file_id)
+        if entry is None or entry[1] <= time.monotonic():
+            self._entries.pop(file_id, None)
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(file_id)
+        if entry[0] is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, entry[0]
+
+    def put(self, file_id: str, metadata: dict | None):
+        expires_at = float("inf") if metadata is not None else time.monotonic() + self.negative_ttl
+        self._entries[file_id] = (metadata, expires_at)
+        self._entries.move_to_end(file_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+metadata_cache = MetadataCache(config.FILE_METADATA_CACHE_SIZE, config.FILE_METADATA_NEGATIVE_TTL)
+
+_client: httpx.AsyncClient | None = None
+
+
+def client() -> httpx.AsyncClient:
+    """Общий клиент; создается при первом запросе, закрывается при остановке приложения."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=config.FILE_SERVICE_URL,
+            timeout=httpx.Timeout(config.FILE_SERVICE_TIMEOUT, read=config.FILE_SERVICE_READ_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.FILE_SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=config.FILE_SERVICE_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close():
+    global _client
+    pool, _client = _client, None
+    if pool is not None:
+        await pool.aclose()
+
+
+async def _send(request: httpx.Request, stream: bool = False) -> httpx.Response:
+    try:
+        return await client().send(request, stream=stream)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="File service timeout")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to connect to file service: {str(e)}")
+
+
+async def get_metadata(file_id: str) -> dict:
+    """Метаданные файла из кэша или File Storage (404 тоже кэшируется)."""
+    cached, metadata = metadata_cache.get(file_id)
+    if not cached:
+        response = await _send(client().build_request("GET", f"/files/{file_id}"))
+        if response.status_code == 404:
+            metadata = None
+        elif response.status_code != 200:
+            raise HTTPException(status_code=502, detail="Failed to retrieve file from storage service")
+        else:
+            metadata = response.json()
+        metadata_cache.put(file_id, metadata)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="File not found in storage")
+    return metadata
+
+
+async def _relay(response: httpx.Response):
+    # Закрытие в finally срабатывает и при обрыве соединения клиентом
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def stream_download(file_id: str, request_headers) -> Response:
+    """Ответ File Storage на скачивание файла, переданный клиенту потоком."""
+    headers = {name: request_headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request_headers}
+    response = await _send(client().build_request("GET", f"/files/{file_id}/download", headers=headers), stream=True)
+    if response.status_code not in PASSTHROUGH_STATUSES:
+        await response.aclose()
+        if response.status_code in (404, 410):
+            # Файл удален: метаданные из кэша больше не верны
+            metadata_cache.put(file_id, None)
+            raise HTTPException(status_code=404, detail="File not found in storage")
+        raise HTTPException(status_code=502, detail="Failed to download file from storage service")
+
+    response_headers = {name: response.headers[name] for name in FORWARDED_RESPONSE_HEADERS if name in response.headers}
+    if response.status_code in (304, 416):
+        await response.aread()
+        await response.aclose()
+        return Response(content=response.content, status_code=response.status_code, headers=response_headers)
+    return StreamingResponse(_relay(response), status_code=response.status_code, headers=response_headers)
@@ -0,0 +1,110 @@
+"""
+Полнотекстовый поиск по статьям (PostgreSQL tsvector).
+
+Заголовки и аннотации на трех языках индексируются в генерируемой колонке
+articles.search_vector (models.SEARCH_FIELDS): русский текст — конфигурацией
+'russian', английский — 'english', казахский — 'simple'. Заголовки имеют вес A,
+аннотации — B. Запрос разбирается всеми тремя конфигурациями и объединяется
+через OR, поэтому слово находится в любой словоформе, которую понимает хотя бы
+одна из них.
+
+Для подсказок по авторам и ключевым словам используется нечеткий поиск pg_trgm
+(GIN-индексы gin_trgm_ops): совпадение по началу слова или word_similarity.
+"""
+import html
+
+from sqlalchemy import and_, case, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from app import models
+from app.models import SEARCH_FIELDS
+
+QUERY_CONFIGS = ("russian", "english", "simple")
+
+# Маркеры подсветки из ts_headline; заменяются на <mark> после экранирования HTML
+_START, _STOP = "\x02", "\x03"
+_TITLE_HEADLINE = f"StartSel={_START}, StopSel={_STOP}, HighlightAll=true"
+_ABSTRACT_HEADLINE = f"StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=\" … \""
+
+
+def ts_query(text: str):
+    """tsquery для пользовательского ввода (синтаксис websearch: "фраза", or, -исключение)."""
+    query = None
+    for config in QUERY_CONFIGS:
+        part = func.websearch_to_tsquery(literal(config).cast(REGCONFIG), text)
+        query = part if query is None else query.op("||")(part)
+    return query
+
+
+def matches(query):
+    return models.Article.search_vector.op("@@")(query)
+
+
+def rank(query):
+    return func.ts_rank(models.Article.search_vector, query)
+
+
+def _mark(fragment: str | None) -> str | None:
+    if not fragment or _START not in fragment:
+        return None
+    return html.escape(fragment).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def highlights(db: Session, article_ids: list[int], query) -> dict[int, dict]:
+    """
+    Подсвеченные фрагменты (HTML с <mark>) для статей одной страницы:
+    {article_id: {поле: фрагмент}}, только поля, в которых есть совпадения.
+    """
+    if not article_ids:
+        return {}
+    columns = [models.Article.id]
+    for field, config, _ in SEARCH_FIELDS:
+        options = _TITLE_HEADLINE if field.startswith("title") else _ABSTRACT_HEADLINE
+        text = getattr(models.Article, field)
+        columns.append(
+            func.ts_headline(literal(config).cast(REGCONFIG), func.coalesce(text, ""), query, options).label(field)
+        )
+    rows = db.execute(select(*columns).where(models.Article.id.in_(article_ids))).all()
+    result = {}
+    for row in rows:
+        fragments = {field: _mark(getattr(row, field)) for field, _, _ in SEARCH_FIELDS}
+        result[row.id] = {field: fragment for field, fragment in fragments.items() if fragment}
+    return result
+
+
+def _starts_word(column, word: str):
+    """Какое-либо слово поля начинается с word (ILIKE, экранируя % и _)."""
+    escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return or_(column.ilike(escaped + "%"), column.ilike("% " + escaped + "%"))
+
+
+def query_words(text: str, limit: int = 5) -> list[str]:
+    return text.split()[:limit]
+
+
+def fuzzy_match(columns, words: list[str]):
+    """Каждое слово запроса — начало слова в одном из полей или похоже на слово в нем (<%)."""
+    return and_(*[
+        or_(*[_starts_word(column, word) for column in columns],
+            *[literal(word).op("<%")(column) for column in columns])
+        for word in words
+    ])
+
+
+def fuzzy_rank(columns, words: list[str]):
+    """(число слов с совпадением по префиксу, суммарная word_similarity) — для ORDER BY ... DESC."""
+    prefix_hits = sum(
+        case((or_(*[_starts_word(column, word) for column in columns]), 1), else_=0)
+        for word in words
+    )
+    similarity = sum(
+        func.greatest(*[func.coalesce(func.word_similarity(word, column), 0) for column in columns])
+        for word in words
+    )
+    return prefix_hits, similarity
+
+
+def set_similarity_threshold(db: Session, threshold: float):
+    """Порог оператора <% на время текущей транзакции."""
+    db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)))
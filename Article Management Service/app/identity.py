@@ -0,0 +1,83 @@
+"""Signed identity envelope (X-Identity) issued by the API Gateway.
+
+The gateway verifies the bearer JWT once and forwards the caller as
+``base64url(json).base64url(hmac_sha256)`` signed with SHARED_SERVICE_SECRET.
+Services verify that instead of decoding the JWT again, and can sign their own
+envelope for service-to-service calls made on behalf of a user.
+
+This module is copied verbatim into every service that uses it; keep the copies
+identical (tools/check_shared_modules.py enforces this in CI).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from fastapi import HTTPException
+
+from app import config
+
+IDENTITY_HEADER = "X-Identity"
+
+
+class IdentityError(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(config.SHARED_SERVICE_SECRET.encode(), payload.encode(), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+
+def sign_identity(user_id: int, roles: list[str]) -> str:
+    claims = {"sub": int(user_id), "roles": list(roles or []), "iat": int(time.time())}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_signature(payload)}"
+
+
+def verify_identity(envelope: str) -> dict:
+    """Check signature and age of an envelope and return {"user_id", "roles"}."""
+    try:
+        payload, signature = envelope.split(".", 1)
+    except ValueError:
+        raise IdentityError("Malformed identity")
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise IdentityError("Bad identity signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+        user_id = int(claims["sub"])
+        issued_at = int(claims["iat"])
+    except (ValueError, KeyError, TypeError):
+        raise IdentityError("Malformed identity")
+
+    # Envelopes are only accepted inside a short replay window, allowing for
+    # small clock differences between containers in either direction.
+    age = time.time() - issued_at
+    if age > config.IDENTITY_MAX_AGE + config.IDENTITY_CLOCK_SKEW:
+        raise IdentityError("Identity expired")
+    if age < -config.IDENTITY_CLOCK_SKEW:
+        raise IdentityError("Identity issued in the future")
+
+    roles = claims.get("roles") or []
+    if isinstance(roles, str):
+        roles = [r.strip() for r in roles.split(",") if r.strip()]
+    return {"user_id": user_id, "roles": roles}
+
+
+def identity_from_header(x_identity: str | None) -> dict | None:
+    """Dependency helper: None when no envelope was sent, 401 when it is invalid."""
+    if not x_identity:
+        return None
+    try:
+        return verify_identity(x_identity)
+    except IdentityError as exc:
+        raise HTTPException(status_code=401, detail=str(exc))
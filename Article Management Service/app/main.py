@@ -1,13 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.articles_router import router as articles_router
 from app.volumes_router import router as volumes_router
 from app.database import Base, engine
 from app import models  # register models for metadata
+from app import tracing, file_storage, outbox
 from alembic.config import Config
 from alembic import command
 import os
 
-app = FastAPI(title="Article Management Service")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    outbox.dispatcher.start()
+    try:
+        yield
+    finally:
+        outbox.dispatcher.stop()
+        # Пул соединений с File Storage живет все время работы процесса
+        await file_storage.close()
+
+
+app = FastAPI(title="Article Management Service", lifespan=lifespan)
+tracing.setup(app, "articles", engine)
+outbox.setup(app, "articles")
 
 
 def run_migrations():
@@ -1,9 +1,18 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Table, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Table, Boolean, Index, Computed, DDL, UniqueConstraint, event
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred, object_session
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
 
+# Триграммные индексы авторов и ключевых слов требуют pg_trgm; при create_all
+# (запасной путь main.run_migrations) расширение создается до таблиц
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 # Association tables
 article_authors = Table(
     "article_authors",
@@ -50,6 +59,22 @@ volume_articles = Table(
 )
 
 
+# Полнотекстовый поиск: (поле, конфигурация PostgreSQL, вес) в порядке построения
+# articles.search_vector. Для казахского словаря нет, поэтому 'simple'.
+SEARCH_FIELDS = [
+    ("title_ru", "russian", "A"),
+    ("title_en", "english", "A"),
+    ("title_kz", "simple", "A"),
+    ("abstract_ru", "russian", "B"),
+    ("abstract_en", "english", "B"),
+    ("abstract_kz", "simple", "B"),
+]
+SEARCH_VECTOR_SQL = " || ".join(
+    f"setweight(to_tsvector('{config}', coalesce({field}, '')), '{weight}')"
+    for field, config, weight in SEARCH_FIELDS
+)
+
+
 class ArticleStatus(str, enum.Enum):
     draft = "draft"
     submitted = "submitted"
@@ -90,6 +115,12 @@ class Author(Base):
 
     articles = relationship("Article", secondary=article_authors, back_populates="authors")
 
+    # Нечеткий поиск по ФИО (ILIKE '%x%', word_similarity)
+    __table_args__ = tuple(
+        Index(f"ix_authors_{name}_trgm", name, postgresql_using="gin", postgresql_ops={name: "gin_trgm_ops"})
+        for name in ("first_name", "last_name", "patronymic")
+    )
+
 
 class Keyword(Base):
     __tablename__ = "keywords"
@@ -101,6 +132,19 @@ class Keyword(Base):
 
     articles = relationship("Article", secondary=article_keywords, back_populates="keywords")
 
+    # Одинаковая тройка названий — одно ключевое слово (upsert по ON CONFLICT);
+    # триграммные индексы — для нечеткого поиска и подсказок на трех языках
+    __table_args__ = (
+        UniqueConstraint("title_kz", "title_en", "title_ru", name="uq_keywords_titles"),
+    ) + tuple(
+        Index(f"ix_keywords_{name}_trgm", name, postgresql_using="gin", postgresql_ops={name: "gin_trgm_ops"})
+        for name in ("title_kz", "title_en", "title_ru")
+    )
+
+
+# Файлы статьи: колонки <kind>_file_id и <kind>_file_url
+FILE_KINDS = ("manuscript", "antiplagiarism", "author_info", "cover_letter")
+
 
 class Article(Base):
     __tablename__ = "articles"
@@ -125,9 +169,17 @@ class Article(Base):
     manuscript_file_url = Column(String, nullable=True)
     author_info_file_url = Column(String, nullable=True)
     cover_letter_file_url = Column(String, nullable=True)
+    # id файлов в File Storage рядом с URL (пара задается через app.file_storage.set_ref);
+    # NULL, если файл указан внешним URL
+    antiplagiarism_file_id = Column(String, nullable=True)
+    manuscript_file_id = Column(String, nullable=True)
+    author_info_file_id = Column(String, nullable=True)
+    cover_letter_file_id = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     current_version_id = Column(Integer, ForeignKey("article_versions.id"), nullable=True)
+    # Генерируется PostgreSQL из заголовков и аннотаций (см. app/fulltext.py); не загружается по умолчанию
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
 
     # Explicit foreign_keys to avoid ambiguity with current_version_id
     versions = relationship(
@@ -139,6 +191,25 @@ class Article(Base):
     keywords = relationship("Keyword", secondary=article_keywords, back_populates="articles")
     volumes = relationship("Volume", secondary=volume_articles, back_populates="articles")
 
+    # Списки статей для редактора: сортировка (created_at, id) и keyset-пагинация
+    __table_args__ = (
+        Index("ix_articles_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_articles_created_at_id", "created_at", "id"),
+        Index("ix_articles_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+class VersionField:
+    """Поле снимка версии, восстановленное из ключевого кадра и дельт его цепочки (см. app/version_store.py)."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, version, owner=None):
+        if version is None:
+            return self
+        return version.content[self.name]
+
 
 class ArticleVersion(Base):
     __tablename__ = "article_versions"
@@ -147,43 +218,78 @@ class ArticleVersion(Base):
     article_id = Column(Integer, ForeignKey("articles.id"))
     version_number = Column(Integer, nullable=False)
     version_code = Column(String, nullable=True)
-    
-    # Полный снимок статьи на момент создания версии
-    title_kz = Column(String, nullable=False)
-    title_en = Column(String, nullable=False)
-    title_ru = Column(String, nullable=False)
-    abstract_kz = Column(String, nullable=True)
-    abstract_en = Column(String, nullable=True)
-    abstract_ru = Column(String, nullable=True)
-    doi = Column(String, nullable=True)
-    article_type = Column(Enum(ArticleType), nullable=False)
-    
-    # Файлы
-    manuscript_file_url = Column(String, nullable=True)
-    antiplagiarism_file_url = Column(String, nullable=True)
-    author_info_file_url = Column(String, nullable=True)
-    cover_letter_file_url = Column(String, nullable=True)
-    
-    # Дополнительная информация
-    not_published_elsewhere = Column(Boolean, default=False)
-    plagiarism_free = Column(Boolean, default=False)
-    authors_agree = Column(Boolean, default=False)
-    generative_ai_info = Column(String, nullable=True)
-    
+
+    # Снимок статьи хранится в snapshot: у ключевого кадра (base_version_id IS NULL)
+    # все поля, у дельты только поля, изменившиеся с предыдущей версии. base_version_id
+    # дельты указывает на ее ключевой кадр; полный снимок — кадр, на который по порядку
+    # наложены все дельты цепочки до этой версии (version_store._full_snapshots).
+    # content_hash — sha256 полного снимка, одинаковые сохранения подряд не создают версию
+    content_hash = Column(String(64), nullable=True, index=True)
+    base_version_id = Column(Integer, ForeignKey("article_versions.id"), nullable=True, index=True)
+    snapshot = Column(JSONB, nullable=True)
+
+    # Колонки полного снимка старого формата: заполнены только у версий, которые
+    # еще не переведены в snapshot (python -m app.version_store compact)
+    _title_kz = Column("title_kz", String, nullable=True)
+    _title_en = Column("title_en", String, nullable=True)
+    _title_ru = Column("title_ru", String, nullable=True)
+    _abstract_kz = Column("abstract_kz", String, nullable=True)
+    _abstract_en = Column("abstract_en", String, nullable=True)
+    _abstract_ru = Column("abstract_ru", String, nullable=True)
+    _doi = Column("doi", String, nullable=True)
+    _article_type = Column("article_type", Enum(ArticleType), nullable=True)
+    _manuscript_file_url = Column("manuscript_file_url", String, nullable=True)
+    _antiplagiarism_file_url = Column("antiplagiarism_file_url", String, nullable=True)
+    _author_info_file_url = Column("author_info_file_url", String, nullable=True)
+    _cover_letter_file_url = Column("cover_letter_file_url", String, nullable=True)
+    _not_published_elsewhere = Column("not_published_elsewhere", Boolean, nullable=True)
+    _plagiarism_free = Column("plagiarism_free", Boolean, nullable=True)
+    _authors_agree = Column("authors_agree", Boolean, nullable=True)
+    _generative_ai_info = Column("generative_ai_info", String, nullable=True)
     # Legacy поле для обратной совместимости (можно удалить позже)
-    file_url = Column(String, nullable=True)
-    
+    _file_url = Column("file_url", String, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_published = Column(Boolean, default=False)
 
+    # Полный снимок статьи на момент создания версии (только чтение)
+    title_kz = VersionField()
+    title_en = VersionField()
+    title_ru = VersionField()
+    abstract_kz = VersionField()
+    abstract_en = VersionField()
+    abstract_ru = VersionField()
+    doi = VersionField()
+    article_type = VersionField()
+    manuscript_file_url = VersionField()
+    antiplagiarism_file_url = VersionField()
+    author_info_file_url = VersionField()
+    cover_letter_file_url = VersionField()
+    not_published_elsewhere = VersionField()
+    plagiarism_free = VersionField()
+    authors_agree = VersionField()
+    generative_ai_info = VersionField()
+    file_url = VersionField()
+    authors = VersionField()
+    keywords = VersionField()
+
     # Relationships
     article = relationship(
         "Article",
         back_populates="versions",
         foreign_keys=[article_id],
     )
-    authors = relationship("Author", secondary=article_version_authors)
-    keywords = relationship("Keyword", secondary=article_version_keywords)
+    # Связи версий старого формата; новые версии хранят author_ids/keyword_ids в snapshot
+    legacy_authors = relationship("Author", secondary=article_version_authors)
+    legacy_keywords = relationship("Keyword", secondary=article_version_keywords)
+
+    @property
+    def content(self) -> dict:
+        """Восстановленный снимок; вместе с ним восстанавливаются все версии, загруженные в сессию."""
+        if "_content" not in self.__dict__:
+            from app import version_store
+            version_store.resolve(object_session(self), [self])
+        return self.__dict__["_content"]
 
 
 class Volume(Base):
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -60,6 +60,23 @@ class AuthorOut(AuthorCreate):
         orm_mode = True
 
 
+class SuggestPagination(BaseModel):
+    page: int
+    page_size: int
+    has_next: bool
+    has_prev: bool
+
+
+class AuthorSearchPage(BaseModel):
+    items: List[AuthorOut]
+    pagination: SuggestPagination
+
+
+class KeywordSuggestPage(BaseModel):
+    items: List[KeywordOut]
+    pagination: SuggestPagination
+
+
 class ArticleVersionBase(BaseModel):
     file_url: str
     version_number: int
@@ -107,6 +124,43 @@ class ArticleVersionOut(BaseModel):
         orm_mode = True
 
 
+class VersionRef(BaseModel):
+    id: int
+    version_number: int
+    version_code: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+
+class FieldDiff(BaseModel):
+    # Заголовки и аннотации: пословные операции ["=" | "-" | "+", текст]
+    ops: Optional[List[Tuple[str, str]]] = None
+    # Остальные поля: значение в старой и новой версии
+    old: Optional[Any] = None
+    new: Optional[Any] = None
+
+
+class AuthorsDiff(BaseModel):
+    added: List[AuthorOut] = Field(default_factory=list)
+    removed: List[AuthorOut] = Field(default_factory=list)
+
+
+class KeywordsDiff(BaseModel):
+    added: List[KeywordOut] = Field(default_factory=list)
+    removed: List[KeywordOut] = Field(default_factory=list)
+
+
+class ArticleVersionDiff(BaseModel):
+    article_id: int
+    from_version: VersionRef
+    to_version: VersionRef
+    # Только изменившиеся поля
+    fields: Dict[str, FieldDiff] = Field(default_factory=dict)
+    authors: Optional[AuthorsDiff] = None
+    keywords: Optional[KeywordsDiff] = None
+
+
 class ArticleCreate(BaseModel):
     title_kz: str
     title_en: str
@@ -197,6 +251,11 @@ class ArticleOut(BaseModel):
     manuscript_file_url: Optional[str] = None
     author_info_file_url: Optional[str] = None
     cover_letter_file_url: Optional[str] = None
+    # id файлов в File Storage (None для внешних URL)
+    antiplagiarism_file_id: Optional[str] = None
+    manuscript_file_id: Optional[str] = None
+    author_info_file_id: Optional[str] = None
+    cover_letter_file_id: Optional[str] = None
     # Ссылка на файл верстки (если доступна)
     layout_file_url: Optional[str] = None
     created_at: datetime
@@ -0,0 +1,94 @@
+"""
+Сравнение версий статьи на сервере.
+
+Текстовые поля (заголовки и аннотации на трех языках) сравниваются по словам
+и отдаются списком операций ["=" | "-" | "+", текст]: каждый фрагмент текста
+передается один раз, по ним клиент рисует обе версии. Остальные поля — пара
+old/new, авторы и ключевые слова — добавленные и удаленные id. Неизменившиеся
+поля в ответ не попадают.
+
+Версии неизменяемы, поэтому результат кэшируется по паре content_hash.
+"""
+import difflib
+import re
+from collections import OrderedDict
+
+from app import config
+from app.version_store import SNAPSHOT_FIELDS
+
+TEXT_FIELDS = ("title_kz", "title_en", "title_ru", "abstract_kz", "abstract_en", "abstract_ru")
+LINK_FIELDS = (("authors", "author_ids"), ("keywords", "keyword_ids"))
+
+# Слова, пробелы и знаки препинания — отдельные токены, чтобы склейка токенов давала исходный текст
+TOKEN_RE = re.compile(r"\w+|\s+|[^\w\s]", re.UNICODE)
+
+
+def word_ops(old: str | None, new: str | None) -> list[list[str]]:
+    """Пословный diff двух текстов: соседние операции одного вида склеены."""
+    a = TOKEN_RE.findall(old or "")
+    b = TOKEN_RE.findall(new or "")
+    ops: list[list[str]] = []
+
+    def emit(kind: str, tokens: list[str]):
+        if not tokens:
+            return
+        text = "".join(tokens)
+        if ops and ops[-1][0] == kind:
+            ops[-1][1] += text
+        else:
+            ops.append([kind, text])
+
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            emit("=", a[i1:i2])
+        else:
+            emit("-", a[i1:i2])
+            emit("+", b[j1:j2])
+    return ops
+
+
+def diff_snapshots(old: dict, new: dict) -> dict:
+    """Изменения между двумя полными снимками (формат app.version_store)."""
+    fields = {}
+    for field in SNAPSHOT_FIELDS + ("file_url",):
+        before, after = old.get(field), new.get(field)
+        if before == after:
+            continue
+        if field in TEXT_FIELDS:
+            fields[field] = {"ops": word_ops(before, after)}
+        else:
+            fields[field] = {"old": before, "new": after}
+    links = {}
+    for name, key in LINK_FIELDS:
+        before, after = set(old.get(key, [])), set(new.get(key, []))
+        if before != after:
+            links[name] = {"added": sorted(after - before), "removed": sorted(before - after)}
+    return {"fields": fields, **links}
+
+
+class DiffCache:
+    """LRU результатов diff_snapshots по паре хэшей содержимого (старая версия, новая версия)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> dict | None:
+        diff = self._entries.get(key)
+        if diff is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return diff
+
+    def put(self, key: tuple[str, str], diff: dict):
+        self._entries[key] = diff
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+diff_cache = DiffCache(config.VERSION_DIFF_CACHE_SIZE)
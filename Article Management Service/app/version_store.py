@@ -0,0 +1,280 @@
+"""
+Хранилище версий статей: ключевые кадры и дельты.
+
+Снимок версии — словарь полей SNAPSHOT_FIELDS плюс file_url, author_ids и
+keyword_ids. Ключевой кадр хранит снимок целиком, дельта — только поля,
+изменившиеся с предыдущей версии, и ссылку base_version_id на свой ключевой
+кадр: версия собирается из цепочки кадра (одним запросом), а новый ключевой
+кадр пишется каждые VERSION_KEYFRAME_INTERVAL версий. Сохранение, совпадающее
+по content_hash с последней версией, новую версию не создает.
+
+Версии старого формата (полные колонки и таблицы article_version_*) читаются
+как есть; перевести их в новый формат:
+
+    python -m app.version_store compact [--batch-size 100] [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import config, models
+
+SNAPSHOT_FIELDS = (
+    "title_kz",
+    "title_en",
+    "title_ru",
+    "abstract_kz",
+    "abstract_en",
+    "abstract_ru",
+    "doi",
+    "article_type",
+    "manuscript_file_url",
+    "antiplagiarism_file_url",
+    "author_info_file_url",
+    "cover_letter_file_url",
+    "not_published_elsewhere",
+    "plagiarism_free",
+    "authors_agree",
+    "generative_ai_info",
+)
+
+
+def _canonical(snapshot: dict) -> str:
+    return json.dumps(snapshot, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def content_hash(snapshot: dict) -> str:
+    return hashlib.sha256(_canonical(snapshot).encode()).hexdigest()
+
+
+def article_snapshot(db: Session, article: models.Article) -> dict:
+    """Снимок текущего состояния статьи; связи читаются из БД, а не из загруженных relationship."""
+    snapshot = {field: getattr(article, field) for field in SNAPSHOT_FIELDS}
+    snapshot["article_type"] = models.ArticleType(article.article_type).value
+    snapshot["file_url"] = article.manuscript_file_url
+    snapshot["author_ids"] = sorted(db.scalars(
+        select(models.article_authors.c.author_id).where(models.article_authors.c.article_id == article.id)
+    ))
+    snapshot["keyword_ids"] = sorted(db.scalars(
+        select(models.article_keywords.c.keyword_id).where(models.article_keywords.c.article_id == article.id)
+    ))
+    return snapshot
+
+
+def _legacy_snapshots(db: Session, versions: list[models.ArticleVersion]) -> dict[int, dict]:
+    """Снимки версий старого формата: колонки плюс связи (по запросу на таблицу связей)."""
+    snapshots = {}
+    for version in versions:
+        snapshot = {field: getattr(version, "_" + field) for field in SNAPSHOT_FIELDS}
+        snapshot["article_type"] = models.ArticleType(version._article_type).value
+        snapshot["file_url"] = version._file_url
+        snapshot["author_ids"] = []
+        snapshot["keyword_ids"] = []
+        snapshots[version.id] = snapshot
+    if snapshots:
+        for table, column, key in (
+            (models.article_version_authors, "author_id", "author_ids"),
+            (models.article_version_keywords, "keyword_id", "keyword_ids"),
+        ):
+            rows = db.execute(
+                select(table.c.version_id, table.c[column])
+                .where(table.c.version_id.in_(list(snapshots)))
+                .order_by(table.c[column])
+            )
+            for version_id, linked_id in rows:
+                snapshots[version_id][key].append(linked_id)
+    return snapshots
+
+
+def _full_snapshots(db: Session, versions: list[models.ArticleVersion]) -> dict[int, dict]:
+    """Полные снимки версий: цепочки их ключевых кадров читаются одним запросом."""
+    snapshots = _legacy_snapshots(db, [v for v in versions if v.snapshot is None])
+    keyframe_ids = {v.base_version_id or v.id for v in versions if v.snapshot is not None}
+    if keyframe_ids:
+        table = models.ArticleVersion.__table__
+        rows = db.execute(
+            select(table.c.id, table.c.base_version_id, table.c.snapshot)
+            .where(table.c.id.in_(keyframe_ids) | table.c.base_version_id.in_(keyframe_ids))
+            .order_by(table.c.version_number, table.c.id)
+        )
+        current = {}
+        for version_id, base_version_id, snapshot in rows:
+            if base_version_id is None:
+                current[version_id] = snapshot
+            else:
+                current[base_version_id] = {**current[base_version_id], **snapshot}
+            snapshots[version_id] = current[base_version_id or version_id]
+    return snapshots
+
+
+def resolve(db: Session, versions: list[models.ArticleVersion]):
+    """
+    Восстанавливает содержимое версий (ArticleVersion.content).
+    Заодно восстанавливаются все уже загруженные в сессию версии, чтобы список
+    версий статьи обходился постоянным числом запросов, а не запросами на версию.
+    """
+    pending = {v.id: v for v in versions if "_content" not in v.__dict__}
+    for obj in list(db.identity_map.values()):
+        # Только версии с загруженными колонками: истекшие пришлось бы перечитывать по одной
+        if isinstance(obj, models.ArticleVersion) and "snapshot" in obj.__dict__ and "_content" not in obj.__dict__:
+            pending.setdefault(obj.id, obj)
+    if not pending:
+        return
+
+    snapshots = _full_snapshots(db, list(pending.values()))
+    author_ids = {i for s in snapshots.values() for i in s["author_ids"]}
+    keyword_ids = {i for s in snapshots.values() for i in s["keyword_ids"]}
+    authors = {a.id: a for a in db.query(models.Author).filter(models.Author.id.in_(author_ids))} if author_ids else {}
+    keywords = {k.id: k for k in db.query(models.Keyword).filter(models.Keyword.id.in_(keyword_ids))} if keyword_ids else {}
+
+    for version_id, version in pending.items():
+        snapshot = snapshots[version_id]
+        content = {field: snapshot.get(field) for field in SNAPSHOT_FIELDS}
+        content["article_type"] = models.ArticleType(snapshot["article_type"])
+        content["file_url"] = snapshot.get("file_url")
+        content["authors"] = [authors[i] for i in snapshot["author_ids"] if i in authors]
+        content["keywords"] = [keywords[i] for i in snapshot["keyword_ids"] if i in keywords]
+        version.__dict__["_snapshot"] = snapshot
+        version.__dict__["_content"] = content
+
+
+def full_snapshot(db: Session, version: models.ArticleVersion) -> dict:
+    if "_snapshot" not in version.__dict__:
+        resolve(db, [version])
+    return version.__dict__["_snapshot"]
+
+
+def _encode(snapshot: dict, previous: dict | None, keyframe_id: int | None, deltas_since: int) -> tuple[int | None, dict]:
+    """(base_version_id, snapshot для записи): дельта к previous или новый ключевой кадр."""
+    if keyframe_id is None or deltas_since + 1 >= config.VERSION_KEYFRAME_INTERVAL:
+        return None, snapshot
+    return keyframe_id, {k: v for k, v in snapshot.items() if previous.get(k) != v}
+
+
+def _chain_of(db: Session, version: models.ArticleVersion | None) -> tuple[int | None, int]:
+    """Ключевой кадр, к которому пишется дельта после version, и число дельт в его цепочке."""
+    if version is None or version.snapshot is None:
+        return None, 0
+    keyframe_id = version.base_version_id or version.id
+    deltas = db.query(models.ArticleVersion.id).filter(models.ArticleVersion.base_version_id == keyframe_id).count()
+    return keyframe_id, deltas
+
+
+def save_version(db: Session, article: models.Article) -> tuple[models.ArticleVersion, bool]:
+    """
+    Версия текущего состояния статьи: (версия, создана ли новая).
+    Если содержимое совпадает с последней версией, возвращается она.
+    """
+    snapshot = article_snapshot(db, article)
+    digest = content_hash(snapshot)
+    latest = (
+        db.query(models.ArticleVersion)
+        .filter(models.ArticleVersion.article_id == article.id)
+        .order_by(models.ArticleVersion.version_number.desc())
+        .first()
+    )
+    if latest is not None and (latest.content_hash or content_hash(full_snapshot(db, latest))) == digest:
+        return latest, False
+
+    version_number = latest.version_number + 1 if latest else 1
+    previous = full_snapshot(db, latest) if latest is not None else None
+    base_version_id, stored = _encode(snapshot, previous, *_chain_of(db, latest))
+    version = models.ArticleVersion(
+        article_id=article.id,
+        version_number=version_number,
+        version_code=f"TAU-V{version_number}",
+        content_hash=digest,
+        base_version_id=base_version_id,
+        snapshot=stored,
+    )
+    db.add(version)
+    db.flush()
+    return version, True
+
+
+def compact_article(db: Session, article_id: int) -> dict:
+    """Переводит версии статьи старого формата в ключевые кадры и дельты."""
+    versions = (
+        db.query(models.ArticleVersion)
+        .filter(models.ArticleVersion.article_id == article_id, models.ArticleVersion.snapshot.is_(None))
+        .order_by(models.ArticleVersion.version_number)
+        .all()
+    )
+    snapshots = _legacy_snapshots(db, versions)
+    stats = {"versions": len(versions), "keyframes": 0, "bytes_before": 0, "bytes_after": 0}
+    previous, keyframe_id, deltas = None, None, 0
+    for version in versions:
+        snapshot = snapshots[version.id]
+        base_version_id, stored = _encode(snapshot, previous, keyframe_id, deltas)
+        if base_version_id is None:
+            keyframe_id, deltas = version.id, 0
+            stats["keyframes"] += 1
+        else:
+            deltas += 1
+        previous = snapshot
+        stats["bytes_before"] += len(_canonical(snapshot).encode())
+        stats["bytes_after"] += len(_canonical(stored).encode())
+
+        version.content_hash = content_hash(snapshot)
+        version.base_version_id = base_version_id
+        version.snapshot = stored
+        for field in SNAPSHOT_FIELDS + ("file_url",):
+            setattr(version, "_" + field, None)
+
+    ids = [v.id for v in versions]
+    if ids:
+        db.execute(models.article_version_authors.delete().where(models.article_version_authors.c.version_id.in_(ids)))
+        db.execute(models.article_version_keywords.delete().where(models.article_version_keywords.c.version_id.in_(ids)))
+    db.flush()
+    return stats
+
+
+def compact(db: Session, batch_size: int = 100, dry_run: bool = False) -> dict:
+    """Переводит все версии старого формата; коммит после каждых batch_size статей."""
+    article_ids = list(db.scalars(
+        select(models.ArticleVersion.article_id)
+        .where(models.ArticleVersion.snapshot.is_(None))
+        .distinct()
+        .order_by(models.ArticleVersion.article_id)
+    ))
+    totals = {"articles": len(article_ids), "versions": 0, "keyframes": 0, "bytes_before": 0, "bytes_after": 0}
+    for start in range(0, len(article_ids), batch_size):
+        for article_id in article_ids[start:start + batch_size]:
+            for key, value in compact_article(db, article_id).items():
+                totals[key] += value
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        db.expunge_all()
+    return totals
+
+
+def main() -> int:
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.version_store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact_parser = commands.add_parser("compact", help="convert full-copy versions to keyframes and deltas")
+    compact_parser.add_argument("--batch-size", type=int, default=100, help="articles per transaction")
+    compact_parser.add_argument("--dry-run", action="store_true", help="report sizes without writing")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        totals = compact(db, batch_size=args.batch_size, dry_run=args.dry_run)
+    finally:
+        db.close()
+    print(
+        f"{totals['articles']} articles, {totals['versions']} versions "
+        f"({totals['keyframes']} keyframes): snapshot bytes {totals['bytes_before']} -> {totals['bytes_after']}"
+        + (" (dry run)" if args.dry_run else "")
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session, joinedload
 from typing import List
 from jose import jwt, JWTError
-from app import models, schemas, database, config
+from app import models, schemas, database, config, identity
 import httpx
 
 router = APIRouter(prefix="/volumes", tags=["volumes"])
@@ -16,7 +16,16 @@ def get_db():
         db.close()
 
 
-def get_current_user(authorization: str = Header(...)):
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    x_identity: str | None = Header(default=None, alias=identity.IDENTITY_HEADER),
+):
+    # Prefer the signed identity forwarded by the API Gateway (no JWT decode needed)
+    user = identity.identity_from_header(x_identity)
+    if user is not None:
+        return user
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing Authorization header")
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token")
     token = authorization.replace("Bearer ", "")
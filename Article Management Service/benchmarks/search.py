@@ -0,0 +1,154 @@
+"""
+Бенчмарк поиска статей на синтетических данных (по умолчанию 100 000 статей).
+
+Сравнивает прежний фильтр ILIKE '%q%' по шести полям с полнотекстовым поиском
+(search_vector @@ tsquery, сортировка по ts_rank) и замеряет весь /articles/search
+с подсветкой. Статьи создаются в базе DATABASE_URL (схема уже накатана) с
+отдельным responsible_user_id и удаляются после замера (--keep оставляет их).
+
+    DATABASE_URL=postgresql://... python -m benchmarks.search [--count 100000] [--keep]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import delete, func, insert, or_, select, text
+
+from app import database, fulltext, models
+
+BENCH_USER_ID = -180018
+BATCH = 5000
+QUERIES = ["нейронные сети", "machine learning", "зерттеу", '"climate model"', "graphene -battery"]
+
+WORDS = {
+    "ru": "исследование анализ модель метод данные система нейронные сети обучение климат почва вода "
+          "экономика регион развитие оценка алгоритм оптимизация управление энергия степь урожай".split(),
+    "en": "study analysis model method data system neural network learning machine climate soil water "
+          "economy region development assessment algorithm optimization graphene battery energy".split(),
+    "kz": "зерттеу талдау үлгі әдіс деректер жүйе нейрондық желі оқыту климат топырақ су экономика "
+          "аймақ даму бағалау алгоритм басқару энергия дала егін".split(),
+}
+
+
+# Тематических слов в тексте немного, остальное — слова из синтетического словаря,
+# чтобы запросы были избирательными, как на настоящих данных
+TOPIC_SHARE = 0.1
+LEXICON_SIZE = 5000
+SYLLABLES = {
+    "ru": "ка ло ми ре ту на ви до се ры жа пе ко лу ти".split(),
+    "en": "ka lo mi re tu na vi do se ry pe co lu ti an".split(),
+    "kz": "қа ло мі ре тұ на ві до се ық жа пе ко лу ті".split(),
+}
+
+
+def lexicon(rng: random.Random, lang: str) -> list[str]:
+    return ["".join(rng.choices(SYLLABLES[lang], k=rng.randint(2, 4))) for _ in range(LEXICON_SIZE)]
+
+
+def sentence(rng: random.Random, lang: str, words: int, filler: dict) -> str:
+    return " ".join(
+        rng.choice(WORDS[lang]) if rng.random() < TOPIC_SHARE else rng.choice(filler[lang])
+        for _ in range(words)
+    ).capitalize()
+
+
+def populate(db, count: int):
+    rng = random.Random(18)
+    filler = {lang: lexicon(rng, lang) for lang in WORDS}
+    for start in range(0, count, BATCH):
+        rows = [
+            {
+                "title_ru": sentence(rng, "ru", 8, filler),
+                "title_en": sentence(rng, "en", 8, filler),
+                "title_kz": sentence(rng, "kz", 8, filler),
+                "abstract_ru": sentence(rng, "ru", 40, filler),
+                "abstract_en": sentence(rng, "en", 40, filler),
+                "abstract_kz": sentence(rng, "kz", 40, filler),
+                "responsible_user_id": BENCH_USER_ID,
+                "status": models.ArticleStatus.submitted,
+                "article_type": models.ArticleType.original,
+            }
+            for _ in range(start, min(count, start + BATCH))
+        ]
+        db.execute(insert(models.Article), rows)
+        db.commit()
+    db.execute(text("ANALYZE articles"))
+    db.commit()
+
+
+def ilike_page(db, q: str):
+    pattern = f"%{q}%"
+    condition = or_(*[getattr(models.Article, field).ilike(pattern) for field, _, _ in models.SEARCH_FIELDS])
+    total = db.scalar(select(func.count()).select_from(models.Article).where(condition))
+    ids = db.scalars(
+        select(models.Article.id).where(condition).order_by(models.Article.created_at.desc()).limit(20)
+    ).all()
+    return total, ids
+
+
+def fulltext_page(db, q: str):
+    query = fulltext.ts_query(q)
+    condition = fulltext.matches(query)
+    total = db.scalar(select(func.count()).select_from(models.Article).where(condition))
+    ids = db.scalars(
+        select(models.Article.id).where(condition).order_by(fulltext.rank(query).desc(), models.Article.id.desc()).limit(20)
+    ).all()
+    return total, ids
+
+
+def endpoint_page(client, headers):
+    def run(db, q: str):
+        response = client.get("/articles/search", params={"q": q, "page_size": 20}, headers=headers)
+        response.raise_for_status()
+        body = response.json()
+        return body["pagination"]["total_count"], body["items"]
+
+    return run
+
+
+def measure(label: str, fn, db, rounds: int):
+    for q in QUERIES:
+        durations = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            total, _ = fn(db, q)
+            durations.append(time.perf_counter() - started)
+        durations.sort()
+        print(
+            f"{label:<12} {q:<20} matches={total:<7} "
+            f"p50={statistics.median(durations) * 1000:8.2f}ms max={durations[-1] * 1000:8.2f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from jose import jwt
+    from app import config
+    from app.main import app
+
+    token = jwt.encode({"sub": "1", "roles": ["editor"]}, config.SECRET_KEY, algorithm=config.ALGORITHM)
+    client = TestClient(app)
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        populate(db, args.count)
+        print(f"inserted {args.count} articles in {time.perf_counter() - started:.1f}s")
+        measure("ilike", ilike_page, db, args.rounds)
+        measure("fulltext", fulltext_page, db, args.rounds)
+        measure("endpoint", endpoint_page(client, {"Authorization": f"Bearer {token}"}), db, args.rounds)
+    finally:
+        if not args.keep:
+            db.execute(delete(models.Article).where(models.Article.responsible_user_id == BENCH_USER_ID))
+            db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
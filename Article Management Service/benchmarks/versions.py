@@ -0,0 +1,110 @@
+"""
+Бенчмарк хранилища версий: объем snapshot и время восстановления версий при
+разных VERSION_KEYFRAME_INTERVAL (1 — каждая версия хранится целиком).
+
+Для каждого интервала создаются статьи с аннотациями на трех языках и цепочкой
+версий, в каждой из которых меняется одно поле. Статьи пишутся в базу
+DATABASE_URL (схема уже накатана) и удаляются после замера.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.versions [--articles 50] [--versions 40]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import delete, func, select
+
+from app import config, database, models, version_store
+
+BENCH_USER_ID = -210021
+INTERVALS = (1, 10, 50)
+FIELDS = ("title_en", "title_ru", "abstract_en", "abstract_ru", "abstract_kz", "doi")
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join("".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(words))
+
+
+def populate(db, articles: int, versions: int) -> list[int]:
+    rng = random.Random(21)
+    ids = []
+    for _ in range(articles):
+        article = models.Article(
+            title_kz=text(rng, 10), title_en=text(rng, 10), title_ru=text(rng, 10),
+            abstract_kz=text(rng, 200), abstract_en=text(rng, 200), abstract_ru=text(rng, 200),
+            responsible_user_id=BENCH_USER_ID,
+        )
+        db.add(article)
+        db.flush()
+        for number in range(versions):
+            if number:
+                field = rng.choice(FIELDS)
+                setattr(article, field, text(rng, 200 if field.startswith("abstract") else 10))
+            version_store.save_version(db, article)
+        ids.append(article.id)
+    db.commit()
+    return ids
+
+
+def stored_bytes(db, ids: list[int]) -> int:
+    return db.scalar(
+        select(func.sum(func.pg_column_size(models.ArticleVersion.snapshot)))
+        .where(models.ArticleVersion.article_id.in_(ids))
+    )
+
+
+def reconstruct(ids: list[int]) -> tuple[list[float], list[float]]:
+    """(все версии статьи, последняя версия) — секунды на статью, в новой сессии каждый раз."""
+    all_versions, latest = [], []
+    for article_id in ids:
+        for durations, limit in ((all_versions, None), (latest, 1)):
+            db = database.SessionLocal()
+            try:
+                started = time.perf_counter()
+                query = (
+                    db.query(models.ArticleVersion)
+                    .filter(models.ArticleVersion.article_id == article_id)
+                    .order_by(models.ArticleVersion.version_number.desc())
+                )
+                versions = query.limit(limit).all() if limit else query.all()
+                version_store.resolve(db, versions)
+                durations.append(time.perf_counter() - started)
+            finally:
+                db.close()
+    return all_versions, latest
+
+
+def ms(durations: list[float]) -> str:
+    ordered = sorted(durations)
+    return f"p50={statistics.median(ordered) * 1000:6.2f}ms max={ordered[-1] * 1000:6.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--versions", type=int, default=40)
+    args = parser.parse_args()
+
+    db = database.SessionLocal()
+    try:
+        for interval in INTERVALS:
+            config.VERSION_KEYFRAME_INTERVAL = interval
+            ids = populate(db, args.articles, args.versions)
+            size = stored_bytes(db, ids)
+            all_versions, latest = reconstruct(ids)
+            print(
+                f"interval={interval:<3} snapshot={size / 1024:9.1f}KiB "
+                f"({size / (args.articles * args.versions):7.0f}B/version)  "
+                f"all {args.versions} versions {ms(all_versions)}  latest {ms(latest)}"
+            )
+    finally:
+        article_ids = select(models.Article.id).where(models.Article.responsible_user_id == BENCH_USER_ID)
+        db.execute(delete(models.ArticleVersion).where(models.ArticleVersion.article_id.in_(article_ids)))
+        db.execute(delete(models.Article).where(models.Article.responsible_user_id == BENCH_USER_ID))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Тесты работают с настоящим PostgreSQL (JSONB, ON CONFLICT, pg_trgm): база задается
+TEST_DATABASE_URL, без нее тесты пропускаются. Схема накатывается миграциями при
+импорте app.main, поэтому pytest запускается из каталога сервиса.
+"""
+import os
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+    for item in items:
+        item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Без контекстного менеджера lifespan не запускается: outbox не отправляет события
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    from app import database
+
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def count_statements():
+    """count_statements() -> контекст, собирающий SQL, выполненный внутри него."""
+    from sqlalchemy import event
+    from app import database
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(database.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(database.engine, "before_cursor_execute", record)
+
+    return counting
+
+
+def bearer(user_id: int, roles: list[str]) -> dict:
+    from jose import jwt
+    from app import config
+
+    token = jwt.encode({"sub": str(user_id), "roles": roles}, config.SECRET_KEY, algorithm=config.ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def unique_user_id() -> int:
+    return uuid.uuid4().int % 1_000_000_000 + 1_000_000
+
+
+def make_authors(db, count: int) -> list[int]:
+    from app import models
+
+    tag = uuid.uuid4().hex[:8]
+    authors = [
+        models.Author(email=f"{tag}-{i}@example.org", first_name=f"A{i}", last_name=tag, country="KZ", affiliation1="U")
+        for i in range(count)
+    ]
+    db.add_all(authors)
+    db.commit()
+    return [a.id for a in authors]
+
+
+def new_keywords(count: int) -> list[dict]:
+    tag = uuid.uuid4().hex[:8]
+    return [{"title_kz": f"kz-{tag}-{i}", "title_en": f"en-{tag}-{i}", "title_ru": f"ru-{tag}-{i}"} for i in range(count)]
@@ -0,0 +1,100 @@
+"""
+Число SQL-запросов на сохранение и чтение статьи не зависит от числа авторов,
+ключевых слов, версий и статей в списке.
+"""
+import pytest
+
+from conftest import bearer, make_authors, new_keywords, unique_user_id
+
+# Запросы на один HTTP-запрос, включая чтение ответа (авторы, ключевые слова, версии)
+CREATE_STATEMENTS = 10
+UPDATE_STATEMENTS = 17
+LIST_STATEMENTS = 5
+DETAIL_STATEMENTS = 4
+
+
+def create(client, user_id: int, author_ids: list[int], keywords: list[dict]) -> dict:
+    response = client.post(
+        "/articles/",
+        json={
+            "title_kz": "kz", "title_en": "en", "title_ru": "ru",
+            "responsible_user_id": user_id,
+            "author_ids": author_ids,
+            "keywords": keywords,
+        },
+        headers=bearer(user_id, ["author"]),
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("authors, keywords", [(1, 1), (3, 4), (12, 25)])
+def test_create_runs_a_fixed_number_of_statements(client, db, count_statements, authors, keywords):
+    user_id = unique_user_id()
+    author_ids = make_authors(db, authors)
+
+    with count_statements() as statements:
+        article = create(client, user_id, author_ids, new_keywords(keywords))
+
+    assert len(article["authors"]) == authors
+    assert len(article["keywords"]) == keywords
+    assert len(statements) == CREATE_STATEMENTS, statements
+
+
+@pytest.mark.parametrize("authors, keywords", [(1, 1), (4, 3), (15, 20)])
+def test_update_runs_a_fixed_number_of_statements(client, db, count_statements, authors, keywords):
+    user_id = unique_user_id()
+    article = create(client, user_id, make_authors(db, 1), new_keywords(1))
+    author_ids = make_authors(db, authors)
+    keyword_ids = [k["id"] for k in create(client, user_id, [], new_keywords(keywords))["keywords"]]
+
+    with count_statements() as statements:
+        response = client.put(
+            f"/articles/{article['id']}",
+            json={"title_en": "changed", "author_ids": author_ids, "keyword_ids": keyword_ids},
+            headers=bearer(user_id, ["author"]),
+        )
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()["authors"]) == authors
+    assert len(statements) == UPDATE_STATEMENTS, statements
+
+
+def _statements_for(client, count_statements, path: str, headers: dict) -> int:
+    with count_statements() as statements:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+@pytest.mark.parametrize("articles", [1, 6])
+def test_my_articles_list_does_not_query_per_article(client, db, count_statements, articles):
+    user_id = unique_user_id()
+    for _ in range(articles):
+        article = create(client, user_id, make_authors(db, 3), new_keywords(3))
+        for i in range(2):
+            response = client.put(
+                f"/articles/{article['id']}", json={"title_en": f"v{i}"}, headers=bearer(user_id, ["author"])
+            )
+            assert response.status_code == 200
+
+    statements = _statements_for(client, count_statements, "/articles/my", bearer(user_id, ["author"]))
+
+    assert statements == LIST_STATEMENTS
+
+
+@pytest.mark.parametrize("versions", [1, 5])
+@pytest.mark.parametrize("path, roles", [("/articles/my/{id}", ["author"]), ("/articles/editor/{id}", ["editor"])])
+def test_detail_does_not_query_per_version(client, db, count_statements, versions, path, roles):
+    user_id = unique_user_id()
+    article = create(client, user_id, make_authors(db, 4), new_keywords(4))
+    for i in range(versions):
+        response = client.put(
+            f"/articles/{article['id']}", json={"title_en": f"v{i}"}, headers=bearer(user_id, ["author"])
+        )
+        assert response.status_code == 200
+
+    statements = _statements_for(client, count_statements, path.format(id=article["id"]), bearer(user_id, roles))
+
+    assert statements == DETAIL_STATEMENTS
+
@@ -0,0 +1,140 @@
+"""
+Полнотекстовый поиск статей (/articles/search) и подсказки pg_trgm
+(/articles/keywords/suggest). Каждый тест ищет по своему уникальному слову,
+поэтому данные других тестов в той же базе не мешают.
+"""
+import random
+import string
+
+import pytest
+from sqlalchemy import text
+
+from conftest import bearer, make_authors, unique_user_id
+
+EDITOR = bearer(1, ["editor"])
+
+
+def unique_word() -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=12))
+
+
+def make_article(db, **fields) -> int:
+    from app import models
+
+    values = {"title_kz": "kz", "title_en": "en", "title_ru": "ru", "responsible_user_id": unique_user_id()}
+    values.update(fields)
+    article = models.Article(**values)
+    db.add(article)
+    db.commit()
+    return article.id
+
+
+def search(client, q: str, **params) -> dict:
+    response = client.get("/articles/search", params={"q": q, **params}, headers=EDITOR)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_title_match_ranks_above_abstract_match(client, db):
+    word = unique_word()
+    in_abstract = make_article(db, abstract_en=f"This study of {word} is long")
+    in_title = make_article(db, title_en=f"On {word}")
+
+    result = search(client, word)
+
+    assert [item["article"]["id"] for item in result["items"]] == [in_title, in_abstract]
+    assert result["items"][0]["rank"] > result["items"][1]["rank"]
+    assert result["pagination"]["total_count"] == 2
+
+
+def test_word_forms_match_in_each_language(client, db):
+    word = unique_word()
+    russian = make_article(db, title_ru=f"Исследования {word} в степи")
+    english = make_article(db, abstract_en=f"{word} models were trained on running data")
+    kazakh = make_article(db, title_kz=f"{word} зерттеу")
+
+    assert [i["article"]["id"] for i in search(client, f"исследование {word}")["items"]] == [russian]
+    assert [i["article"]["id"] for i in search(client, f"{word} run")["items"]] == [english]
+    # Казахский индексируется конфигурацией 'simple': совпадение только по точной форме
+    assert [i["article"]["id"] for i in search(client, f"{word} зерттеу")["items"]] == [kazakh]
+
+
+def test_websearch_syntax_phrase_and_exclusion(client, db):
+    word = unique_word()
+    first = make_article(db, title_en=f"{word} deep learning")
+    second = make_article(db, title_en=f"{word} learning deep")
+
+    assert {i["article"]["id"] for i in search(client, f'{word} "deep learning"')["items"]} == {first}
+    assert {i["article"]["id"] for i in search(client, f"{word} -deep")["items"]} == set()
+    assert {i["article"]["id"] for i in search(client, f"{word} or nothingmatches")["items"]} == {first, second}
+
+
+def test_highlights_mark_matches_and_escape_html(client, db):
+    word = unique_word()
+    make_article(db, title_en=f"<b>{word}</b> & co", abstract_en=f"Abstract without the word. Then {word} again.")
+
+    highlights = search(client, word)["items"][0]["highlights"]
+
+    assert highlights["title_en"] == f"&lt;b&gt;<mark>{word}</mark>&lt;/b&gt; &amp; co"
+    assert f"<mark>{word}</mark>" in highlights["abstract_en"]
+    # Поля без совпадений не возвращаются
+    assert "title_ru" not in highlights
+
+
+def test_status_filter_and_pagination(client, db):
+    from app import models
+
+    word = unique_word()
+    for _ in range(3):
+        make_article(db, title_en=word, status=models.ArticleStatus.submitted)
+    make_article(db, title_en=word, status=models.ArticleStatus.draft)
+
+    page = search(client, word, status="submitted", page=2, page_size=2)
+
+    assert page["pagination"]["total_count"] == 3
+    assert page["pagination"]["total_pages"] == 2
+    assert len(page["items"]) == 1
+    assert not page["pagination"]["has_next"]
+    assert page["items"][0]["article"]["status"] == "submitted"
+
+
+def test_search_validates_input_and_role(client):
+    assert client.get("/articles/search", params={"q": "  "}, headers=EDITOR).status_code == 400
+    assert client.get("/articles/search", params={"q": "x", "status": "nope"}, headers=EDITOR).status_code == 400
+    assert client.get("/articles/search", params={"q": "x"}, headers=bearer(2, ["author"])).status_code == 403
+
+
+@pytest.fixture
+def trgm(db):
+    if db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar() is None:
+        pytest.skip("pg_trgm is not installed")
+
+
+def test_keyword_suggest_matches_prefix_before_typo(client, db, trgm):
+    from app import models
+
+    word = unique_word()
+    typo = word[:5] + word[6:]
+    db.add_all([
+        models.Keyword(title_en=f"{word}ology", title_ru="ru", title_kz="kz"),
+        models.Keyword(title_en=f"applied {typo}", title_ru="ru", title_kz="kz"),
+    ])
+    db.commit()
+
+    response = client.get("/articles/keywords/suggest", params={"q": word[:8]}, headers=EDITOR)
+
+    assert response.status_code == 200, response.text
+    titles = [item["title_en"] for item in response.json()["items"]]
+    assert titles[0] == f"{word}ology"
+
+
+def test_author_search_tolerates_a_typo(client, db, trgm):
+    from app import models
+
+    author_id = make_authors(db, 1)[0]
+    last_name = db.get(models.Author, author_id).last_name
+
+    response = client.get("/articles/authors/search", params={"q": last_name[:-1] + "x"}, headers=EDITOR)
+
+    assert response.status_code == 200, response.text
+    assert author_id in [item["id"] for item in response.json()["items"]]
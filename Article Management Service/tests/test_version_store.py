@@ -0,0 +1,136 @@
+"""
+Хранилище версий: одинаковые сохранения подряд не создают версию, дельты
+восстанавливаются из ключевого кадра, compact переводит версии старого формата.
+"""
+import pytest
+
+from conftest import make_authors, new_keywords, unique_user_id
+
+
+@pytest.fixture
+def fresh_session():
+    """Отдельная сессия: версии читаются из БД, а не из identity map сессии, которая их писала."""
+    from app import database
+
+    sessions = []
+
+    def open_session():
+        sessions.append(database.SessionLocal())
+        return sessions[-1]
+
+    yield open_session
+    for session in sessions:
+        session.close()
+
+
+def make_article(db, **fields):
+    from app import models
+
+    values = {"title_kz": "kz", "title_en": "en", "title_ru": "ru", "responsible_user_id": unique_user_id()}
+    values.update(fields)
+    article = models.Article(**values)
+    db.add(article)
+    db.flush()
+    return article
+
+
+def versions_of(db, article_id: int) -> list:
+    from app import models
+
+    return (
+        db.query(models.ArticleVersion)
+        .filter(models.ArticleVersion.article_id == article_id)
+        .order_by(models.ArticleVersion.version_number)
+        .all()
+    )
+
+
+def test_identical_save_does_not_create_a_version(db):
+    from app import version_store
+
+    article = make_article(db)
+    first, created = version_store.save_version(db, article)
+    assert created
+
+    again, created = version_store.save_version(db, article)
+
+    assert not created
+    assert again.id == first.id
+    assert len(versions_of(db, article.id)) == 1
+
+
+def test_deltas_store_changed_fields_and_reconstruct(db, fresh_session, monkeypatch):
+    from app import config, models, version_store
+
+    monkeypatch.setattr(config, "VERSION_KEYFRAME_INTERVAL", 3)
+    author_ids = make_authors(db, 2)
+    article = make_article(db)
+    expected = []
+    for number in range(1, 6):
+        article.title_en = f"title {number}"
+        if number == 3:
+            article.abstract_ru = "аннотация"
+            db.execute(models.article_authors.insert().values([{"article_id": article.id, "author_id": i} for i in author_ids]))
+        version_store.save_version(db, article)
+        expected.append(version_store.article_snapshot(db, article))
+    db.commit()
+
+    stored = versions_of(fresh_session(), article.id)
+    # Ключевой кадр каждые 3 версии, между ними — дельты к своему кадру
+    assert [v.base_version_id for v in stored] == [None, stored[0].id, stored[0].id, None, stored[3].id]
+    assert stored[1].snapshot == {"title_en": "title 2"}
+    assert set(stored[2].snapshot) == {"title_en", "abstract_ru", "author_ids"}
+
+    reader = fresh_session()
+    for version, snapshot in zip(versions_of(reader, article.id), expected):
+        assert version_store.full_snapshot(reader, version) == snapshot
+        assert version.content_hash == version_store.content_hash(snapshot)
+    last = versions_of(reader, article.id)[-1]
+    assert last.title_en == "title 5"
+    assert last.abstract_ru == "аннотация"
+    assert sorted(a.id for a in last.authors) == author_ids
+
+
+def test_compact_converts_legacy_versions(db, fresh_session, monkeypatch):
+    from app import config, models, version_store
+
+    monkeypatch.setattr(config, "VERSION_KEYFRAME_INTERVAL", 2)
+    author_ids = make_authors(db, 1)
+    keyword = models.Keyword(**new_keywords(1)[0])
+    db.add(keyword)
+    article = make_article(db)
+    titles = ["first", "second", "second", "third"]
+    for number, title in enumerate(titles, start=1):
+        legacy = models.ArticleVersion(
+            article_id=article.id,
+            version_number=number,
+            version_code=f"TAU-V{number}",
+            _title_kz="kz", _title_en=title, _title_ru="ru",
+            _article_type=models.ArticleType.original,
+            _file_url=f"/files/{number}",
+            _manuscript_file_url=f"/files/{number}",
+        )
+        db.add(legacy)
+        db.flush()
+        db.execute(models.article_version_authors.insert().values(version_id=legacy.id, author_id=author_ids[0]))
+        db.execute(models.article_version_keywords.insert().values(version_id=legacy.id, keyword_id=keyword.id))
+    db.commit()
+    before = [version_store.full_snapshot(db, v) for v in versions_of(db, article.id)]
+    db.expunge_all()
+
+    stats = version_store.compact_article(db, article.id)
+    db.commit()
+
+    assert stats["versions"] == 4
+    assert stats["keyframes"] == 2
+    assert stats["bytes_after"] < stats["bytes_before"]
+    reader = fresh_session()
+    after = versions_of(reader, article.id)
+    assert all(v.snapshot is not None and v._title_en is None for v in after)
+    assert [version_store.full_snapshot(reader, v) for v in after] == before
+    assert [v.title_en for v in after] == titles
+    assert [k.id for k in after[0].keywords] == [keyword.id]
+    ids = [v.id for v in after]
+    assert db.execute(
+        models.article_version_authors.select().where(models.article_version_authors.c.version_id.in_(ids))
+    ).first() is None
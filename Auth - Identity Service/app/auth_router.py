@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
 from sqlalchemy.orm import Session
 import httpx
 from jose import jwt, JWTError
-from app import models, schemas, database, security, config
+from app import models, schemas, database, security, config, outbox
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -38,70 +38,59 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         notify_status=user.notify_status,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.flush()
+
+    # Profile in User Profile Service and the welcome notification are sent by
+    # the outbox once the user is committed
+    profile_payload = {
+        "user_id": new_user.id,
+        "full_name": new_user.full_name or new_user.username,
+        "roles": [new_user.role],
+        "organization": new_user.organization,
+        "phone": None,
+    }
+    # Call users service with trailing slash to avoid FastAPI 307 redirect
+    outbox.enqueue(db, "user.registered.profile", "POST", f"{config.USER_SERVICE_URL}/users/", json=profile_payload)
 
-    # Create profile in User Profile Service
-    try:
-        profile_payload = {
+    if new_user.role == "author":
+        # Автор активируется сразу, отправим приветственное письмо
+        notify_payload = {
             "user_id": new_user.id,
-            "full_name": new_user.full_name or new_user.username,
-            "roles": [new_user.role],
-            "organization": new_user.organization,
-            "phone": None,
+            "type": "system",
+            "title": "Регистрация завершена",
+            "message": (
+                "Вы успешно зарегистрированы и ваш аккаунт активирован как Автор. "
+                "Вы можете войти и начать работу."
+            ),
+            "related_entity": f"auth:register:{new_user.id}",
         }
-        with httpx.Client(timeout=5.0) as client:
-            # Call users service with trailing slash to avoid FastAPI 307 redirect
-            client.post(f"{config.USER_SERVICE_URL}/users/", json=profile_payload)
-    except Exception:
-        # Fail-soft: auth registration succeeds even if profile call fails
-        pass
-
-    # Create notification (and email) via Notification Service
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            if new_user.role == "author":
-                # Автор активируется сразу, отправим приветственное письмо
-                notify_payload = {
-                    "user_id": new_user.id,
-                    "type": "system",
-                    "title": "Регистрация завершена",
-                    "message": (
-                        "Вы успешно зарегистрированы и ваш аккаунт активирован как Автор. "
-                        "Вы можете войти и начать работу."
-                    ),
-                    "related_entity": f"auth:register:{new_user.id}",
-                }
-                client.post(
-                    f"{config.NOTIFICATIONS_SERVICE_URL}/notifications/internal",
-                    json=notify_payload,
-                    headers={"X-Service-Secret": config.SHARED_SERVICE_SECRET},
-                )
-            else:
-                # Для редакторов/рецензентов требуем подтверждение почты, но активацию делает админ
-                verify_token = security.create_access_token({"sub": str(new_user.id), "purpose": "email_verify"})
-                verify_link = f"{config.PUBLIC_BASE_URL}/auth/verify-email?token={verify_token}"
-                notify_payload = {
-                    "user_id": new_user.id,
-                    "type": "system",
-                    "title": "Подтверждение электронной почты",
-                    "message": (
-                        "Вы успешно зарегистрированы в ScienceJournal. "
-                        "Подтвердите эл. почту по ссылке: "
-                        f"{verify_link}. "
-                        "После подтверждения администратор активирует ваш аккаунт."
-                    ),
-                    "related_entity": f"auth:register:{new_user.id}",
-                }
-                client.post(
-                    f"{config.NOTIFICATIONS_SERVICE_URL}/notifications/internal",
-                    json=notify_payload,
-                    headers={"X-Service-Secret": config.SHARED_SERVICE_SECRET},
-                )
-    except Exception:
-        # Fail-soft: continue even if notifications service is unavailable
-        pass
+    else:
+        # Для редакторов/рецензентов требуем подтверждение почты, но активацию делает админ
+        verify_token = security.create_access_token({"sub": str(new_user.id), "purpose": "email_verify"})
+        verify_link = f"{config.PUBLIC_BASE_URL}/auth/verify-email?token={verify_token}"
+        notify_payload = {
+            "user_id": new_user.id,
+            "type": "system",
+            "title": "Подтверждение электронной почты",
+            "message": (
+                "Вы успешно зарегистрированы в ScienceJournal. "
+                "Подтвердите эл. почту по ссылке: "
+                f"{verify_link}. "
+                "После подтверждения администратор активирует ваш аккаунт."
+            ),
+            "related_entity": f"auth:register:{new_user.id}",
+        }
+    outbox.enqueue(
+        db,
+        "user.registered.notification",
+        "POST",
+        f"{config.NOTIFICATIONS_SERVICE_URL}/notifications/internal",
+        json=notify_payload,
+        service_secret=True,
+    )
 
+    db.commit()
+    db.refresh(new_user)
     return new_user
 
 
@@ -264,6 +253,30 @@ def get_user_full_info(
     return user_info
 
 
+BATCH_MAX_IDS = 100
+
+
+@router.get("/users/batch", response_model=list[schemas.UserOut])
+def get_users_by_ids(
+    ids: list[int] = Query(default=[]),
+    x_service_secret: str | None = Header(default=None, alias="X-Service-Secret"),
+    db: Session = Depends(get_db)
+):
+    """
+    Получить пользователей по списку ID (?ids=1&ids=2) одним запросом.
+    Отсутствующие ID пропускаются; больше BATCH_MAX_IDS id — 422.
+    Внутренний эндпоинт, требует X-Service-Secret.
+    """
+    if not x_service_secret or x_service_secret != config.SHARED_SERVICE_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid service secret")
+    unique_ids = set(ids)
+    if len(unique_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    if not unique_ids:
+        return []
+    return db.query(models.User).filter(models.User.id.in_(unique_ids)).all()
+
+
 @router.get("/users/{user_id}", response_model=schemas.UserOut)
 def get_user_by_id(
     user_id: int,
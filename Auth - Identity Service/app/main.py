@@ -1,8 +1,24 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.auth_router import router as auth_router
 from app.database import Base, engine
+from app import tracing, outbox
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Delivers outbox events (profile creation, registration notifications) after commit
+    outbox.dispatcher.start()
+    try:
+        yield
+    finally:
+        outbox.dispatcher.stop()
+
 
-app = FastAPI(title="Auth Service")
+app = FastAPI(title="Auth Service", lifespan=lifespan)
+tracing.setup(app, "auth", engine)
+outbox.setup(app, "auth")
 
 # создаем таблицы (можно убрать после миграций)
 Base.metadata.create_all(bind=engine)
@@ -8,3 +8,7 @@ SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ARTICLE_SERVICE_URL = os.getenv("ARTICLE_SERVICE_URL", "http://articles:8000")
 SHARED_SERVICE_SECRET = os.getenv("SHARED_SERVICE_SECRET", "service-shared-secret")
+
+# X-Identity envelope from the API Gateway: replay window and tolerated clock skew (seconds)
+IDENTITY_MAX_AGE = int(os.getenv("IDENTITY_MAX_AGE", "30"))
+IDENTITY_CLOCK_SKEW = int(os.getenv("IDENTITY_CLOCK_SKEW", "5"))
@@ -1,11 +1,27 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.database import Base, engine
 from app import models
 from app.router import router
+from app import tracing, outbox
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Editorial Workflow Service")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Delivers outbox events (assigned editor updates) after commit
+    outbox.dispatcher.start()
+    try:
+        yield
+    finally:
+        outbox.dispatcher.stop()
+
+
+app = FastAPI(title="Editorial Workflow Service", lifespan=lifespan)
+tracing.setup(app, "editorial", engine)
+outbox.setup(app, "editorial")
 app.include_router(router)
 
 
@@ -0,0 +1,403 @@
+"""Transactional outbox for calls to other services.
+
+A handler that has to tell another service about a change adds the call to its
+own session with ``enqueue()`` before committing: the call is stored in
+``outbox_events`` in the same transaction as the change (and rolled back with
+it), and the request returns without waiting for the other service. A
+dispatcher thread in every process claims due events in batches
+(``FOR UPDATE SKIP LOCKED``, so workers and replicas share the table), sends
+them through a pooled httpx client and records the outcome:
+
+- 2xx: delivered;
+- connection errors, timeouts, 5xx and RETRYABLE_STATUSES: retried with
+  exponential backoff and jitter, up to OUTBOX_MAX_ATTEMPTS;
+- any other status, or the last attempt failing: dead-lettered (status
+  ``dead``) and kept for inspection.
+
+Delivery is at least once, so receivers must tolerate a repeated call: every
+attempt of an event carries the same ``Idempotency-Key: <service>:outbox:<id>``
+(the service name given to ``setup()``), which Notification Service uses to
+create a notification and send its email only once. Setting a value (assigned
+editor, review status) is naturally repeatable. Events
+enqueued with the same ``key`` replace each other while still pending, so a
+retried old value never overwrites a newer one. ``X-Service-Secret`` and the
+signed ``X-Identity`` envelope are added at send time: they are not stored, and
+an envelope signed at enqueue time could expire before a retry.
+
+Settings (environment):
+    OUTBOX_BATCH_SIZE        events claimed per round
+    OUTBOX_CONCURRENCY       requests sent in parallel within a batch
+    OUTBOX_POLL_INTERVAL     seconds between rounds when idle (a commit with new events wakes the dispatcher)
+    OUTBOX_TIMEOUT           per-request timeout (seconds)
+    OUTBOX_MAX_ATTEMPTS      attempts before an event is dead-lettered
+    OUTBOX_BACKOFF_BASE      delay before the first retry (seconds), doubled per attempt
+    OUTBOX_BACKOFF_MAX       upper bound of the retry delay (seconds)
+    OUTBOX_LEASE_SECONDS     how long a claimed event is hidden from other dispatchers
+    OUTBOX_RETENTION_HOURS   delivered and replaced events older than this are deleted
+
+Metrics in Prometheus text format: GET /metrics. Dead letters:
+
+    python -m app.outbox dead [--limit 50]
+    python -m app.outbox requeue (--id ID ... | --all)
+
+This module is copied verbatim into every service that uses it; keep the copies
+identical (tools/check_shared_modules.py enforces this in CI).
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import httpx
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, Integer, JSON, String, Text, event, func, update
+from sqlalchemy.orm import Session
+
+from app import config
+from app.database import Base, SessionLocal
+
+try:
+    from app import identity
+except ImportError:  # services that never call others on behalf of a user
+    identity = None
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_TIMEOUT = float(os.getenv("OUTBOX_TIMEOUT", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "600"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "168"))
+
+PENDING = "pending"
+DELIVERED = "delivered"
+DEAD = "dead"
+REPLACED = "replaced"
+
+# Statuses a later attempt can change (besides 5xx); 409 is the API Gateway's answer
+# while an earlier attempt with the same Idempotency-Key is still running
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (Index("ix_outbox_events_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    id = Column(BigInteger, primary_key=True)
+    event_type = Column(String(100), nullable=False)
+    key = Column(String(200), nullable=True, index=True)
+    method = Column(String(10), nullable=False)
+    url = Column(Text, nullable=False)
+    payload = Column(JSON, nullable=True)
+    service_secret = Column(Boolean, nullable=False, default=False, server_default="false")
+    on_behalf_of = Column(JSON, nullable=True)  # {"user_id", "roles"} for the X-Identity envelope
+    status = Column(String(20), nullable=False, default=PENDING, server_default=PENDING)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+
+def enqueue(
+    db: Session,
+    event_type: str,
+    method: str,
+    url: str,
+    json=None,
+    key: str | None = None,
+    service_secret: bool = False,
+    on_behalf_of: dict | None = None,
+) -> OutboxEvent:
+    """Add a call to the caller's transaction; it is sent after the transaction commits."""
+    if key is not None:
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.key == key, OutboxEvent.status == PENDING)
+            .values(status=REPLACED)
+            .execution_options(synchronize_session=False)
+        )
+    outbox_event = OutboxEvent(
+        event_type=event_type,
+        key=key,
+        method=method,
+        url=url,
+        payload=json,
+        service_secret=service_secret,
+        on_behalf_of=(
+            {"user_id": int(on_behalf_of["user_id"]), "roles": list(on_behalf_of.get("roles") or [])}
+            if on_behalf_of else None
+        ),
+    )
+    db.add(outbox_event)
+    if not event.contains(db, "after_commit", _wake_dispatcher):
+        event.listen(db, "after_commit", _wake_dispatcher)
+    return outbox_event
+
+
+def _wake_dispatcher(session):
+    dispatcher.wake()
+
+
+def backoff(attempts: int) -> float:
+    """Delay before the next attempt after `attempts` failed ones (jittered to 50-100%)."""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.outcomes: dict[tuple[str, str], int] = {}
+        self.batches = 0
+        self.errors = 0
+        self.send_seconds = 0.0
+        self.sends = 0
+
+    def record(self, event_type: str, outcome: str):
+        with self.lock:
+            key = (event_type, outcome)
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def render(self, db: Session) -> str:
+        by_status = dict(db.query(OutboxEvent.status, func.count()).group_by(OutboxEvent.status).all())
+        oldest = db.query(func.min(OutboxEvent.created_at)).filter(OutboxEvent.status == PENDING).scalar()
+        now = db.query(func.now()).scalar()
+        lines = [
+            "# HELP outbox_deliveries_total Delivery attempts by event type and outcome (delivered, retried, dead).",
+            "# TYPE outbox_deliveries_total counter",
+        ]
+        with self.lock:
+            for (event_type, outcome), count in sorted(self.outcomes.items()):
+                lines.append(f'outbox_deliveries_total{{event_type="{event_type}",outcome="{outcome}"}} {count}')
+            lines += [
+                "# HELP outbox_send_seconds Time spent sending events to other services.",
+                "# TYPE outbox_send_seconds summary",
+                f"outbox_send_seconds_sum {self.send_seconds!r}",
+                f"outbox_send_seconds_count {self.sends}",
+                "# HELP outbox_batches_total Batches claimed by this process.",
+                "# TYPE outbox_batches_total counter",
+                f"outbox_batches_total {self.batches}",
+                "# HELP outbox_dispatch_errors_total Dispatcher rounds that failed (database unavailable and the like).",
+                "# TYPE outbox_dispatch_errors_total counter",
+                f"outbox_dispatch_errors_total {self.errors}",
+            ]
+        lines += ["# HELP outbox_events Events in the outbox table by status.", "# TYPE outbox_events gauge"]
+        for status in (PENDING, DELIVERED, DEAD, REPLACED):
+            lines.append(f'outbox_events{{status="{status}"}} {by_status.get(status, 0)}')
+        lines += [
+            "# HELP outbox_oldest_pending_seconds Age of the oldest undelivered event.",
+            "# TYPE outbox_oldest_pending_seconds gauge",
+            f"outbox_oldest_pending_seconds {(now - oldest).total_seconds() if oldest else 0.0!r}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class Dispatcher:
+    """Background thread delivering outbox events of this service."""
+
+    def __init__(self):
+        self.metrics = Metrics()
+        # Prefix of the Idempotency-Key header, set by setup(); ids alone repeat across services
+        self.source: str | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._client: httpx.Client | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._purged_at = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._client = httpx.Client(
+            timeout=OUTBOX_TIMEOUT,
+            limits=httpx.Limits(max_connections=OUTBOX_CONCURRENCY, max_keepalive_connections=OUTBOX_CONCURRENCY),
+        )
+        self._pool = ThreadPoolExecutor(OUTBOX_CONCURRENCY, thread_name_prefix="outbox-send")
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._pool.shutdown(wait=False)
+        self._client.close()
+        self._thread = self._client = self._pool = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                claimed = self.dispatch_once()
+                if time.monotonic() - self._purged_at > 3600:
+                    self.purge()
+            except Exception:
+                self.metrics.errors += 1
+                logger.exception("outbox dispatch failed")
+                claimed = 0
+            if claimed < OUTBOX_BATCH_SIZE:
+                self._wake.wait(OUTBOX_POLL_INTERVAL)
+
+    def dispatch_once(self) -> int:
+        """Claim, send and settle one batch; returns the number of events claimed."""
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            events = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.status == PENDING, OutboxEvent.next_attempt_at <= func.now())
+                .order_by(OutboxEvent.next_attempt_at, OutboxEvent.id)
+                .limit(OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not events:
+                db.rollback()
+                return 0
+            # Lease the batch: a crashed process leaves it to others once the lease expires
+            db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([e.id for e in events]))
+                .values(
+                    attempts=OutboxEvent.attempts + 1,
+                    next_attempt_at=func.now() + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            self.metrics.batches += 1
+
+            results = list(self._pool.map(self._send, events))
+            for outbox_event, error in zip(events, results):
+                attempts = outbox_event.attempts + 1
+                # Replaced events keep their status: a newer event carries the value
+                settle = update(OutboxEvent).where(OutboxEvent.id == outbox_event.id, OutboxEvent.status == PENDING)
+                if error is None:
+                    outcome = "delivered"
+                    db.execute(settle.values(status=DELIVERED, delivered_at=func.now(), last_error=None))
+                elif error[0] and attempts < OUTBOX_MAX_ATTEMPTS:
+                    outcome = "retried"
+                    retry_at = func.now() + timedelta(seconds=backoff(attempts))
+                    db.execute(settle.values(next_attempt_at=retry_at, last_error=error[1]))
+                else:
+                    outcome = "dead"
+                    db.execute(settle.values(status=DEAD, last_error=error[1]))
+                    logger.warning("outbox event %s (%s) dead-lettered: %s", outbox_event.id, outbox_event.event_type, error[1])
+                self.metrics.record(outbox_event.event_type, outcome)
+            db.commit()
+            return len(events)
+        finally:
+            db.close()
+
+    def _send(self, outbox_event: OutboxEvent) -> tuple[bool, str] | None:
+        """None when delivered, else (retryable, error)."""
+        headers = {}
+        if self.source is not None:
+            headers[IDEMPOTENCY_HEADER] = f"{self.source}:outbox:{outbox_event.id}"
+        if outbox_event.service_secret:
+            headers["X-Service-Secret"] = config.SHARED_SERVICE_SECRET
+        if outbox_event.on_behalf_of and identity is not None:
+            headers[identity.IDENTITY_HEADER] = identity.sign_identity(
+                outbox_event.on_behalf_of["user_id"], outbox_event.on_behalf_of.get("roles", [])
+            )
+        started = time.perf_counter()
+        try:
+            response = self._client.request(outbox_event.method, outbox_event.url, json=outbox_event.payload, headers=headers)
+        except httpx.HTTPError as exc:
+            return True, f"{type(exc).__name__}: {exc}"
+        finally:
+            with self.metrics.lock:
+                self.metrics.send_seconds += time.perf_counter() - started
+                self.metrics.sends += 1
+        if response.is_success:
+            return None
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+        return retryable, f"HTTP {response.status_code}: {response.text[:500]}"
+
+    def purge(self):
+        db = SessionLocal()
+        try:
+            cutoff = func.now() - timedelta(hours=OUTBOX_RETENTION_HOURS)
+            db.query(OutboxEvent).filter(
+                OutboxEvent.status.in_([DELIVERED, REPLACED]), OutboxEvent.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self._purged_at = time.monotonic()
+
+
+dispatcher = Dispatcher()
+
+
+def metrics():
+    db = SessionLocal()
+    try:
+        return PlainTextResponse(dispatcher.metrics.render(db), media_type="text/plain; version=0.0.4")
+    finally:
+        db.close()
+
+
+def setup(app, service_name: str):
+    """Serve outbox metrics and name the Idempotency-Key source; the app's lifespan starts and stops `dispatcher`."""
+    dispatcher.source = service_name
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.outbox")
+    commands = parser.add_subparsers(dest="command", required=True)
+    dead_parser = commands.add_parser("dead", help="list dead-lettered events")
+    dead_parser.add_argument("--limit", type=int, default=50)
+    requeue_parser = commands.add_parser("requeue", help="send dead-lettered events again")
+    target = requeue_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--id", type=int, action="append", dest="ids", help="event id (repeatable)")
+    target.add_argument("--all", action="store_true", help="every dead-lettered event")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "dead":
+            events = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.status == DEAD)
+                .order_by(OutboxEvent.id.desc())
+                .limit(args.limit)
+                .all()
+            )
+            for e in events:
+                print(f"{e.id}\t{e.created_at:%Y-%m-%d %H:%M:%S}\t{e.event_type}\t{e.method} {e.url}\t{e.attempts}\t{e.last_error}")
+            return 0
+        query = db.query(OutboxEvent).filter(OutboxEvent.status == DEAD)
+        if not args.all:
+            query = query.filter(OutboxEvent.id.in_(args.ids))
+        count = query.update(
+            {"status": PENDING, "attempts": 0, "next_attempt_at": func.now(), "last_error": None},
+            synchronize_session=False,
+        )
+        db.commit()
+        print(f"{count} events requeued")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,8 +2,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Header
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
-from app import config, database, models, schemas
-import httpx
+from app import config, database, models, schemas, identity, outbox
 
 router = APIRouter(prefix="/editorial", tags=["editorial"])
 
@@ -16,7 +15,16 @@ def get_db():
         db.close()
 
 
-def get_current_user(authorization: str = Header(...)):
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    x_identity: str | None = Header(default=None, alias=identity.IDENTITY_HEADER),
+):
+    # Prefer the signed identity forwarded by the API Gateway (no JWT decode needed)
+    user = identity.identity_from_header(x_identity)
+    if user is not None:
+        return user
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing Authorization header")
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token")
     token = authorization.replace("Bearer ", "")
@@ -36,6 +44,22 @@ def ensure_editor(user):
         raise HTTPException(status_code=403, detail="Editor role required")
 
 
+def enqueue_assigned_editor_update(db: Session, task: models.EditorialTask):
+    """Propagate the task's editor to Article Management Service (sent by the outbox after commit).
+
+    Keyed by article: a pending update is replaced by a newer one, so a retry never restores an old editor.
+    """
+    outbox.enqueue(
+        db,
+        "editorial.editor_assigned",
+        "PATCH",
+        f"{config.ARTICLE_SERVICE_URL}/articles/internal/{task.article_id}/assigned-editor",
+        json={"editor_id": task.editor_id},
+        key=f"article:{task.article_id}:assigned-editor",
+        service_secret=True,
+    )
+
+
 @router.post("/", response_model=schemas.EditorialTaskOut)
 def create_task(task: schemas.EditorialTaskCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
     ensure_editor(current_user)
@@ -45,18 +69,10 @@ def create_task(task: schemas.EditorialTaskCreate, db: Session = Depends(get_db)
         reviewer_ids=task.reviewer_ids or [],
     )
     db.add(new_task)
+    # Update assigned editor in Article Management Service
+    enqueue_assigned_editor_update(db, new_task)
     db.commit()
     db.refresh(new_task)
-    # Update assigned editor in Article Management Service
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            client.patch(
-                f"{config.ARTICLE_SERVICE_URL}/articles/internal/{new_task.article_id}/assigned-editor",
-                json={"editor_id": new_task.editor_id},
-                headers={"X-Service-Secret": config.SHARED_SERVICE_SECRET},
-            )
-    except Exception:
-        pass
     return new_task
 
 
@@ -113,18 +129,8 @@ def reassign_task_editor(
         raise HTTPException(status_code=404, detail="Task not found")
 
     task.editor_id = payload.new_editor_id
+    # Propagate to Article Management Service
+    enqueue_assigned_editor_update(db, task)
     db.commit()
     db.refresh(task)
-
-    # Propagate to Article Management Service
-    try:
-        with httpx.Client(timeout=5.0) as client:
-            client.patch(
-                f"{config.ARTICLE_SERVICE_URL}/articles/internal/{task.article_id}/assigned-editor",
-                json={"editor_id": task.editor_id},
-                headers={"X-Service-Secret": config.SHARED_SERVICE_SECRET},
-            )
-    except Exception:
-        pass
-
     return task
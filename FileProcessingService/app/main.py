@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from app.database import Base, engine
 from app.router import router as processing_router
+from app import tracing
 
 app = FastAPI(title="File Processing Service")
+tracing.setup(app, "fileprocessing", engine)
 
 Base.metadata.create_all(bind=engine)
 
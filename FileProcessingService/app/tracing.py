@@ -0,0 +1,300 @@
+"""W3C trace context (``traceparent``) propagation and span export.
+
+The API Gateway starts a trace for each incoming request (or continues the
+caller's), every service continues it from the incoming ``traceparent`` header,
+and all outbound httpx calls carry it on. Server requests, outbound HTTP calls
+and SQLAlchemy queries are recorded as spans and appended as JSON lines
+(OTLP-like field names) to TRACE_FILE, one line per span.
+
+Settings (environment):
+    TRACE_FILE         path of the span file; empty disables export (context is
+                       still propagated so logs can be correlated by trace id)
+    TRACE_SAMPLE_RATE  share of new traces recorded (0..1); continued traces
+                       follow the caller's sampled flag
+    TRACE_MAX_STATEMENT  SQL text kept per span (characters)
+
+This module is copied verbatim into every service; keep the copies identical
+(tools/check_shared_modules.py enforces this in CI).
+"""
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+try:
+    import httpx
+except ImportError:  # services that make no outbound calls
+    httpx = None
+
+try:
+    from sqlalchemy import event
+except ImportError:  # services without a database
+    event = None
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_MAX_STATEMENT = int(os.getenv("TRACE_MAX_STATEMENT", "500"))
+
+TRACEPARENT_HEADER = "traceparent"
+TRACE_ID_HEADER = "X-Trace-Id"
+
+_TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_service_name = "unknown"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled", "start", "end", "attributes", "error")
+
+    def __init__(self, trace_id: str, parent_id: str | None, name: str, kind: str, sampled: bool, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def child(self, name: str, kind: str, attributes=None) -> "Span":
+        return Span(self.trace_id, self.span_id, name, kind, self.sampled, attributes)
+
+    def finish(self, error: BaseException | str | None = None):
+        if error is not None:
+            self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        self.end = time.time_ns()
+        if self.sampled and _exporter is not None:
+            _exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "resource": {"service.name": _service_name},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "durationMs": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_UNSET"},
+        }
+
+
+class FileExporter:
+    """Append spans as JSON lines from a background thread so requests never wait on disk."""
+
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+
+_exporter = FileExporter(TRACE_FILE) if TRACE_FILE else None
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def current_trace_id() -> str | None:
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """Return (trace_id, parent_span_id, sampled) from a traceparent header, or None."""
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def start_child(name: str, kind: str, attributes=None) -> Span | None:
+    """Span under the current one, or None outside a traced request (startup, scripts)."""
+    parent = _current.get()
+    if parent is None:
+        return None
+    return parent.child(name, kind, attributes)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a SERVER span per request and exposing X-Trace-Id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                incoming = parse_traceparent(value.decode("latin-1"))
+                break
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id = random.getrandbits(128).to_bytes(16, "big").hex()
+            parent_id = None
+            sampled = random.random() < TRACE_SAMPLE_RATE
+
+        span = Span(trace_id, parent_id, scope["method"], "SERVER", sampled, {
+            "http.method": scope["method"],
+            "http.target": scope.get("path", ""),
+        })
+        token = _current.set(span)
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                # Replace any copy relayed from an upstream response
+                name = TRACE_ID_HEADER.lower().encode()
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != name]
+                headers.append((name, trace_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            span.name = f"{scope['method']} {route or scope.get('path', '')}"
+            if error is None and span.attributes.get("http.status_code", 200) >= 500:
+                error = f"HTTP {span.attributes['http.status_code']}"
+            span.finish(error)
+            _current.reset(token)
+
+
+def _client_span(request) -> Span | None:
+    span = start_child(f"HTTP {request.method}", "CLIENT", {
+        "http.method": request.method,
+        "http.url": str(request.url.copy_with(query=None)),
+        "net.peer.name": request.url.host,
+    })
+    if span is not None:
+        request.headers[TRACEPARENT_HEADER] = span.traceparent()
+    return span
+
+
+def _instrument_httpx():
+    """Wrap the default httpx transports so every outbound call carries traceparent."""
+    if httpx is None or getattr(httpx.HTTPTransport, "_traced", False):
+        return
+
+    sync_handle = httpx.HTTPTransport.handle_request
+    async_handle = httpx.AsyncHTTPTransport.handle_async_request
+
+    def handle_request(self, request):
+        span = _client_span(request)
+        if span is None:
+            return sync_handle(self, request)
+        try:
+            response = sync_handle(self, request)
+        except BaseException as exc:
+            span.finish(exc)
+            raise
+        span.attributes["http.status_code"] = response.status_code
+        span.finish()
+        return response
+
+    async def handle_async_request(self, request):
+        span = _client_span(request)
+        if span is None:
+            return await async_handle(self, request)
+        try:
+            response = await async_handle(self, request)
+        except BaseException as exc:
+            span.finish(exc)
+            raise
+        # Ends at the response headers; streamed bodies are not included
+        span.attributes["http.status_code"] = response.status_code
+        span.finish()
+        return response
+
+    httpx.HTTPTransport.handle_request = handle_request
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+    httpx.HTTPTransport._traced = True
+
+
+def instrument_engine(engine):
+    """Record a CLIENT span for every SQL statement executed inside a traced request."""
+    if event is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        context._trace_span = start_child("db.query", "CLIENT", {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:TRACE_MAX_STATEMENT],
+            "db.executemany": executemany,
+        })
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.attributes["db.rowcount"] = getattr(cursor, "rowcount", -1)
+            span.finish()
+            context._trace_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.finish(exception_context.original_exception)
+            context._trace_span = None
+
+
+def setup(app, service_name: str, engine=None):
+    """Enable tracing for a FastAPI app: server spans, outbound httpx and (optionally) SQL."""
+    global _service_name
+    _service_name = service_name
+    _instrument_httpx()
+    if engine is not None:
+        instrument_engine(engine)
+    app.add_middleware(TracingMiddleware)
@@ -4,6 +4,7 @@ from app.database import Base, engine
 from app import models
 from app.router import router
 from app import config
+from app import tracing
 
 
 def ensure_storage():
@@ -14,6 +15,7 @@ ensure_storage()
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="File Storage Service")
+tracing.setup(app, "filestorage", engine)
 app.include_router(router)
 
 
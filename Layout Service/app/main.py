@@ -2,10 +2,12 @@ import os
 from fastapi import FastAPI
 from app.router import router as layout_router
 from app.database import Base, engine
+from app import tracing
 
 FILE_SERVICE_URL = os.getenv("FILE_SERVICE_URL", "http://fileprocessing:7000")
 
 app = FastAPI(title="Layout Service")
+tracing.setup(app, "layout", engine)
 app.include_router(layout_router)
 
 # Ensure tables exist
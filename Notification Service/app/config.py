@@ -16,6 +16,10 @@ AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth:8000")
 
 SHARED_SERVICE_SECRET = os.getenv("SHARED_SERVICE_SECRET", "service-shared-secret")
 
+# X-Identity envelope from the API Gateway: replay window and tolerated clock skew (seconds)
+IDENTITY_MAX_AGE = int(os.getenv("IDENTITY_MAX_AGE", "30"))
+IDENTITY_CLOCK_SKEW = int(os.getenv("IDENTITY_CLOCK_SKEW", "5"))
+
 # Email settings
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.mail.ru")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", "465"))
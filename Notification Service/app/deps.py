@@ -1,6 +1,6 @@
 from fastapi import Header, HTTPException
 from jose import jwt, JWTError
-from app import database, config
+from app import database, config, identity
 from typing import Generator
 
 
@@ -12,7 +12,16 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(authorization: str = Header(...)):
+def get_current_user(
+    authorization: str | None = Header(default=None),
+    x_identity: str | None = Header(default=None, alias=identity.IDENTITY_HEADER),
+):
+    # Prefer the signed identity from the API Gateway or a calling service
+    user = identity.identity_from_header(x_identity)
+    if user is not None:
+        return user
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing Authorization header")
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token")
     token = authorization.replace("Bearer ", "")
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from app.database import Base, engine
+from app import tracing
 from sqlalchemy import text
 from app.routers.notifications import router as notifications_router
 from app.routers.author import router as author_notifications_router
@@ -7,6 +8,7 @@ from app.routers.reviewer import router as reviewer_notifications_router
 from app.routers.editor import router as editor_notifications_router
 
 app = FastAPI(title="Notification Service")
+tracing.setup(app, "notifications", engine)
 
 # Initialize database tables and ensure new columns exist
 Base.metadata.create_all(bind=engine)
@@ -29,9 +31,19 @@ with engine.begin() as conn:
             ) THEN
                 ALTER TABLE notifications ADD COLUMN article_version_id INTEGER;
             END IF;
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name='notifications' AND column_name='idempotency_key'
+            ) THEN
+                ALTER TABLE notifications ADD COLUMN idempotency_key VARCHAR;
+            END IF;
         END$$;
         """
     ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_notifications_idempotency_key_user "
+        "ON notifications (idempotency_key, user_id)"
+    ))
 
 app.include_router(notifications_router)
 app.include_router(author_notifications_router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -33,4 +33,11 @@ class Notification(Base):
     status = Column(Enum(NotificationStatus), default=NotificationStatus.unread, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     read_at = Column(DateTime(timezone=True), nullable=True)
+    # Idempotency-Key of the service call that created it (outbox retries repeat the key);
+    # a broadcast shares one key across recipients, so it is unique per user
+    idempotency_key = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ux_notifications_idempotency_key_user", "idempotency_key", "user_id", unique=True),
+    )
 
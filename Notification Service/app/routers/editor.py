@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
@@ -41,11 +41,14 @@ def broadcast_new_article(
     payload: BroadcastNewArticleRequest,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ):
     """Notify all editors about a newly submitted article.
 
     Fetches editor user IDs from User Profile Service via internal endpoint
     protected by `X-Service-Secret` and creates one notification per editor.
+    A repeated `Idempotency-Key` creates notifications only for editors that
+    did not get one the first time.
     """
     users_url = getattr(config, "USERS_SERVICE_URL", "http://users:8000")
     secret = getattr(config, "SHARED_SERVICE_SECRET", "service-shared-secret")
@@ -71,6 +74,7 @@ def broadcast_new_article(
             task_key=f"new_article:{payload.article_id}",
             title=payload.title,
             message=body,
+            idempotency_key=idempotency_key,
         )
         if n and n.id:
             created += 1
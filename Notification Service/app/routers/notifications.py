@@ -3,12 +3,13 @@ from typing import List, Optional
 import logging
 
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
 from app import models, schemas, config
 from app.deps import get_db, get_current_user
 from app.services.email_service import send_email
+from app.services.notification_service import save_once
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -78,6 +79,8 @@ def create_notification_internal(
     Service-to-service notification creation protected by shared secret.
     Accepts the same payload as public create endpoint but validates
     header `X-Service-Secret` equals `config.SHARED_SERVICE_SECRET`.
+    A repeated `Idempotency-Key` (outbox retry) returns the notification
+    created the first time and does not send the email again.
     """
     secret = request.headers.get("X-Service-Secret")
     if not secret or secret != config.SHARED_SERVICE_SECRET:
@@ -91,11 +94,11 @@ def create_notification_internal(
         related_entity=payload.related_entity,
         article_id=payload.article_id,
         article_version_id=payload.article_version_id,
+        idempotency_key=request.headers.get("Idempotency-Key"),
     )
-    db.add(notification)
-    db.commit()
-    db.refresh(notification)
-    _maybe_send_email_for_notification(notification)
+    notification, created = save_once(db, notification)
+    if created:
+        _maybe_send_email_for_notification(notification)
     return notification
 
 
@@ -104,6 +107,7 @@ def create_article_notification(
     payload: schemas.NotificationArticleCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ):
     """
     Create a notification tied to a specific manuscript (article), including editor comments.
@@ -115,6 +119,8 @@ def create_article_notification(
     - comments: free text to send to the recipient (stored as message)
     - title: optional notification title (default provided if omitted)
     - type: optional NotificationType (defaults to 'editorial')
+
+    A repeated `Idempotency-Key` header returns the first notification without a second email.
     """
     title = payload.title or "Комментарии по рукописи"
     notification = models.Notification(
@@ -125,11 +131,11 @@ def create_article_notification(
         related_entity=f"article:{payload.article_id}",
         article_id=payload.article_id,
         article_version_id=payload.article_version_id,
+        idempotency_key=idempotency_key,
     )
-    db.add(notification)
-    db.commit()
-    db.refresh(notification)
-    _maybe_send_email_for_notification(notification)
+    notification, created = save_once(db, notification)
+    if created:
+        _maybe_send_email_for_notification(notification)
     return notification
 
 
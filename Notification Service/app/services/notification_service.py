@@ -1,9 +1,43 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app import models, schemas
 
 
+def _find_by_key(db: Session, idempotency_key: str, user_id: int) -> Optional[models.Notification]:
+    return (
+        db.query(models.Notification)
+        .filter(models.Notification.idempotency_key == idempotency_key, models.Notification.user_id == user_id)
+        .first()
+    )
+
+
+def save_once(db: Session, n: models.Notification) -> tuple[models.Notification, bool]:
+    """
+    Store `n` unless the same Idempotency-Key already created a notification for this user.
+
+    Returns the stored notification and whether this call created it; a repeated
+    call (an outbox retry) gets the existing one and must not email the user again.
+    """
+    if n.idempotency_key is not None:
+        existing = _find_by_key(db, n.idempotency_key, n.user_id)
+        if existing is not None:
+            return existing, False
+    db.add(n)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same key was stored concurrently by another attempt
+        db.rollback()
+        existing = _find_by_key(db, n.idempotency_key, n.user_id) if n.idempotency_key is not None else None
+        if existing is None:
+            raise
+        return existing, False
+    db.refresh(n)
+    return n, True
+
+
 def create_notification(
     db: Session,
     *,
@@ -12,6 +46,7 @@ def create_notification(
     title: str,
     message: str,
     related_entity: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
 ) -> models.Notification:
     n = models.Notification(
         user_id=user_id,
@@ -19,10 +54,9 @@ def create_notification(
         title=title,
         message=message,
         related_entity=related_entity,
+        idempotency_key=idempotency_key,
     )
-    db.add(n)
-    db.commit()
-    db.refresh(n)
+    n, _ = save_once(db, n)
     return n
 
 
@@ -69,6 +103,7 @@ def notify_editor_task(
     task_key: str,
     title: str,
     message: str,
+    idempotency_key: Optional[str] = None,
 ) -> models.Notification:
     return create_notification(
         db,
@@ -77,4 +112,5 @@ def notify_editor_task(
         title=title,
         message=message,
         related_entity=f"editorial:{task_key}",
+        idempotency_key=idempotency_key,
     )
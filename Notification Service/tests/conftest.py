@@ -0,0 +1,65 @@
+"""
+Tests run against a real PostgreSQL database given by TEST_DATABASE_URL and are
+skipped without it. Tables are created by importing app.main, as on startup.
+"""
+import os
+import uuid
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="TEST_DATABASE_URL is not set")
+    for item in items:
+        item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    from app import database
+
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def emails(monkeypatch):
+    """Notifications an email was sent for (nothing leaves the process)."""
+    from app.routers import notifications
+
+    sent = []
+    monkeypatch.setattr(notifications, "_maybe_send_email_for_notification", lambda n: sent.append(n.id))
+    return sent
+
+
+def bearer(user_id: int, roles: list[str]) -> dict:
+    from jose import jwt
+    from app import config
+
+    token = jwt.encode({"sub": str(user_id), "roles": roles}, config.SECRET_KEY, algorithm=config.ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def unique_user_id() -> int:
+    return uuid.uuid4().int % 1_000_000_000 + 1_000_000
+
+
+def outbox_key() -> str:
+    return f"test:outbox:{uuid.uuid4().hex}"
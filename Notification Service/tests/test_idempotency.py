@@ -0,0 +1,96 @@
+import httpx
+import pytest
+
+from app import config, models
+from app.routers import editor
+
+from conftest import bearer, outbox_key, unique_user_id
+
+SECRET = {"X-Service-Secret": config.SHARED_SERVICE_SECRET}
+
+
+def notifications_for(db, user_id: int) -> list:
+    return db.query(models.Notification).filter(models.Notification.user_id == user_id).all()
+
+
+def internal(client, user_id: int, key: str | None):
+    headers = dict(SECRET, **({"Idempotency-Key": key} if key else {}))
+    response = client.post(
+        "/notifications/internal",
+        json={"user_id": user_id, "type": "review_assignment", "title": "t", "message": "m"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_repeated_internal_call_creates_one_notification_and_one_email(client, db, emails):
+    user_id, key = unique_user_id(), outbox_key()
+
+    first = internal(client, user_id, key)
+    retry = internal(client, user_id, key)
+
+    assert retry["id"] == first["id"]
+    assert len(notifications_for(db, user_id)) == 1
+    assert emails == [first["id"]]
+
+
+def test_calls_without_key_are_not_deduplicated(client, db, emails):
+    user_id = unique_user_id()
+
+    internal(client, user_id, None)
+    internal(client, user_id, None)
+
+    assert len(notifications_for(db, user_id)) == 2
+    assert len(emails) == 2
+
+
+def test_key_is_scoped_to_the_recipient(client, db, emails):
+    key = outbox_key()
+    first, second = unique_user_id(), unique_user_id()
+
+    internal(client, first, key)
+    internal(client, second, key)
+
+    assert len(notifications_for(db, first)) == 1
+    assert len(notifications_for(db, second)) == 1
+
+
+def test_repeated_article_notification_is_created_once(client, db, emails):
+    user_id, key = unique_user_id(), outbox_key()
+    headers = dict(bearer(1, ["editor"]), **{"Idempotency-Key": key})
+    body = {"user_id": user_id, "article_id": 5, "comments": "please fix references"}
+
+    ids = {client.post("/notifications/article", json=body, headers=headers).json()["id"] for _ in range(3)}
+
+    assert len(ids) == 1
+    assert len(notifications_for(db, user_id)) == 1
+    assert len(emails) == 1
+
+
+@pytest.fixture
+def editor_ids(monkeypatch):
+    """Editor ids the User Profile Service stand-in returns; mutate the list between calls."""
+    ids = []
+    real_client = httpx.Client
+
+    def users_client(**kwargs):
+        return real_client(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=ids)), **kwargs)
+
+    monkeypatch.setattr(editor.httpx, "Client", users_client)
+    return ids
+
+
+def test_repeated_broadcast_only_adds_missing_editors(client, db, editor_ids):
+    key = outbox_key()
+    editors = [unique_user_id() for _ in range(3)]
+    headers = dict(bearer(1, ["author"]), **{"Idempotency-Key": key})
+    body = {"article_id": 9, "title": "New article"}
+
+    editor_ids.extend(editors[:2])
+    assert client.post("/notifications/editor/broadcast-new-article", json=body, headers=headers).status_code == 200
+    # The retry sees one more editor (e.g. the first attempt timed out after a role change)
+    editor_ids.append(editors[2])
+    assert client.post("/notifications/editor/broadcast-new-article", json=body, headers=headers).status_code == 200
+
+    assert [len(notifications_for(db, e)) for e in editors] == [1, 1, 1]
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
+from app import tracing
 
 app = FastAPI(title="Publication Service")
+tracing.setup(app, "publication")
 
 
 @app.get("/health")
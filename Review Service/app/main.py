@@ -1,9 +1,25 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from sqlalchemy import inspect, text
 from app.reviews_router import router as reviews_router
 from app.database import Base, engine
+from app import tracing, outbox
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	# Delivers outbox events (notifications, Article Management callbacks) after commit
+	outbox.dispatcher.start()
+	try:
+		yield
+	finally:
+		outbox.dispatcher.stop()
+
 
-app = FastAPI(title="Review Service")
+app = FastAPI(title="Review Service", lifespan=lifespan)
+tracing.setup(app, "reviews", engine)
+outbox.setup(app, "reviews")
 
 # создаем таблицы
 Base.metadata.create_all(bind=engine)
@@ -2,8 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from jose import jwt, JWTError
-from app import models, schemas, database, config
-import httpx
+from app import models, schemas, database, config, outbox
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
@@ -109,31 +108,26 @@ def assign_reviewer(request: schemas.AssignReviewerRequest, db: Session = Depend
         status=models.ReviewStatus.pending
     )
     db.add(new_review)
-    db.commit()
-    db.refresh(new_review)
-    # Try to notify the reviewer via Notification Service (best effort)
-    try:
-        api_gateway = getattr(config, 'API_GATEWAY_URL', 'http://localhost:8000')
-        api_prefix = getattr(config, 'API_GATEWAY_PREFIX', '/api')
-        shared_secret = getattr(config, 'SHARED_SERVICE_SECRET', 'service-shared-secret')
-        frontend_url = getattr(config, 'FRONTEND_URL', 'http://localhost:8081')
-        payload = {
+    db.flush()
+    # Notify the reviewer via Notification Service (sent by the outbox after commit)
+    api_gateway = getattr(config, 'API_GATEWAY_URL', 'http://localhost:8000')
+    api_prefix = getattr(config, 'API_GATEWAY_PREFIX', '/api')
+    outbox.enqueue(
+        db,
+        "review.assigned",
+        "POST",
+        f"{api_gateway}{api_prefix}/notifications/internal",
+        json={
             "user_id": request.reviewer_id,
             "type": "review_assignment",
             "title": "Вам назначена рецензия",
             "message": f"Вам назначена рецензия по статье #{request.article_id}.",
             "related_entity": f"review:{new_review.id}",
-        }
-        with httpx.Client(timeout=5.0) as client:
-            print(f"{api_gateway}{api_prefix}/notifications/internal")
-            client.post(
-                f"{api_gateway}{api_prefix}/notifications/internal",
-                json=payload,
-                headers={"X-Service-Secret": shared_secret},
-            )
-    except Exception:
-        # don't block assignment on notification failures
-        pass
+        },
+        service_secret=True,
+    )
+    db.commit()
+    db.refresh(new_review)
     return new_review
 
 # ----------------------------
@@ -211,44 +205,18 @@ def update_review(review_id: int, review: schemas.ReviewUpdate, db: Session = De
         db_review.status = models.ReviewStatus.in_progress
     elif review.action == schemas.ReviewAction.submit:
         db_review.status = models.ReviewStatus.completed
+    # Если отправлено, уведомляем Article Management Service напрямую, без шлюза
+    # (outbox, после коммита)
+    if db_review.status == models.ReviewStatus.completed:
+        outbox.enqueue(
+            db,
+            "review.submitted",
+            "PATCH",
+            f"{config.ARTICLE_SERVICE_URL}/articles/internal/{db_review.article_id}/review-submitted",
+            service_secret=True,
+        )
     db.commit()
     db.refresh(db_review)
-    # Если отправлено, уведомляем Article Management Service
-    try:
-        if db_review.status == models.ReviewStatus.completed:
-            api_gateway = getattr(config, 'API_GATEWAY_URL', 'http://localhost:8000')
-            shared_secret = getattr(config, 'SHARED_SERVICE_SECRET', 'service-shared-secret')
-            with httpx.Client(timeout=5.0) as client:
-                client.patch(
-                    f"{api_gateway}/articles/internal/{db_review.article_id}/review-submitted",
-                    headers={"X-Service-Secret": shared_secret}
-                )
-    except Exception:
-        # Не блокируем ответ рецензенту, если межсервисный вызов не удался
-        pass
-    try:
-        api_gateway = getattr(config, 'API_GATEWAY_URL', 'http://localhost:8000')
-        api_prefix = getattr(config, 'API_GATEWAY_PREFIX', '/api')
-        shared_secret = getattr(config, 'SHARED_SERVICE_SECRET', 'service-shared-secret')
-        frontend_url = getattr(config, 'FRONTEND_URL', 'http://localhost:8081')
-        payload = {
-            "user_id": db_review.assigned_editor_id,
-            "type": "editorial",
-            "title": "Рецензия завершена",
-            "message": f"Рецензия по по статье завершена #{db_review.article_id}.",
-            "related_entity": f"review:{db_review.id}",
-        }
-        with httpx.Client(timeout=5.0) as client:
-            print(f"{api_gateway}{api_prefix}/notifications/internal")
-            client.post(
-                f"{api_gateway}{api_prefix}/notifications/internal",
-                json=payload,
-                headers={"X-Service-Secret": shared_secret},
-            )
-    except Exception:
-        # don't block assignment on notification failures
-        pass
-
     return db_review
 
     
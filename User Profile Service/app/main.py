@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from app.users_router import router as users_router
 from app.database import Base, engine
+from app import tracing
 
 app = FastAPI(title="User Profile Service")
+tracing.setup(app, "users", engine)
 
 # создаём таблицы (можно убрать после миграций)
 Base.metadata.create_all(bind=engine)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Query
 from sqlalchemy.orm import Session
 from app import models, schemas, database, security
 from app import config
@@ -158,6 +158,29 @@ def get_reviewers(
     return enriched
 
 
+BATCH_MAX_IDS = 100
+
+
+@router.get("/batch", response_model=list[schemas.UserProfileOut])
+def get_profiles_batch(
+    ids: list[int] = Query(default=[]),
+    x_service_secret: str | None = Header(default=None, alias="X-Service-Secret"),
+    db: Session = Depends(get_db),
+):
+    """Profiles for several users in one call (?ids=1&ids=2); unknown ids are skipped.
+
+    Internal (X-Service-Secret); more than BATCH_MAX_IDS distinct ids is a 422.
+    """
+    if not x_service_secret or x_service_secret != getattr(config, "SHARED_SERVICE_SECRET", ""):
+        raise HTTPException(status_code=403, detail="Invalid service secret")
+    unique_ids = set(ids)
+    if len(unique_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    if not unique_ids:
+        return []
+    return db.query(models.UserProfile).filter(models.UserProfile.user_id.in_(unique_ids)).all()
+
+
 @router.get("/{user_id}", response_model=schemas.UserProfileOut)
 def get_profile(user_id: int, db: Session = Depends(get_db)):
     profile = db.query(models.UserProfile).filter(models.UserProfile.user_id == user_id).first()
@@ -0,0 +1,75 @@
+"""Check that modules copied verbatim into several services are still identical.
+
+Each service is built from its own directory (Docker context), so shared code
+such as ``app/tracing.py`` is duplicated instead of imported from a common
+package. Run from the repository root (CI does this on every push):
+
+    python tools/check_shared_modules.py
+
+Exits non-zero and prints a diff for every copy that drifted from the first one.
+"""
+import difflib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Module path inside a service -> True if every service must carry a copy
+SHARED_MODULES = {
+    "app/tracing.py": True,
+    "app/outbox.py": False,
+    "app/identity.py": False,
+}
+
+# Services whose copy of a shared module is their own on purpose
+EXCLUDED = {
+    # The gateway only signs envelopes; the services' copies also verify them
+    "app/identity.py": {"API Gateaway"},
+}
+
+
+def services() -> list[Path]:
+    return sorted(p.parent.parent for p in ROOT.glob("*/app/main.py"))
+
+
+def check(module: str, required: bool) -> list[str]:
+    problems = []
+    copies = []
+    for service in services():
+        if service.name in EXCLUDED.get(module, ()):
+            continue
+        path = service / module
+        if path.exists():
+            copies.append(path)
+        elif required:
+            problems.append(f"{service.name}: missing {module}")
+    if not copies:
+        return problems
+
+    reference = copies[0]
+    expected = reference.read_text(encoding="utf-8").splitlines(keepends=True)
+    for path in copies[1:]:
+        actual = path.read_text(encoding="utf-8").splitlines(keepends=True)
+        if actual != expected:
+            diff = difflib.unified_diff(
+                expected, actual, str(reference.relative_to(ROOT)), str(path.relative_to(ROOT))
+            )
+            problems.append("".join(diff))
+    return problems
+
+
+def main() -> int:
+    problems = []
+    for module, required in SHARED_MODULES.items():
+        problems.extend(check(module, required))
+    for problem in problems:
+        print(problem)
+    if problems:
+        print("Shared modules differ; copy the changed file to every service.", file=sys.stderr)
+        return 1
+    print(f"Shared modules identical: {', '.join(SHARED_MODULES)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())